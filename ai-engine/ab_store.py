@@ -0,0 +1,546 @@
+"""
+Experiment Store for EduNiti AI Engine
+Persistence backends for A/B tests, user assignments and results (JSON files or SQLite)
+"""
+
+import os
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Dict, List, Any, Optional, Tuple
+
+import numpy as np
+
+from serialization import dumps, loads, dump_file, load_file
+from instrumentation import timed_stage
+from result_columns import ResultColumns
+
+STORE_BACKENDS = ('json', 'sqlite')
+
+class ExperimentStore(ABC):
+    """Interface for A/B test persistence
+
+    Records are the JSON-shaped dicts written to the ``ab_*.json`` files
+    (dates as ISO strings). ``shared`` stores are written by several
+    processes, so callers must not cache test definitions indefinitely.
+    """
+
+    shared = False
+
+    @abstractmethod
+    def load_tests(self) -> List[Dict[str, Any]]:
+        """All test definitions"""
+
+    @abstractmethod
+    def get_test(self, test_id: str) -> Optional[Dict[str, Any]]:
+        """One test definition or None"""
+
+    @abstractmethod
+    def save_test(self, test: Dict[str, Any]):
+        """Insert or replace a test definition"""
+
+    @abstractmethod
+    def add_test(self, test: Dict[str, Any]) -> bool:
+        """Insert a test unless one with its id exists (active or archived); True if inserted"""
+
+    @abstractmethod
+    def get_assignment(self, test_id: str, user_id: str) -> Optional[str]:
+        """The variant a user is assigned to, or None"""
+
+    @abstractmethod
+    def assign(self, test_id: str, user_id: str, variant: str) -> str:
+        """Assign a user unless already assigned; returns the stored variant"""
+
+    @abstractmethod
+    def assign_many(self, test_id: str, assignments: Dict[str, str]):
+        """Bulk-assign users (user_id -> variant) in one write, keeping existing assignments"""
+
+    @abstractmethod
+    def add_results(self, results: List[Dict[str, Any]]):
+        """Append a batch of results in one write"""
+
+    @abstractmethod
+    def load_results(self, test_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Results for one test (or all), in insertion order"""
+
+    @abstractmethod
+    def archive_tests(self, tests: List[Dict[str, Any]]):
+        """Move tests (stored with the given final records), their assignments
+        and results to the cold archive, out of every active lookup"""
+
+    @abstractmethod
+    def load_archived_tests(self) -> List[Dict[str, Any]]:
+        """All archived test definitions"""
+
+    @abstractmethod
+    def get_archived_test(self, test_id: str) -> Optional[Dict[str, Any]]:
+        """One archived test definition or None"""
+
+    @abstractmethod
+    def load_archived_results(self, test_id: str) -> List[Dict[str, Any]]:
+        """Results of an archived test"""
+
+    def load_result_columns(self, test_id: str, archived: bool = False, profiles: bool = False) -> ResultColumns:
+        """Results of a test as columns for analysis (may hold other tests' rows too)
+
+        ``user_profile`` payloads are only guaranteed with ``profiles``.
+        """
+        records = self.load_archived_results(test_id) if archived else self.load_results(test_id)
+        return ResultColumns.from_records(records)
+
+    def close(self):
+        """Release connections or file handles"""
+
+class JSONExperimentStore(ExperimentStore):
+    """Process-local store rewriting ``ab_tests.json`` and ``user_assignments.json``
+    on every change and appending to ``ab_results.json`` (single worker only)
+
+    Results are held as ResultColumns (interned ids, a metric matrix and
+    deduplicated payloads) rather than one dict per result. Archived tests
+    are written, with their results and assignments, to one
+    ``ab_archive/<test_id>.json`` file each and never loaded on startup.
+    """
+
+    def __init__(self, data_dir: str = 'data'):
+        self.data_dir = data_dir
+        self.archive_dir = os.path.join(data_dir, 'ab_archive')
+        self.tests: Dict[str, Dict[str, Any]] = {}
+        self.results = ResultColumns()
+        self._results_on_disk = 0  # rows of self.results already in ab_results.json
+        self.assignments: Dict[str, str] = {}  # "{user_id}_{test_id}" -> variant
+        self._load()
+
+    def _load(self):
+        try:
+            self.tests = {test['test_id']: test for test in load_file(f'{self.data_dir}/ab_tests.json')}
+            self.results = ResultColumns.from_records(load_file(f'{self.data_dir}/ab_results.json'))
+            self._results_on_disk = len(self.results)
+            self.assignments = load_file(f'{self.data_dir}/user_assignments.json')
+        except FileNotFoundError:
+            # Files don't exist yet, start fresh
+            pass
+
+    @timed_stage('ab_save_data')
+    def _save(self):
+        os.makedirs(self.data_dir, exist_ok=True)
+        dump_file(list(self.tests.values()), f'{self.data_dir}/ab_tests.json')
+        self._write_results()
+        dump_file(self.assignments, f'{self.data_dir}/user_assignments.json')
+
+    def _write_results(self):
+        """Append rows added since the last write in place of the closing bracket,
+        or rewrite ab_results.json when rows were removed or the file is missing"""
+        path = f'{self.data_dir}/ab_results.json'
+        new_rows = np.arange(len(self.results)) >= self._results_on_disk
+        if 0 < self._results_on_disk <= len(self.results) and os.path.exists(path):
+            with open(path, 'r+b') as f:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) == b']':
+                    if new_rows.any():
+                        f.seek(-1, os.SEEK_END)
+                        f.write(b',' + self.results.encode_records(new_rows)[1:])
+                    self._results_on_disk = len(self.results)
+                    return
+        with open(path, 'wb') as f:
+            f.write(self.results.encode_records())
+        self._results_on_disk = len(self.results)
+
+    def load_tests(self) -> List[Dict[str, Any]]:
+        return list(self.tests.values())
+
+    def get_test(self, test_id: str) -> Optional[Dict[str, Any]]:
+        return self.tests.get(test_id)
+
+    def save_test(self, test: Dict[str, Any]):
+        self.tests[test['test_id']] = test
+        self._save()
+
+    def add_test(self, test: Dict[str, Any]) -> bool:
+        if test['test_id'] in self.tests or self.get_archived_test(test['test_id']) is not None:
+            return False
+        self.save_test(test)
+        return True
+
+    def get_assignment(self, test_id: str, user_id: str) -> Optional[str]:
+        return self.assignments.get(f"{user_id}_{test_id}")
+
+    def assign(self, test_id: str, user_id: str, variant: str) -> str:
+        key = f"{user_id}_{test_id}"
+        if key not in self.assignments:
+            self.assignments[key] = variant
+            self._save()
+        return self.assignments[key]
+
+    def assign_many(self, test_id: str, assignments: Dict[str, str]):
+        for user_id, variant in assignments.items():
+            self.assignments.setdefault(f"{user_id}_{test_id}", variant)
+        self._save()
+
+    def add_results(self, results: List[Dict[str, Any]]):
+        self.results.extend(results)
+        self._save()
+
+    def load_results(self, test_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        if test_id is None:
+            return self.results.to_records()
+        return self.results.to_records(self.results.mask(test_id=test_id))
+
+    def load_result_columns(self, test_id: str, archived: bool = False, profiles: bool = False) -> ResultColumns:
+        if archived:
+            return super().load_result_columns(test_id, archived)
+        return self.results.snapshot()
+
+    def _archive_path(self, test_id: str) -> str:
+        return os.path.join(self.archive_dir, f'{test_id}.json')
+
+    def archive_tests(self, tests: List[Dict[str, Any]]):
+        if not tests:
+            return
+        os.makedirs(self.archive_dir, exist_ok=True)
+        archived_ids = {test['test_id'] for test in tests}
+        for test in tests:
+            suffix = f"_{test['test_id']}"
+            dump_file({
+                'test': test,
+                'results': self.results.to_records(self.results.mask(test_id=test['test_id'])),
+                'assignments': {key[:-len(suffix)]: variant for key, variant in self.assignments.items()
+                                if key.endswith(suffix)}
+            }, self._archive_path(test['test_id']))
+            self.tests.pop(test['test_id'], None)
+
+        self.results = self.results.take(~np.isin(self.results.test_codes,
+                                                  [self.results.tests.lookup(test_id) for test_id in archived_ids]))
+        self._results_on_disk = 0
+        self.assignments = {key: variant for key, variant in self.assignments.items()
+                            if key.rsplit('_', 1)[-1] not in archived_ids}
+        self._save()
+
+    def _load_archive(self, test_id: str) -> Optional[Dict[str, Any]]:
+        try:
+            return load_file(self._archive_path(test_id))
+        except FileNotFoundError:
+            return None
+
+    def load_archived_tests(self) -> List[Dict[str, Any]]:
+        if not os.path.isdir(self.archive_dir):
+            return []
+        archives = (self._load_archive(name[:-len('.json')])
+                    for name in sorted(os.listdir(self.archive_dir)) if name.endswith('.json'))
+        return [archive['test'] for archive in archives if archive]
+
+    def get_archived_test(self, test_id: str) -> Optional[Dict[str, Any]]:
+        archive = self._load_archive(test_id)
+        return archive['test'] if archive else None
+
+    def load_archived_results(self, test_id: str) -> List[Dict[str, Any]]:
+        archive = self._load_archive(test_id)
+        return archive['results'] if archive else []
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS ab_tests (
+    test_id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    description TEXT,
+    variants TEXT NOT NULL,
+    traffic_split TEXT NOT NULL,
+    start_date TEXT NOT NULL,
+    end_date TEXT NOT NULL,
+    status TEXT NOT NULL,
+    metrics TEXT NOT NULL,
+    success_criteria TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    key TEXT,
+    allocation TEXT,
+    layer TEXT,
+    layer_buckets TEXT
+);
+CREATE INDEX IF NOT EXISTS ab_tests_status ON ab_tests (status);
+
+CREATE TABLE IF NOT EXISTS ab_assignments (
+    test_id TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    variant TEXT NOT NULL,
+    PRIMARY KEY (test_id, user_id)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS ab_results (
+    seq INTEGER PRIMARY KEY,
+    result_id TEXT NOT NULL UNIQUE,
+    test_id TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    variant TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    metrics TEXT NOT NULL,
+    user_profile TEXT NOT NULL,
+    recommendation_data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ab_results_test_variant_time ON ab_results (test_id, variant, timestamp);
+CREATE INDEX IF NOT EXISTS ab_results_test_seq ON ab_results (test_id, seq);
+
+-- Cold archive: finished tests move here and active queries never read it
+CREATE TABLE IF NOT EXISTS ab_tests_archive (
+    test_id TEXT PRIMARY KEY,
+    record TEXT NOT NULL,
+    archived_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE IF NOT EXISTS ab_assignments_archive (
+    test_id TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    variant TEXT NOT NULL,
+    PRIMARY KEY (test_id, user_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS ab_results_archive (
+    seq INTEGER PRIMARY KEY,
+    result_id TEXT NOT NULL,
+    test_id TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    variant TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    metrics TEXT NOT NULL,
+    user_profile TEXT NOT NULL,
+    recommendation_data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ab_results_archive_test ON ab_results_archive (test_id, seq);
+"""
+
+# Columns added after the first schema version: (table, column, definition)
+_MIGRATIONS = (
+    ('ab_tests', 'key', 'TEXT'),
+    ('ab_tests', 'allocation', 'TEXT'),
+    ('ab_tests', 'layer', 'TEXT'),
+    ('ab_tests', 'layer_buckets', 'TEXT'),
+)
+
+# JSON-encoded test columns
+_TEST_JSON_COLUMNS = ('variants', 'traffic_split', 'metrics', 'success_criteria', 'allocation', 'layer_buckets')
+_TEST_COLUMNS = ('test_id', 'name', 'description', 'variants', 'traffic_split', 'start_date', 'end_date',
+                 'status', 'metrics', 'success_criteria', 'created_at', 'updated_at', 'key', 'allocation',
+                 'layer', 'layer_buckets')
+_RESULT_JSON_COLUMNS = ('metrics', 'user_profile', 'recommendation_data')
+_RESULT_COLUMNS = ('result_id', 'test_id', 'user_id', 'variant', 'timestamp',
+                   'metrics', 'user_profile', 'recommendation_data')
+
+# Constant SQL text, so each connection's statement cache reuses the prepared statements
+_UPSERT_TEST = (f"INSERT OR REPLACE INTO ab_tests ({', '.join(_TEST_COLUMNS)}) "
+                f"VALUES ({', '.join('?' * len(_TEST_COLUMNS))})")
+_SELECT_TESTS = f"SELECT {', '.join(_TEST_COLUMNS)} FROM ab_tests ORDER BY created_at"
+_SELECT_TEST = f"SELECT {', '.join(_TEST_COLUMNS)} FROM ab_tests WHERE test_id = ?"
+_INSERT_TEST = (f"INSERT INTO ab_tests ({', '.join(_TEST_COLUMNS)}) "
+                f"SELECT {', '.join('?' * len(_TEST_COLUMNS))} "
+                f"WHERE NOT EXISTS (SELECT 1 FROM ab_tests_archive WHERE test_id = ?) "
+                f"ON CONFLICT (test_id) DO NOTHING")
+_ARCHIVE_TEST = "INSERT OR REPLACE INTO ab_tests_archive (test_id, record) VALUES (?, ?)"
+_ARCHIVE_ASSIGNMENTS = ("INSERT OR IGNORE INTO ab_assignments_archive (test_id, user_id, variant) "
+                        "SELECT test_id, user_id, variant FROM ab_assignments WHERE test_id = ?")
+_ARCHIVE_RESULTS = (f"INSERT INTO ab_results_archive ({', '.join(_RESULT_COLUMNS)}) "
+                    f"SELECT {', '.join(_RESULT_COLUMNS)} FROM ab_results WHERE test_id = ? ORDER BY seq")
+_DELETE_TEST = "DELETE FROM ab_tests WHERE test_id = ?"
+_DELETE_ASSIGNMENTS = "DELETE FROM ab_assignments WHERE test_id = ?"
+_DELETE_RESULTS = "DELETE FROM ab_results WHERE test_id = ?"
+_SELECT_ARCHIVED_TESTS = "SELECT record FROM ab_tests_archive ORDER BY archived_at"
+_SELECT_ARCHIVED_TEST = "SELECT record FROM ab_tests_archive WHERE test_id = ?"
+_SELECT_ARCHIVED_RESULTS = (f"SELECT {', '.join(_RESULT_COLUMNS)} FROM ab_results_archive "
+                            f"WHERE test_id = ? ORDER BY seq")
+_SELECT_ASSIGNMENT = "SELECT variant FROM ab_assignments WHERE test_id = ? AND user_id = ?"
+_INSERT_ASSIGNMENT = "INSERT OR IGNORE INTO ab_assignments (test_id, user_id, variant) VALUES (?, ?, ?)"
+_INSERT_RESULT = (f"INSERT OR IGNORE INTO ab_results ({', '.join(_RESULT_COLUMNS)}) "
+                  f"VALUES ({', '.join('?' * len(_RESULT_COLUMNS))})")
+_SELECT_RESULTS = f"SELECT {', '.join(_RESULT_COLUMNS)} FROM ab_results ORDER BY seq"
+_SELECT_TEST_RESULTS = f"SELECT {', '.join(_RESULT_COLUMNS)} FROM ab_results WHERE test_id = ? ORDER BY seq"
+_RESULT_METRIC_COLUMNS = ('result_id', 'test_id', 'user_id', 'variant', 'timestamp', 'metrics')
+
+def _encode(value: Any) -> str:
+    return dumps(value).decode('utf-8')
+
+class SQLiteExperimentStore(ExperimentStore):
+    """SQLite store in WAL mode, shared by all workers on one host
+
+    Each thread gets its own connection. WAL lets readers proceed while one
+    writer commits, and ``busy_timeout`` makes concurrent writers from other
+    processes wait for the lock instead of failing. Writes run in explicit
+    ``BEGIN IMMEDIATE`` transactions: a batch of results is one transaction,
+    and a new assignment is insert-or-ignore followed by a read in the same
+    transaction, so concurrent workers always agree on a user's variant.
+
+    Analysis columns are cached per test and extended with the rows
+    committed (by any worker) since the last load, so repeated analyses
+    only decode new results.
+
+    Local files only: SQLite locking is unreliable on network filesystems.
+    """
+
+    shared = True
+
+    def __init__(self, path: str = 'data/ab_experiments.db', busy_timeout_ms: int = 5000):
+        self.path = path
+        self.busy_timeout_ms = busy_timeout_ms
+        self._local = threading.local()
+        # (table, test_id) -> (columns, last loaded seq, whether profiles are loaded)
+        self._columns: Dict[Tuple[str, str], Tuple[ResultColumns, int, bool]] = {}
+        self._columns_lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Idempotent DDL; executescript manages its own transaction
+        self._connection().executescript(_SCHEMA)
+        self._migrate()
+
+    def _migrate(self):
+        """Add columns introduced after a database was created"""
+        with self._transaction() as connection:
+            for table, column, definition in _MIGRATIONS:
+                columns = {row[1] for row in connection.execute(f'PRAGMA table_info({table})')}
+                if column not in columns:
+                    connection.execute(f'ALTER TABLE {table} ADD COLUMN {column} {definition}')
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            # isolation_level=None: transactions are managed explicitly below
+            connection = sqlite3.connect(self.path, timeout=self.busy_timeout_ms / 1000,
+                                         isolation_level=None, cached_statements=64)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.execute(f'PRAGMA busy_timeout={int(self.busy_timeout_ms)}')
+            self._local.connection = connection
+        return connection
+
+    @contextmanager
+    def _transaction(self):
+        connection = self._connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            yield connection
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        connection.execute('COMMIT')
+
+    def _test_from_row(self, row: tuple) -> Dict[str, Any]:
+        test = dict(zip(_TEST_COLUMNS, row))
+        for column in _TEST_JSON_COLUMNS:
+            # Columns added by a migration are NULL in existing rows
+            test[column] = loads(test[column]) if test[column] is not None else None
+        return test
+
+    def _result_from_row(self, row: tuple) -> Dict[str, Any]:
+        result = dict(zip(_RESULT_COLUMNS, row))
+        for column in _RESULT_JSON_COLUMNS:
+            result[column] = loads(result[column])
+        return result
+
+    def load_tests(self) -> List[Dict[str, Any]]:
+        return [self._test_from_row(row) for row in self._connection().execute(_SELECT_TESTS)]
+
+    def get_test(self, test_id: str) -> Optional[Dict[str, Any]]:
+        row = self._connection().execute(_SELECT_TEST, (test_id,)).fetchone()
+        return self._test_from_row(row) if row else None
+
+    def save_test(self, test: Dict[str, Any]):
+        with self._transaction() as connection:
+            connection.execute(_UPSERT_TEST, self._test_values(test))
+
+    def _test_values(self, test: Dict[str, Any]) -> tuple:
+        return tuple(_encode(test.get(column)) if column in _TEST_JSON_COLUMNS else test.get(column)
+                     for column in _TEST_COLUMNS)
+
+    def add_test(self, test: Dict[str, Any]) -> bool:
+        with self._transaction() as connection:
+            cursor = connection.execute(_INSERT_TEST, self._test_values(test) + (test['test_id'],))
+            return cursor.rowcount > 0
+
+    def get_assignment(self, test_id: str, user_id: str) -> Optional[str]:
+        row = self._connection().execute(_SELECT_ASSIGNMENT, (test_id, user_id)).fetchone()
+        return row[0] if row else None
+
+    def assign(self, test_id: str, user_id: str, variant: str) -> str:
+        with self._transaction() as connection:
+            connection.execute(_INSERT_ASSIGNMENT, (test_id, user_id, variant))
+            return connection.execute(_SELECT_ASSIGNMENT, (test_id, user_id)).fetchone()[0]
+
+    def assign_many(self, test_id: str, assignments: Dict[str, str]):
+        with self._transaction() as connection:
+            connection.executemany(_INSERT_ASSIGNMENT,
+                                   [(test_id, user_id, variant) for user_id, variant in assignments.items()])
+
+    def add_results(self, results: List[Dict[str, Any]]):
+        rows = [
+            tuple(_encode(result[column]) if column in _RESULT_JSON_COLUMNS else result[column]
+                  for column in _RESULT_COLUMNS)
+            for result in results
+        ]
+        with self._transaction() as connection:
+            connection.executemany(_INSERT_RESULT, rows)
+
+    def load_results(self, test_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        if test_id is None:
+            rows = self._connection().execute(_SELECT_RESULTS)
+        else:
+            rows = self._connection().execute(_SELECT_TEST_RESULTS, (test_id,))
+        return [self._result_from_row(row) for row in rows]
+
+    def archive_tests(self, tests: List[Dict[str, Any]]):
+        # One transaction, so a test is never half-archived
+        with self._transaction() as connection:
+            for test in tests:
+                test_id = test['test_id']
+                connection.execute(_ARCHIVE_TEST, (test_id, _encode(test)))
+                connection.execute(_ARCHIVE_ASSIGNMENTS, (test_id,))
+                connection.execute(_ARCHIVE_RESULTS, (test_id,))
+                connection.execute(_DELETE_RESULTS, (test_id,))
+                connection.execute(_DELETE_ASSIGNMENTS, (test_id,))
+                connection.execute(_DELETE_TEST, (test_id,))
+        with self._columns_lock:
+            for test in tests:
+                self._columns.pop(('ab_results', test['test_id']), None)
+
+    def load_archived_tests(self) -> List[Dict[str, Any]]:
+        return [loads(row[0]) for row in self._connection().execute(_SELECT_ARCHIVED_TESTS)]
+
+    def get_archived_test(self, test_id: str) -> Optional[Dict[str, Any]]:
+        row = self._connection().execute(_SELECT_ARCHIVED_TEST, (test_id,)).fetchone()
+        return loads(row[0]) if row else None
+
+    def load_archived_results(self, test_id: str) -> List[Dict[str, Any]]:
+        rows = self._connection().execute(_SELECT_ARCHIVED_RESULTS, (test_id,))
+        return [self._result_from_row(row) for row in rows]
+
+    def load_result_columns(self, test_id: str, archived: bool = False, profiles: bool = False) -> ResultColumns:
+        table = 'ab_results_archive' if archived else 'ab_results'
+        with self._columns_lock:
+            columns, last_seq, with_profiles = self._columns.get((table, test_id), (None, 0, False))
+            if columns is None or (profiles and not with_profiles):
+                columns, last_seq, with_profiles = ResultColumns(), 0, profiles
+
+            # Analysis needs ids, timestamps and metrics: skip decoding unneeded payload columns
+            fields = ('seq',) + _RESULT_METRIC_COLUMNS + (('user_profile',) if with_profiles else ())
+            query = f"SELECT {', '.join(fields)} FROM {table} WHERE test_id = ? AND seq > ? ORDER BY seq"
+            records = []
+            for row in self._connection().execute(query, (test_id, last_seq)):
+                record = dict(zip(fields, row))
+                last_seq = record.pop('seq')
+                record['metrics'] = loads(record['metrics'])
+                if with_profiles:
+                    record['user_profile'] = loads(record['user_profile'])
+                records.append(record)
+            columns.extend(records)
+            self._columns[(table, test_id)] = (columns, last_seq, with_profiles)
+            return columns.snapshot()
+
+    def close(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+def create_experiment_store(backend: str = 'json',
+                            data_dir: str = 'data',
+                            sqlite_path: Optional[str] = None) -> ExperimentStore:
+    """Build the configured experiment store"""
+    if backend not in STORE_BACKENDS:
+        raise ValueError(f"Experiment store backend must be one of {STORE_BACKENDS}")
+    if backend == 'sqlite':
+        return SQLiteExperimentStore(sqlite_path or os.path.join(data_dir, 'ab_experiments.db'))
+    return JSONExperimentStore(data_dir)
@@ -3,15 +3,25 @@ A/B Testing Framework for EduNiti AI Engine
 Implements A/B testing for recommendation effectiveness
 """
 
+import asyncio
+import bisect
+import hashlib
 import json
+import logging
 import random
+import threading
 import time
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Callable, Awaitable, Tuple
 from datetime import datetime, timedelta
 import pandas as pd
 import numpy as np
 from dataclasses import dataclass, asdict
 import uuid
+from ab_store import ExperimentStore, JSONExperimentStore
+from allocation import allocation_config, thompson_weights
+from variant_scoring import scoring_config
+
+logger = logging.getLogger(__name__)
 
 @dataclass
 class ABTest:
@@ -28,6 +38,10 @@ class ABTest:
     success_criteria: Dict[str, float]
     created_at: datetime
     updated_at: datetime
+    key: Optional[str] = None  # stable definition key for declarative tests
+    allocation: Optional[Dict[str, Any]] = None  # adaptive allocation config and weights; None = fixed traffic_split
+    layer: Optional[str] = None  # experiment layer; None for tests owning all of their traffic
+    layer_buckets: Optional[List[int]] = None  # [start, end) of the layer's hash buckets owned by the test
 
 @dataclass
 class TestResult:
@@ -41,77 +55,183 @@ class TestResult:
     user_profile: Dict[str, Any]
     recommendation_data: Dict[str, Any]
 
+# Hash buckets per experiment layer; a layered test owns a contiguous range of them
+LAYER_BUCKETS = 10000
+
+# Seconds a shared store's layer index is reused before re-reading test definitions
+LAYER_INDEX_TTL = 5.0
+
+# Namespace for test ids derived from declarative definition keys
+TEST_ID_NAMESPACE = uuid.UUID('6f1c2a54-9d3e-4b7a-8c15-2e4f0b9d7a31')
+
+# Declarative default tests keyed by a stable name. ensure_test reuses the
+# running test for an unchanged definition; bump 'version' to start a new run.
+DEFAULT_TESTS: Dict[str, Dict[str, Any]] = {
+    'recommendation_algorithm': {
+        'version': 2,
+        'name': "Recommendation Algorithm Test",
+        'layer': 'recommendation',
+        'description': "Test different recommendation algorithms to improve user engagement",
+        'variants': [
+            {
+                'name': 'baseline',
+                'description': 'Current recommendation algorithm',
+                'algorithm': 'rule_based',
+                'parameters': {}
+            },
+            {
+                'name': 'ml_enhanced',
+                'description': 'ML-enhanced recommendation algorithm',
+                'algorithm': 'ml_based',
+                'parameters': {
+                    'use_ml': True,
+                    'confidence_threshold': 0.7
+                }
+            },
+            {
+                'name': 'hybrid',
+                'description': 'Hybrid approach combining rules and ML',
+                'algorithm': 'hybrid',
+                'parameters': {
+                    'ml_weight': 0.6,
+                    'rule_weight': 0.4
+                }
+            }
+        ],
+        'traffic_split': [0.4, 0.3, 0.3],  # 40% baseline, 30% each for new variants
+        'duration_days': 30,
+        'metrics': [
+            'click_through_rate',
+            'conversion_rate',
+            'user_satisfaction',
+            'recommendation_accuracy',
+            'time_spent'
+        ],
+        'success_criteria': {
+            'click_through_rate': 0.15,  # 15% CTR
+            'user_satisfaction': 4.0,    # 4.0/5.0 satisfaction
+            'recommendation_accuracy': 0.8  # 80% accuracy
+        }
+    },
+    'ui_enhancement': {
+        'version': 2,
+        'name': "UI Enhancement Test",
+        'layer': 'ui',
+        'description': "Test enhanced UI to improve user engagement",
+        'variants': [
+            {
+                'name': 'current_ui',
+                'description': 'Current user interface',
+                'layout': 'standard',
+                'features': ['basic_search', 'filters']
+            },
+            {
+                'name': 'enhanced_ui',
+                'description': 'Enhanced UI with better visualizations',
+                'layout': 'enhanced',
+                'features': ['advanced_search', 'filters', 'visualizations', 'recommendations']
+            }
+        ],
+        'traffic_split': [0.5, 0.5],
+        'duration_days': 14,
+        'metrics': [
+            'page_views',
+            'time_on_page',
+            'bounce_rate',
+            'user_engagement',
+            'feature_usage'
+        ],
+        'success_criteria': {
+            'time_on_page': 120,  # 2 minutes
+            'user_engagement': 0.7,  # 70% engagement
+            'bounce_rate': 0.3  # 30% bounce rate (lower is better)
+        }
+    }
+}
+
+_TEST_DATE_FIELDS = ('start_date', 'end_date', 'created_at', 'updated_at')
+
+def _test_to_record(test: ABTest) -> Dict[str, Any]:
+    record = asdict(test)
+    for field in _TEST_DATE_FIELDS:
+        record[field] = getattr(test, field).isoformat()
+    return record
+
+def _test_from_record(record: Dict[str, Any]) -> ABTest:
+    test = ABTest(**record)
+    for field in _TEST_DATE_FIELDS:
+        setattr(test, field, datetime.fromisoformat(getattr(test, field)))
+    return test
+
+def _test_arguments(definition: Dict[str, Any], **overrides) -> Dict[str, Any]:
+    """create_test keyword arguments of a declarative definition"""
+    return {**{name: value for name, value in definition.items() if name != 'version'}, **overrides}
+
+def _hash_unit(salt: str, user_id: str) -> float:
+    """Uniform value in [0, 1) from a salted hash of the user id"""
+    digest = hashlib.blake2b(f"{salt}:{user_id}".encode(), digest_size=8).digest()
+    return int.from_bytes(digest, 'big') / 2 ** 64
+
+def _layer_bucket(layer: str, user_id: str) -> int:
+    # Salted with the layer name, so positions in different layers are independent
+    return int(_hash_unit(layer, user_id) * LAYER_BUCKETS)
+
+def _in_layer_range(test: ABTest, user_id: str) -> bool:
+    start, end = test.layer_buckets
+    return start <= _layer_bucket(test.layer, user_id) < end
+
+def _hashed_variant(test: ABTest, user_id: str) -> str:
+    """Deterministic variant of a fixed-split layered test, salted with the test id"""
+    rand = _hash_unit(test.test_id, user_id)
+    cumulative = 0
+    for variant, split in zip(test.variants, test.traffic_split):
+        cumulative += split
+        if rand < cumulative:
+            return variant['name']
+    return test.variants[-1]['name']
+
+def _result_to_record(result: TestResult) -> Dict[str, Any]:
+    record = asdict(result)
+    record['timestamp'] = result.timestamp.isoformat()
+    return record
+
 class ABTestingFramework:
-    def __init__(self, data_dir: str = 'data'):
+    def __init__(self, data_dir: str = 'data', store: Optional[ExperimentStore] = None):
         self.data_dir = data_dir
+        # JSON files by default; a shared store (SQLite) for multiple workers
+        self.store = store or JSONExperimentStore(data_dir)
         self.tests: Dict[str, ABTest] = {}
-        self.results: List[TestResult] = []
-        self.user_assignments: Dict[str, str] = {}  # user_id -> variant
+        self._rng = np.random.default_rng()
+        self._allocation_lock = threading.Lock()
+        self._layers: Optional[Dict[str, Tuple[List[int], List[ABTest]]]] = None
+        self._layers_built = 0.0
         
         # Load existing data
         self._load_data()
     
     def _load_data(self):
-        """Load existing tests and results"""
-        try:
-            # Load tests
-            with open(f'{self.data_dir}/ab_tests.json', 'r') as f:
-                tests_data = json.load(f)
-                for test_data in tests_data:
-                    test = ABTest(**test_data)
-                    test.start_date = datetime.fromisoformat(test.start_date)
-                    test.end_date = datetime.fromisoformat(test.end_date)
-                    test.created_at = datetime.fromisoformat(test.created_at)
-                    test.updated_at = datetime.fromisoformat(test.updated_at)
-                    self.tests[test.test_id] = test
-            
-            # Load results
-            with open(f'{self.data_dir}/ab_results.json', 'r') as f:
-                results_data = json.load(f)
-                for result_data in results_data:
-                    result = TestResult(**result_data)
-                    result.timestamp = datetime.fromisoformat(result.timestamp)
-                    self.results.append(result)
-            
-            # Load user assignments
-            with open(f'{self.data_dir}/user_assignments.json', 'r') as f:
-                self.user_assignments = json.load(f)
-                
-        except FileNotFoundError:
-            # Files don't exist yet, start fresh
-            pass
-    
-    def _save_data(self):
-        """Save tests and results to files"""
-        import os
-        os.makedirs(self.data_dir, exist_ok=True)
-        
-        # Save tests
-        tests_data = []
-        for test in self.tests.values():
-            test_dict = asdict(test)
-            test_dict['start_date'] = test.start_date.isoformat()
-            test_dict['end_date'] = test.end_date.isoformat()
-            test_dict['created_at'] = test.created_at.isoformat()
-            test_dict['updated_at'] = test.updated_at.isoformat()
-            tests_data.append(test_dict)
-        
-        with open(f'{self.data_dir}/ab_tests.json', 'w') as f:
-            json.dump(tests_data, f, indent=2)
-        
-        # Save results
-        results_data = []
-        for result in self.results:
-            result_dict = asdict(result)
-            result_dict['timestamp'] = result.timestamp.isoformat()
-            results_data.append(result_dict)
-        
-        with open(f'{self.data_dir}/ab_results.json', 'w') as f:
-            json.dump(results_data, f, indent=2)
-        
-        # Save user assignments
-        with open(f'{self.data_dir}/user_assignments.json', 'w') as f:
-            json.dump(self.user_assignments, f, indent=2)
+        """Load existing test definitions from the store"""
+        self.tests = {record['test_id']: _test_from_record(record) for record in self.store.load_tests()}
+    
+    def _get_test(self, test_id: str, include_archived: bool = False) -> ABTest:
+        """Get a test, re-read from shared stores so other workers' changes are seen
+        
+        Archived tests are only looked up when ``include_archived`` is set.
+        """
+        if self.store.shared or test_id not in self.tests:
+            record = self.store.get_test(test_id)
+            if record is None:
+                archived = self.store.get_archived_test(test_id) if include_archived else None
+                if archived is None:
+                    raise ValueError(f"Test {test_id} not found")
+                return _test_from_record(archived)
+            self.tests[test_id] = _test_from_record(record)
+        return self.tests[test_id]
+    
+    def _save_test(self, test: ABTest):
+        self.tests[test.test_id] = test
+        self.store.save_test(_test_to_record(test))
+        self._layers = None
     
     def create_test(self, 
                    name: str,
@@ -120,8 +240,41 @@ class ABTestingFramework:
                    traffic_split: List[float],
                    duration_days: int,
                    metrics: List[str],
-                   success_criteria: Dict[str, float]) -> str:
-        """Create a new A/B test"""
+                   success_criteria: Dict[str, float],
+                   allocation: Optional[Dict[str, Any]] = None,
+                   layer: Optional[str] = None,
+                   layer_share: float = 1.0) -> str:
+        """Create a new A/B test
+        
+        ``allocation`` switches the test to adaptive traffic allocation, e.g.
+        ``{'mode': 'thompson', 'metric': 'click_through_rate'}``; see
+        allocation.DEFAULT_ALLOCATION for the settings.
+        
+        A test in a ``layer`` gets ``layer_share`` of that layer's users and
+        excludes the layer's other tests; users take part in one test of
+        every layer at the same time.
+        """
+        test = self._new_test(name, description, variants, traffic_split, duration_days, metrics, success_criteria,
+                              allocation=allocation, layer=layer, layer_share=layer_share)
+        self._save_test(test)
+        
+        return test.test_id
+    
+    def _new_test(self,
+                  name: str,
+                  description: str,
+                  variants: List[Dict[str, Any]],
+                  traffic_split: List[float],
+                  duration_days: int,
+                  metrics: List[str],
+                  success_criteria: Dict[str, float],
+                  test_id: Optional[str] = None,
+                  key: Optional[str] = None,
+                  status: str = 'draft',
+                  allocation: Optional[Dict[str, Any]] = None,
+                  layer: Optional[str] = None,
+                  layer_share: float = 1.0) -> ABTest:
+        """Validate inputs and build a test"""
         
         # Validate inputs
         if abs(sum(traffic_split) - 1.0) > 0.01:
@@ -130,36 +283,52 @@ class ABTestingFramework:
         if len(variants) != len(traffic_split):
             raise ValueError("Number of variants must match traffic split length")
         
-        # Create test
-        test_id = str(uuid.uuid4())
-        now = datetime.now()
+        for variant in variants:
+            scoring_config(variant)
         
-        test = ABTest(
-            test_id=test_id,
+        layer_buckets = self._free_layer_range(layer, layer_share) if layer else None
+        
+        now = datetime.now()
+        return ABTest(
+            test_id=test_id or str(uuid.uuid4()),
             name=name,
             description=description,
             variants=variants,
             traffic_split=traffic_split,
             start_date=now,
             end_date=now + timedelta(days=duration_days),
-            status='draft',
+            status=status,
             metrics=metrics,
             success_criteria=success_criteria,
             created_at=now,
-            updated_at=now
+            updated_at=now,
+            key=key,
+            allocation=allocation_config(allocation, traffic_split, metrics) if allocation else None,
+            layer=layer,
+            layer_buckets=layer_buckets
         )
-        
-        self.tests[test_id] = test
-        self._save_data()
-        
-        return test_id
+    
+    def _free_layer_range(self, layer: str, share: float) -> List[int]:
+        """First free bucket range of a layer large enough for ``share`` of its users"""
+        if not 0 < share <= 1:
+            raise ValueError("layer_share must be in (0, 1]")
+        size = max(1, round(share * LAYER_BUCKETS))
+        taken = sorted(
+            tuple(record['layer_buckets']) for record in self.store.load_tests()
+            if record.get('layer') == layer and record['status'] != 'completed'
+        )
+        start = 0
+        for taken_start, taken_end in taken:
+            if taken_start - start >= size:
+                break
+            start = max(start, taken_end)
+        if LAYER_BUCKETS - start < size:
+            raise ValueError(f"Layer '{layer}' has no free range for {share:.0%} of its users")
+        return [start, start + size]
     
     def start_test(self, test_id: str):
         """Start an A/B test"""
-        if test_id not in self.tests:
-            raise ValueError(f"Test {test_id} not found")
-        
-        test = self.tests[test_id]
+        test = self._get_test(test_id)
         if test.status != 'draft':
             raise ValueError(f"Test {test_id} is not in draft status")
         
@@ -167,81 +336,232 @@ class ABTestingFramework:
         test.start_date = datetime.now()
         test.updated_at = datetime.now()
         
-        self._save_data()
+        self._save_test(test)
         print(f"Test {test_id} started successfully!")
     
     def assign_user_to_variant(self, user_id: str, test_id: str) -> str:
         """Assign user to a test variant"""
-        if test_id not in self.tests:
-            raise ValueError(f"Test {test_id} not found")
-        
-        test = self.tests[test_id]
+        test = self._get_test(test_id)
         if test.status != 'running':
             raise ValueError(f"Test {test_id} is not running")
         
+        if test.layer is not None:
+            if not _in_layer_range(test, user_id):
+                raise ValueError(f"User {user_id} is outside test {test_id}'s share of layer '{test.layer}'")
+            if not test.allocation:
+                # Fixed split: the salted hash decides, so nothing is stored
+                return _hashed_variant(test, user_id)
+        
         # Check if user is already assigned
-        assignment_key = f"{user_id}_{test_id}"
-        if assignment_key in self.user_assignments:
-            return self.user_assignments[assignment_key]
+        assigned = self.store.get_assignment(test_id, user_id)
+        if assigned is not None:
+            return assigned
         
-        # Assign user to variant based on traffic split
+        # Assign user to variant based on traffic split (or the adaptive weights)
         rand = random.random()
         cumulative = 0
         variant_index = 0
         
-        for i, split in enumerate(test.traffic_split):
+        for i, split in enumerate(self._traffic_split(test)):
             cumulative += split
             if rand <= cumulative:
                 variant_index = i
                 break
         
-        variant = test.variants[variant_index]['name']
-        self.user_assignments[assignment_key] = variant
-        
-        self._save_data()
-        return variant
+        # Another worker may have assigned the user meanwhile; the stored variant wins
+        return self.store.assign(test_id, user_id, test.variants[variant_index]['name'])
+    
+    def _traffic_split(self, test: ABTest) -> List[float]:
+        """Variant weights for new assignments; adaptive weights are refreshed when due"""
+        if not test.allocation:
+            return test.traffic_split
+        updated_at = test.allocation['updated_at']
+        due = updated_at is None or \
+            (datetime.now() - datetime.fromisoformat(updated_at)).total_seconds() >= test.allocation['update_interval']
+        # One update at a time; concurrent assignments keep using the current weights
+        if due and self._allocation_lock.acquire(blocking=False):
+            try:
+                self._update_allocation(test)
+            finally:
+                self._allocation_lock.release()
+        return test.allocation['weights']
+    
+    def update_allocation(self, test_id: str) -> Dict[str, Any]:
+        """Recompute a test's adaptive weights now"""
+        test = self._get_test(test_id)
+        if not test.allocation:
+            raise ValueError(f"Test {test_id} uses a fixed traffic split")
+        with self._allocation_lock:
+            self._update_allocation(test)
+        return test.allocation
+    
+    def _update_allocation(self, test: ABTest):
+        """Thompson sampling over the posterior of each variant's reward metric
+        
+        Sufficient statistics (count, sum, sum of squares) per variant come
+        straight from the result columns; results without the metric are not
+        observations. Existing assignments are never moved.
+        """
+        config = test.allocation
+        columns = self.store.load_result_columns(test.test_id, archived=False)
+        mask = columns.mask(test_id=test.test_id)
+        values = columns.metric_values(config['metric'], mask)
+        positions = np.full(len(columns.variants), -1)
+        for i, variant in enumerate(test.variants):
+            code = columns.variants.lookup(variant['name'])
+            if code >= 0:
+                positions[code] = i
+        variants = positions[columns.variant_codes[mask]]
+        observed = (variants >= 0) & ~np.isnan(values)
+        variants, values = variants[observed], values[observed]
+        if config['metric_type'] == 'rate':
+            values = np.clip(values, 0, 1)
+        
+        size = len(test.variants)
+        n = np.bincount(variants, minlength=size).astype(float)
+        sums = np.bincount(variants, weights=values, minlength=size)
+        sumsq = np.bincount(variants, weights=values ** 2, minlength=size)
+        if n.sum():
+            # Until results arrive, the configured traffic split stands
+            win_probability, weights = thompson_weights(n, sums, sumsq, config, self._rng)
+            config.update({
+                'weights': [float(weight) for weight in weights],
+                'win_probability': [float(probability) for probability in win_probability]
+            })
+        config.update({
+            'observations': [int(count) for count in n],
+            'updated_at': datetime.now().isoformat()
+        })
+        test.updated_at = datetime.now()
+        self._save_test(test)
+    
+    def get_allocation(self, test_id: str) -> Dict[str, Any]:
+        """How new users are split across a test's variants"""
+        test = self._get_test(test_id)
+        variants = [variant['name'] for variant in test.variants]
+        if not test.allocation:
+            return {'test_id': test_id, 'mode': 'fixed', 'weights': dict(zip(variants, test.traffic_split))}
+        config = test.allocation
+        return {
+            'test_id': test_id,
+            'mode': config['mode'],
+            'metric': config['metric'],
+            'metric_type': config['metric_type'],
+            'weights': dict(zip(variants, config['weights'])),
+            'win_probability': dict(zip(variants, config['win_probability'])) if config['win_probability'] else None,
+            'observations': dict(zip(variants, config['observations'])) if config['observations'] else None,
+            'updated_at': config['updated_at'],
+            'update_interval': config['update_interval'],
+            'min_share': config['min_share']
+        }
+    
+    def _layer_index(self) -> Dict[str, Tuple[List[int], List[ABTest]]]:
+        """Running layered tests per layer, sorted by bucket range start"""
+        stale = self.store.shared and time.monotonic() - self._layers_built > LAYER_INDEX_TTL
+        if self._layers is None or stale:
+            layers: Dict[str, List[ABTest]] = {}
+            for record in self.store.load_tests():
+                if record.get('layer') and record['status'] == 'running':
+                    layers.setdefault(record['layer'], []).append(_test_from_record(record))
+            self._layers = {}
+            for layer, tests in layers.items():
+                tests.sort(key=lambda test: test.layer_buckets[0])
+                self._layers[layer] = ([test.layer_buckets[0] for test in tests], tests)
+            self._layers_built = time.monotonic()
+        return self._layers
+    
+    def resolve_assignments(self, user_id: str, assign: bool = True) -> Dict[str, Dict[str, str]]:
+        """The user's test and variant in every experiment layer: layer -> {test_id, variant}
+        
+        Each layer hashes the user with its own salt, so layers are
+        independent of each other; the tests of a layer own disjoint bucket
+        ranges, so they are mutually exclusive. Fixed-split tests resolve
+        from the hash alone, without touching the store. With ``assign=False``
+        nothing is written: a user not yet assigned to an adaptive test is
+        left out of its layer.
+        """
+        assignments = {}
+        for layer, (starts, tests) in self._layer_index().items():
+            bucket = _layer_bucket(layer, user_id)
+            position = bisect.bisect_right(starts, bucket) - 1
+            if position < 0 or bucket >= tests[position].layer_buckets[1]:
+                continue  # bucket not owned by any running test
+            test = tests[position]
+            if test.allocation and not assign:
+                variant = self.store.get_assignment(test.test_id, user_id)
+                if variant is None:
+                    continue
+            elif test.allocation:
+                variant = self.assign_user_to_variant(user_id, test.test_id)
+            else:
+                variant = _hashed_variant(test, user_id)
+            assignments[layer] = {'test_id': test.test_id, 'variant': variant}
+        return assignments
     
     def record_result(self, 
                      test_id: str,
                      user_id: str,
                      metrics: Dict[str, float],
                      user_profile: Dict[str, Any],
-                     recommendation_data: Dict[str, Any]):
+                     recommendation_data: Dict[str, Any],
+                     timestamp: Optional[datetime] = None):
         """Record a test result"""
-        if test_id not in self.tests:
-            raise ValueError(f"Test {test_id} not found")
+        result = self._build_result(test_id, user_id, metrics, user_profile, recommendation_data, timestamp)
+        self.store.add_results([_result_to_record(result)])
+    
+    def record_results(self, results: List[Dict[str, Any]]) -> int:
+        """Record a batch of test results with a single save
+        
+        Each item holds the keyword arguments of record_result. Invalid items
+        (unknown test, unassigned user) are skipped; returns the number recorded.
+        """
+        records = []
+        for item in results:
+            try:
+                records.append(_result_to_record(self._build_result(**item)))
+            except ValueError as e:
+                logger.warning(f"Skipping A/B test result: {e}")
+        
+        if records:
+            self.store.add_results(records)
+        return len(records)
+    
+    def _build_result(self,
+                      test_id: str,
+                      user_id: str,
+                      metrics: Dict[str, float],
+                      user_profile: Dict[str, Any],
+                      recommendation_data: Dict[str, Any],
+                      timestamp: Optional[datetime] = None) -> TestResult:
+        """Validate and create a test result"""
+        test = self.tests.get(test_id) or self._get_test(test_id)
         
         # Get user's assigned variant
-        assignment_key = f"{user_id}_{test_id}"
-        if assignment_key not in self.user_assignments:
+        variant = self.store.get_assignment(test_id, user_id)
+        if variant is None and test.layer is not None and not test.allocation and _in_layer_range(test, user_id):
+            variant = _hashed_variant(test, user_id)
+        if variant is None:
             raise ValueError(f"User {user_id} not assigned to test {test_id}")
         
-        variant = self.user_assignments[assignment_key]
-        
         # Create result
-        result = TestResult(
+        return TestResult(
             result_id=str(uuid.uuid4()),
             test_id=test_id,
             user_id=user_id,
             variant=variant,
-            timestamp=datetime.now(),
+            timestamp=timestamp or datetime.now(),
             metrics=metrics,
             user_profile=user_profile,
             recommendation_data=recommendation_data
         )
-        
-        self.results.append(result)
-        self._save_data()
     
     def get_test_results(self, test_id: str) -> Dict[str, Any]:
-        """Get aggregated results for a test"""
-        if test_id not in self.tests:
-            raise ValueError(f"Test {test_id} not found")
+        """Get aggregated results for a test (archived tests included)"""
+        test = self._get_test(test_id, include_archived=True)
+        columns = self.store.load_result_columns(test_id, archived=test_id not in self.tests)
+        total_users = int(columns.mask(test_id=test_id).sum())
         
-        test = self.tests[test_id]
-        test_results = [r for r in self.results if r.test_id == test_id]
-        
-        if not test_results:
+        if not total_users:
             return {
                 'test_id': test_id,
                 'status': test.status,
@@ -249,39 +569,13 @@ class ABTestingFramework:
                 'variants': {}
             }
         
-        # Group results by variant
-        variant_results = {}
-        for variant in test.variants:
-            variant_name = variant['name']
-            variant_data = [r for r in test_results if r.variant == variant_name]
-            
-            if variant_data:
-                # Calculate metrics
-                metrics_summary = {}
-                for metric in test.metrics:
-                    values = [r.metrics.get(metric, 0) for r in variant_data]
-                    metrics_summary[metric] = {
-                        'mean': np.mean(values),
-                        'std': np.std(values),
-                        'count': len(values),
-                        'min': np.min(values),
-                        'max': np.max(values)
-                    }
-                
-                variant_results[variant_name] = {
-                    'user_count': len(variant_data),
-                    'metrics': metrics_summary
-                }
-            else:
-                variant_results[variant_name] = {
-                    'user_count': 0,
-                    'metrics': {}
-                }
+        # Per-variant metric summaries, computed on the result columns
+        variant_results = columns.summarize(test_id, [variant['name'] for variant in test.variants], test.metrics)
         
         return {
             'test_id': test_id,
             'status': test.status,
-            'total_users': len(test_results),
+            'total_users': total_users,
             'variants': variant_results,
             'success_criteria': test.success_criteria
         }
@@ -299,7 +593,7 @@ class ABTestingFramework:
                 'analysis': 'No data available for analysis'
             }
         
-        test = self.tests[test_id]
+        test = self._get_test(test_id, include_archived=True)
         variants = list(results['variants'].keys())
         
         if len(variants) < 2:
@@ -344,121 +638,75 @@ class ABTestingFramework:
     
     def create_recommendation_test(self) -> str:
         """Create a test for recommendation algorithms"""
-        variants = [
-            {
-                'name': 'baseline',
-                'description': 'Current recommendation algorithm',
-                'algorithm': 'rule_based',
-                'parameters': {}
-            },
-            {
-                'name': 'ml_enhanced',
-                'description': 'ML-enhanced recommendation algorithm',
-                'algorithm': 'ml_based',
-                'parameters': {
-                    'use_ml': True,
-                    'confidence_threshold': 0.7
-                }
-            },
-            {
-                'name': 'hybrid',
-                'description': 'Hybrid approach combining rules and ML',
-                'algorithm': 'hybrid',
-                'parameters': {
-                    'ml_weight': 0.6,
-                    'rule_weight': 0.4
-                }
-            }
-        ]
-        
-        traffic_split = [0.4, 0.3, 0.3]  # 40% baseline, 30% each for new variants
-        
-        metrics = [
-            'click_through_rate',
-            'conversion_rate',
-            'user_satisfaction',
-            'recommendation_accuracy',
-            'time_spent'
-        ]
-        
-        success_criteria = {
-            'click_through_rate': 0.15,  # 15% CTR
-            'user_satisfaction': 4.0,    # 4.0/5.0 satisfaction
-            'recommendation_accuracy': 0.8  # 80% accuracy
-        }
-        
-        return self.create_test(
-            name="Recommendation Algorithm Test",
-            description="Test different recommendation algorithms to improve user engagement",
-            variants=variants,
-            traffic_split=traffic_split,
-            duration_days=30,
-            metrics=metrics,
-            success_criteria=success_criteria
-        )
+        return self.create_test(**_test_arguments(DEFAULT_TESTS['recommendation_algorithm'], layer=None))
     
     def create_ui_test(self) -> str:
         """Create a test for UI variations"""
-        variants = [
-            {
-                'name': 'current_ui',
-                'description': 'Current user interface',
-                'layout': 'standard',
-                'features': ['basic_search', 'filters']
-            },
-            {
-                'name': 'enhanced_ui',
-                'description': 'Enhanced UI with better visualizations',
-                'layout': 'enhanced',
-                'features': ['advanced_search', 'filters', 'visualizations', 'recommendations']
-            }
-        ]
-        
-        traffic_split = [0.5, 0.5]
-        
-        metrics = [
-            'page_views',
-            'time_on_page',
-            'bounce_rate',
-            'user_engagement',
-            'feature_usage'
-        ]
-        
-        success_criteria = {
-            'time_on_page': 120,  # 2 minutes
-            'user_engagement': 0.7,  # 70% engagement
-            'bounce_rate': 0.3  # 30% bounce rate (lower is better)
-        }
-        
-        return self.create_test(
-            name="UI Enhancement Test",
-            description="Test enhanced UI to improve user engagement",
-            variants=variants,
-            traffic_split=traffic_split,
-            duration_days=14,
-            metrics=metrics,
-            success_criteria=success_criteria
-        )
+        return self.create_test(**_test_arguments(DEFAULT_TESTS['ui_enhancement'], layer=None))
+    
+    def ensure_test(self, key: str, definition: Dict[str, Any]) -> Optional[str]:
+        """Create and start the test for a declarative definition, once
+        
+        The test id is derived from ``key`` and the definition's ``version``,
+        so every restart and every worker resolves the same test instead of
+        creating a new one. Returns None once that test has been archived;
+        bump ``version`` to run the definition again.
+        """
+        test_id = str(uuid.uuid5(TEST_ID_NAMESPACE, f"{key}:v{definition.get('version', 1)}"))
+        if self.store.get_test(test_id) is None:
+            test = self._new_test(test_id=test_id, key=key, status='running', **_test_arguments(definition))
+            # Concurrent workers race on the same id; only the first insert lands
+            inserted = self.store.add_test(_test_to_record(test))
+            self._layers = None
+            if not inserted and self.store.get_test(test_id) is None:
+                return None
+        return test_id
+    
+    def ensure_default_tests(self) -> Dict[str, Optional[str]]:
+        """Ensure every test in DEFAULT_TESTS exists; returns key -> test id"""
+        return {key: self.ensure_test(key, definition) for key, definition in DEFAULT_TESTS.items()}
+    
+    def archive_inactive_tests(self, grace_days: float = 0, now: Optional[datetime] = None) -> List[str]:
+        """Move completed and expired tests to the archive
+        
+        A test is archived ``grace_days`` after it ended (its end_date, or
+        when it was stopped). Its results and assignments move with it, so
+        the active set only holds tests that can still receive traffic.
+        """
+        now = now or datetime.now()
+        cutoff = now - timedelta(days=grace_days)
+        finished = []
+        for test in (_test_from_record(record) for record in self.store.load_tests()):
+            ended_at = min(test.end_date, test.updated_at) if test.status == 'completed' else test.end_date
+            if ended_at <= cutoff:
+                test.status = 'completed'
+                finished.append(test)
+        
+        if finished:
+            self.store.archive_tests([_test_to_record(test) for test in finished])
+            for test in finished:
+                self.tests.pop(test.test_id, None)
+            self._layers = None
+            logger.info(f"Archived {len(finished)} finished A/B tests")
+        return [test.test_id for test in finished]
+    
+    def get_archived_tests(self) -> List[Dict[str, Any]]:
+        """Archived tests (reads the cold archive)"""
+        return self.store.load_archived_tests()
+    
+    def get_test(self, test_id: str) -> Optional[Dict[str, Any]]:
+        """Get a test's stored record (None when unknown or archived)"""
+        record = self.store.get_test(test_id)
+        return dict(record) if record is not None else None
     
     def get_all_tests(self) -> List[Dict[str, Any]]:
         """Get all tests with their status"""
-        tests_list = []
-        for test in self.tests.values():
-            test_dict = asdict(test)
-            test_dict['start_date'] = test.start_date.isoformat()
-            test_dict['end_date'] = test.end_date.isoformat()
-            test_dict['created_at'] = test.created_at.isoformat()
-            test_dict['updated_at'] = test.updated_at.isoformat()
-            tests_list.append(test_dict)
-        
-        return tests_list
+        # Stored records are already in the serialized form
+        return [dict(record) for record in self.store.load_tests()]
     
     def stop_test(self, test_id: str):
         """Stop a running test"""
-        if test_id not in self.tests:
-            raise ValueError(f"Test {test_id} not found")
-        
-        test = self.tests[test_id]
+        test = self._get_test(test_id)
         if test.status != 'running':
             raise ValueError(f"Test {test_id} is not running")
         
@@ -466,9 +714,136 @@ class ABTestingFramework:
         test.end_date = datetime.now()
         test.updated_at = datetime.now()
         
-        self._save_data()
+        self._save_test(test)
         print(f"Test {test_id} stopped successfully!")
 
+class ABResultWriter:
+    """Background writer that batches A/B result events off the request path
+    
+    Handlers call ``enqueue`` (non-blocking) and return immediately. A single
+    writer task drains the bounded queue, coalescing events that arrive
+    within ``flush_interval`` into one ``record_results`` call of at most
+    ``max_batch`` events. When the queue is full, new events are dropped and
+    counted rather than slowing down requests. ``stop`` drains everything
+    still queued.
+    """
+    
+    def __init__(self,
+                 framework: ABTestingFramework,
+                 max_queue: int = 10000,
+                 max_batch: int = 500,
+                 flush_interval: float = 0.5,
+                 run_blocking: Optional[Callable[..., Awaitable[Any]]] = None):
+        self.framework = framework
+        self.max_queue = max_queue
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        # Runs the blocking batch write; callers sharing the framework with
+        # other threads should pass an executor that serializes access
+        self.run_blocking = run_blocking or asyncio.to_thread
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._counters = {
+            'enqueued': 0,
+            'written': 0,
+            'rejected': 0,
+            'failed': 0,
+            'dropped': 0,
+            'batches': 0,
+            'last_batch_size': 0,
+            'max_batch_size': 0
+        }
+    
+    def start(self):
+        """Start the writer task on the running event loop"""
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._task = asyncio.get_running_loop().create_task(self._run())
+    
+    def enqueue(self, **event) -> bool:
+        """Queue a result (keyword arguments of record_result); False if dropped"""
+        if self._queue is None:
+            self._counters['dropped'] += 1
+            return False
+        
+        event.setdefault('timestamp', datetime.now())
+        try:
+            self._queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self._counters['dropped'] += 1
+            return False
+        
+        self._counters['enqueued'] += 1
+        return True
+    
+    async def stop(self):
+        """Flush all queued events and stop the writer task"""
+        if self._task is None:
+            return
+        await self._queue.put(None)
+        await self._task
+        self._task = None
+    
+    async def _run(self):
+        stopping = False
+        while not stopping:
+            event = await self._queue.get()
+            if event is None:
+                break
+            batch = [event]
+            
+            # Coalesce whatever arrives within the flush interval
+            deadline = asyncio.get_running_loop().time() + self.flush_interval
+            while len(batch) < self.max_batch:
+                try:
+                    if self._queue.empty():
+                        timeout = deadline - asyncio.get_running_loop().time()
+                        if timeout <= 0:
+                            break
+                        event = await asyncio.wait_for(self._queue.get(), timeout)
+                    else:
+                        event = self._queue.get_nowait()
+                except asyncio.TimeoutError:
+                    break
+                if event is None:
+                    stopping = True
+                    break
+                batch.append(event)
+            
+            await self._flush(batch)
+        
+        # Drain anything enqueued after the stop marker
+        remaining = []
+        while not self._queue.empty():
+            event = self._queue.get_nowait()
+            if event is not None:
+                remaining.append(event)
+        for start in range(0, len(remaining), self.max_batch):
+            await self._flush(remaining[start:start + self.max_batch])
+    
+    async def _flush(self, batch: List[Dict[str, Any]]):
+        try:
+            recorded = await self.run_blocking(self.framework.record_results, batch)
+        except Exception as e:
+            logger.error(f"Error writing A/B test results: {e}")
+            self._counters['failed'] += len(batch)
+            return
+        
+        self._counters['written'] += recorded
+        self._counters['rejected'] += len(batch) - recorded
+        self._counters['batches'] += 1
+        self._counters['last_batch_size'] = len(batch)
+        self._counters['max_batch_size'] = max(self._counters['max_batch_size'], len(batch))
+    
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth, batch sizes and dropped event counters"""
+        batches = self._counters['batches']
+        return {
+            'queue_depth': self._queue.qsize() if self._queue is not None else 0,
+            'max_queue': self.max_queue,
+            **self._counters,
+            'average_batch_size': (self._counters['written'] + self._counters['rejected']) / batches if batches else 0
+        }
+
 # Example usage and testing
 if __name__ == "__main__":
     # Initialize A/B testing framework
@@ -0,0 +1,110 @@
+"""
+Adaptive Traffic Allocation for EduNiti AI Engine
+Thompson-sampling variant weights from posterior distributions over streamed A/B results
+"""
+
+from typing import Dict, List, Any, Optional, Tuple
+
+import numpy as np
+
+ALLOCATION_MODES = ('thompson',)
+METRIC_TYPES = ('rate', 'continuous')
+
+DEFAULT_ALLOCATION = {
+    'mode': 'thompson',
+    'metric': None,          # reward metric; defaults to the test's first metric
+    'metric_type': 'rate',   # 'rate' (Beta posterior, values in [0, 1]) or 'continuous' (Normal-Gamma)
+    'maximize': True,        # False for metrics where lower is better (bounce_rate)
+    'update_interval': 300,  # seconds between weight updates
+    'min_share': 0.05,       # exploration floor per variant
+    'samples': 10000         # posterior draws per update
+}
+
+def allocation_config(allocation: Dict[str, Any], traffic_split: List[float], metrics: List[str]) -> Dict[str, Any]:
+    """Validate an allocation setting and fill in defaults; weights start at the traffic split"""
+    unknown = set(allocation) - set(DEFAULT_ALLOCATION)
+    if unknown:
+        raise ValueError(f"Unknown allocation settings: {sorted(unknown)}")
+    config = {**DEFAULT_ALLOCATION, **allocation}
+    if config['mode'] not in ALLOCATION_MODES:
+        raise ValueError(f"Allocation mode must be one of {ALLOCATION_MODES}")
+    if config['metric_type'] not in METRIC_TYPES:
+        raise ValueError(f"Allocation metric_type must be one of {METRIC_TYPES}")
+    config['metric'] = config['metric'] or (metrics[0] if metrics else None)
+    if config['metric'] is None:
+        raise ValueError("Adaptive allocation needs a reward metric")
+    if not 0 <= config['min_share'] * len(traffic_split) <= 1:
+        raise ValueError("min_share times the number of variants must be between 0 and 1")
+    if config['update_interval'] < 0 or config['samples'] < 1:
+        raise ValueError("update_interval must be >= 0 and samples >= 1")
+    config.update({'weights': list(traffic_split), 'win_probability': None, 'observations': None, 'updated_at': None})
+    return config
+
+def beta_samples(n: np.ndarray, sums: np.ndarray, samples: int, rng: np.random.Generator) -> np.ndarray:
+    """Draws (variants x samples) of each variant's rate from a Beta(1 + successes, 1 + failures) posterior
+
+    Fractional values count as partial successes.
+    """
+    return rng.beta(1 + sums[:, None], 1 + (n - sums)[:, None], size=(len(n), samples))
+
+def normal_gamma_samples(n: np.ndarray, sums: np.ndarray, sumsq: np.ndarray, samples: int,
+                         rng: np.random.Generator) -> np.ndarray:
+    """Draws (variants x samples) of each variant's mean from a Normal-Gamma posterior
+
+    The prior is centred on the pooled mean with one pseudo-observation and
+    the pooled variance as prior scale, so it is weak but on the metric's scale.
+    """
+    total = n.sum()
+    pooled_mean = sums.sum() / total if total else 0.0
+    pooled_var = sumsq.sum() / total - pooled_mean ** 2 if total else 1.0
+    kappa0, alpha0, beta0 = 1.0, 1.0, pooled_var if pooled_var > 0 else 1.0
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        means = np.where(n > 0, sums / n, pooled_mean)
+    squared_error = np.maximum(sumsq - n * means ** 2, 0)
+    kappa = kappa0 + n
+    mu = (kappa0 * pooled_mean + n * means) / kappa
+    alpha = alpha0 + n / 2
+    beta = beta0 + squared_error / 2 + kappa0 * n * (means - pooled_mean) ** 2 / (2 * kappa)
+
+    precision = rng.gamma(alpha[:, None], 1 / beta[:, None], size=(len(n), samples))
+    return rng.normal(mu[:, None], 1 / np.sqrt(kappa[:, None] * precision))
+
+def thompson_weights(n: np.ndarray, sums: np.ndarray, sumsq: np.ndarray, config: Dict[str, Any],
+                     rng: Optional[np.random.Generator] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """Probability each variant is best and the resulting weights (with the exploration floor)"""
+    rng = rng or np.random.default_rng()
+    if config['metric_type'] == 'rate':
+        draws = beta_samples(n, sums, config['samples'], rng)
+    else:
+        draws = normal_gamma_samples(n, sums, sumsq, config['samples'], rng)
+    best = draws.argmax(axis=0) if config['maximize'] else draws.argmin(axis=0)
+    win_probability = np.bincount(best, minlength=len(n)) / config['samples']
+    floor = config['min_share']
+    return win_probability, floor + (1 - floor * len(n)) * win_probability
+
+if __name__ == "__main__":
+    import time
+
+    rng = np.random.default_rng(5)
+    config = allocation_config({}, [0.4, 0.3, 0.3], ['click_through_rate'])
+    true_rates = np.array([0.10, 0.12, 0.20])
+    n = np.zeros(3)
+    sums = np.zeros(3)
+    weights = np.array(config['weights'])
+    print("Simulated rollout, weights recomputed after every 1000 users")
+    for step in range(10):
+        variants = rng.choice(3, size=1000, p=weights / weights.sum())
+        clicks = rng.random(1000) < true_rates[variants]
+        n += np.bincount(variants, minlength=3)
+        sums += np.bincount(variants, weights=clicks, minlength=3)
+        start = time.perf_counter()
+        win, weights = thompson_weights(n, sums, sums, config, rng)
+        elapsed = (time.perf_counter() - start) * 1000
+        print(f"  after {int(n.sum()):5d}: weights {np.round(weights, 3)} ({elapsed:.2f} ms)")
+
+    continuous = allocation_config({'metric_type': 'continuous'}, [0.5, 0.5], ['user_satisfaction'])
+    values = [rng.normal(3.6, 0.8, 400), rng.normal(3.9, 0.8, 400)]
+    stats = [np.array([len(v) for v in values]), np.array([v.sum() for v in values]),
+             np.array([(v ** 2).sum() for v in values])]
+    print("Normal-Gamma (satisfaction 3.6 vs 3.9):", np.round(thompson_weights(*stats, continuous, rng)[1], 3))
@@ -0,0 +1,302 @@
+"""
+Benchmark Suite for EduNiti AI Engine
+Latency, throughput and peak memory of the recommendation, A/B testing and feedback hot paths
+"""
+
+import argparse
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, List, Any, Callable, Optional
+
+import numpy as np
+import pandas as pd
+
+# Benchmarks score inline so that timings measure the hot path itself
+os.environ.setdefault('SCORING_EXECUTION_MODE', 'inline')
+
+from data_generator import DatasetGenerator
+from serialization import dump_file, load_file
+
+SUBJECTS = ['Physics', 'Chemistry', 'Mathematics', 'Biology', 'History', 'Geography', 'Economics',
+            'Accountancy', 'Political Science', 'Literature', 'Computer Science', 'Psychology']
+PROFILE_POOL_SIZE = 1000
+
+class Benchmark:
+    """A named hot path measured at a given scale
+
+    ``setup(scale, context)`` returns the state passed to ``run(state, i)``;
+    ``group`` names the shared setup (e.g. the catalogue) it depends on.
+    """
+
+    def __init__(self, name: str, run: Callable[[Any, int], Any], setup: Callable[[int, Dict], Any], group: str):
+        self.name = name
+        self.run = run
+        self.setup = setup
+        self.group = group
+
+def build_profiles(scale: int, seed: int) -> List[Any]:
+    """User profiles drawn from generated student outcomes"""
+    from main_production import UserProfile
+
+    students = DatasetGenerator(seed=seed).generate_student_outcomes_dataset(min(scale, PROFILE_POOL_SIZE))
+    return [
+        UserProfile(
+            user_id=student['id'],
+            age=int(student['age']),
+            class_level=student['class_level'],
+            stream=student['recommended_stream'],
+            interests=list(student['interests']),
+            location={'state': student['state']},
+            quiz_scores=dict(student['quiz_scores']),
+            personality_traits=dict(student['personality_traits']),
+            family_income=int(student['family_income']),
+            parent_education=student['parent_education']
+        )
+        for _, student in students.iterrows()
+    ]
+
+def build_stream_catalogue(scale: int, careers: pd.DataFrame, seed: int) -> pd.DataFrame:
+    """Synthetic stream definitions (generated datasets carry none)"""
+    rng = random.Random(seed)
+    career_names = careers['name'].astype(str).tolist() if 'name' in careers else ['Engineer']
+    return pd.DataFrame([
+        {
+            'stream': f'stream_{i}',
+            'subjects': rng.sample(SUBJECTS, rng.randint(2, 5)),
+            'careers': rng.sample(career_names, min(len(career_names), rng.randint(2, 5))),
+            'description': f'Synthetic stream {i}'
+        }
+        for i in range(scale)
+    ])
+
+def setup_catalogue(scale: int, context: Dict) -> Dict[str, Any]:
+    """Install a generated catalogue of ``scale`` colleges/careers/streams into main_production"""
+    import main_production
+
+    generator = DatasetGenerator(seed=context['seed'])
+    main_production.college_data = generator.generate_colleges_dataset(scale)
+    main_production.career_data = generator.generate_careers_dataset(scale)
+    main_production.stream_data = build_stream_catalogue(scale, main_production.career_data, context['seed'])
+    main_production.catalogue_reloaded(f'benchmark-{scale}')
+    return {'module': main_production, 'profiles': build_profiles(scale, context['seed'])}
+
+def setup_ab_history(scale: int, context: Dict) -> Dict[str, Any]:
+    """A/B framework with ``scale`` stored assignments and results"""
+    from ab_testing import ABTestingFramework
+    from ab_store import create_experiment_store
+
+    data_dir = tempfile.mkdtemp(prefix='ab_bench_')
+    store = create_experiment_store(os.getenv('AB_STORE_BACKEND', 'json'), data_dir)
+    framework = ABTestingFramework(data_dir=data_dir, store=store)
+    test_id = framework.create_recommendation_test()
+    framework.start_test(test_id)
+    variants = [variant['name'] for variant in framework.tests[test_id].variants]
+
+    profiles = [profile.dict() for profile in build_profiles(scale, context['seed'])]
+    rng = random.Random(context['seed'])
+    now = datetime.now()
+    assignments, results = {}, []
+    for i in range(scale):
+        user_id = f'history_user_{i}'
+        variant = variants[i % len(variants)]
+        assignments[user_id] = variant
+        results.append({
+            'result_id': str(uuid.UUID(int=rng.getrandbits(128))),
+            'test_id': test_id,
+            'user_id': user_id,
+            'variant': variant,
+            'timestamp': (now - timedelta(seconds=i)).isoformat(),
+            'metrics': {'recommendation_accuracy': rng.random(), 'user_satisfaction': rng.uniform(1, 5)},
+            'user_profile': profiles[i % len(profiles)],
+            'recommendation_data': {'recommendations': [{'stream': 'science', 'confidence': rng.random()}]}
+        })
+    store.assign_many(test_id, assignments)
+    store.add_results(results)
+    return {'framework': framework, 'test_id': test_id, 'profiles': profiles, 'history_size': scale}
+
+def setup_feedback_history(scale: int, context: Dict) -> Dict[str, Any]:
+    """Feedback system with ``scale`` stored feedback items from the last 30 days"""
+    from feedback_system import FeedbackSystem, Feedback
+
+    system = FeedbackSystem(data_dir=tempfile.mkdtemp(prefix='feedback_bench_'))
+    rng = random.Random(context['seed'])
+    now = datetime.now()
+    types = ['recommendation', 'quiz', 'college', 'career', 'general']
+    for i in range(scale):
+        system.feedback_data.append(Feedback(
+            feedback_id=str(uuid.UUID(int=rng.getrandbits(128))),
+            user_id=f'history_user_{i}',
+            session_id=f'session_{i}',
+            feedback_type=types[i % len(types)],
+            rating=rng.randint(1, 5),
+            comment=rng.choice([None, 'Helpful recommendations', 'Not relevant to me']),
+            context={'feature': f'feature_{i % 10}'},
+            timestamp=now - timedelta(seconds=rng.randint(0, 29 * 24 * 3600))
+        ))
+    system._save_data()
+    return {'system': system}
+
+def _profile(state: Dict, i: int):
+    return state['profiles'][i % len(state['profiles'])]
+
+BENCHMARKS = [
+    Benchmark('stream_recommendations',
+              lambda state, i: state['module'].calculate_advanced_stream_recommendation(_profile(state, i)),
+              setup_catalogue, 'catalogue'),
+    Benchmark('college_recommendations',
+              lambda state, i: state['module'].calculate_advanced_college_recommendations(_profile(state, i), 10),
+              setup_catalogue, 'catalogue'),
+    Benchmark('career_recommendations',
+              lambda state, i: state['module'].calculate_advanced_career_recommendations(_profile(state, i)),
+              setup_catalogue, 'catalogue'),
+    Benchmark('assign_user_to_variant',
+              lambda state, i: state['framework'].assign_user_to_variant(f'bench_user_{i}', state['test_id']),
+              setup_ab_history, 'ab_history'),
+    Benchmark('record_result',
+              lambda state, i: state['framework'].record_result(
+                  state['test_id'], f"history_user_{i % state['history_size']}",
+                  {'recommendation_accuracy': 0.8, 'user_satisfaction': 4.0},
+                  state['profiles'][i % len(state['profiles'])],
+                  {'recommendations': []}),
+              setup_ab_history, 'ab_history'),
+    Benchmark('get_test_results',
+              lambda state, i: state['framework'].get_test_results(state['test_id']),
+              setup_ab_history, 'ab_history'),
+    Benchmark('submit_feedback',
+              lambda state, i: state['system'].submit_feedback(
+                  f'bench_user_{i}', f'bench_session_{i}', 'recommendation', i % 5 + 1, 'Benchmark feedback'),
+              setup_feedback_history, 'feedback_history'),
+    Benchmark('get_feedback_summary',
+              lambda state, i: state['system'].get_feedback_summary(),
+              setup_feedback_history, 'feedback_history'),
+]
+
+def measure(benchmark: Benchmark, state: Any, min_time: float, min_iterations: int,
+            max_iterations: int, memory_iterations: int) -> Dict[str, Any]:
+    """Time ``benchmark.run`` until ``min_time`` has elapsed, then measure peak memory"""
+    latencies = []
+    started = time.perf_counter()
+    i = 0
+    while i < max_iterations and (i < min_iterations or time.perf_counter() - started < min_time):
+        start = time.perf_counter()
+        benchmark.run(state, i)
+        latencies.append(time.perf_counter() - start)
+        i += 1
+
+    # Memory is measured separately: tracemalloc slows allocation-heavy code
+    tracemalloc.start()
+    baseline, _ = tracemalloc.get_traced_memory()
+    for j in range(memory_iterations):
+        benchmark.run(state, i + j)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    values = np.array(latencies) * 1000
+    return {
+        'iterations': len(latencies),
+        'mean_ms': float(values.mean()),
+        'p50_ms': float(np.percentile(values, 50)),
+        'p95_ms': float(np.percentile(values, 95)),
+        'min_ms': float(values.min()),
+        'ops_per_sec': float(len(values) / values.sum() * 1000) if values.sum() else 0.0,
+        'peak_memory_kb': (peak - baseline) / 1024
+    }
+
+def run_suite(scales: List[int], names: Optional[List[str]], seed: int, min_time: float,
+              min_iterations: int, max_iterations: int, memory_iterations: int) -> Dict[str, Dict[str, Any]]:
+    """Run the selected benchmarks at every scale"""
+    selected = [benchmark for benchmark in BENCHMARKS if not names or benchmark.name in names]
+    results = {}
+    for scale in scales:
+        states: Dict[str, Any] = {}
+        for benchmark in selected:
+            setup_time = 0.0
+            if benchmark.group not in states:
+                start = time.perf_counter()
+                states[benchmark.group] = benchmark.setup(scale, {'seed': seed})
+                setup_time = time.perf_counter() - start
+                print(f"[scale {scale}] {benchmark.group} setup: {setup_time:.1f}s", flush=True)
+
+            result = measure(benchmark, states[benchmark.group], min_time, min_iterations,
+                             max_iterations, memory_iterations)
+            result.update({'benchmark': benchmark.name, 'scale': scale})
+            results[f'{benchmark.name}@{scale}'] = result
+            print(f"  {benchmark.name:26s} p50={result['p50_ms']:10.3f}ms p95={result['p95_ms']:10.3f}ms "
+                  f"{result['ops_per_sec']:10.1f} ops/s peak={result['peak_memory_kb']:10.1f}KB "
+                  f"(n={result['iterations']})", flush=True)
+        states.clear()
+    return results
+
+def git_commit() -> Optional[str]:
+    """Current commit of the working tree, if available"""
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Dict[str, Any]],
+            threshold: float, metric: str = 'p50_ms') -> List[str]:
+    """Benchmarks whose ``metric`` grew by more than ``threshold`` (a fraction) over the baseline"""
+    regressions = []
+    for key, result in results.items():
+        previous = baseline.get(key)
+        if not previous or not previous.get(metric):
+            continue
+        change = result[metric] / previous[metric] - 1
+        marker = 'REGRESSION' if change > threshold else ''
+        print(f"  {key:36s} {previous[metric]:10.3f}ms -> {result[metric]:10.3f}ms {change:+8.1%} {marker}")
+        if change > threshold:
+            regressions.append(key)
+    return regressions
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the recommendation, A/B testing and feedback hot paths")
+    parser.add_argument('--scales', type=int, nargs='+', default=[1000, 10000],
+                        help="Catalogue/history sizes (100000 and 1000000 take minutes to set up)")
+    parser.add_argument('--benchmarks', nargs='+', choices=[benchmark.name for benchmark in BENCHMARKS],
+                        help="Subset of benchmarks to run (default: all)")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--min-time', type=float, default=1.0, help="Seconds to spend timing each benchmark")
+    parser.add_argument('--min-iterations', type=int, default=3)
+    parser.add_argument('--max-iterations', type=int, default=1000)
+    parser.add_argument('--memory-iterations', type=int, default=3, help="Calls traced for peak memory")
+    parser.add_argument('--output', default='benchmark_results.json', help="Where to write the results")
+    parser.add_argument('--baseline', help="Results file from an earlier commit to compare against")
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help="Allowed p50 slowdown against the baseline before failing (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    results = run_suite(args.scales, args.benchmarks, args.seed, args.min_time,
+                        args.min_iterations, args.max_iterations, args.memory_iterations)
+
+    dump_file({
+        'metadata': {
+            'timestamp': datetime.now().isoformat(),
+            'git_commit': git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'scales': args.scales,
+            'seed': args.seed,
+            'ab_store': os.getenv('AB_STORE_BACKEND', 'json')
+        },
+        'results': results
+    }, args.output, pretty=True)
+    print(f"Results written to {args.output}")
+
+    if args.baseline:
+        baseline = load_file(args.baseline)
+        print(f"Comparison with {args.baseline} (commit {baseline['metadata'].get('git_commit')}):")
+        regressions = compare(results, baseline['results'], args.threshold)
+        if regressions:
+            print(f"{len(regressions)} benchmark(s) regressed by more than {args.threshold:.0%}")
+            sys.exit(1)
+        print("No regressions")
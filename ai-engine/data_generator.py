@@ -6,13 +6,47 @@ Generates comprehensive datasets for colleges, careers, and student outcomes
 import pandas as pd
 import numpy as np
 import json
+import ast
+import hashlib
+import uuid
 import random
 from datetime import datetime, timedelta
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Sequence, Union
+from concurrent.futures import ProcessPoolExecutor
 import os
 
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+DATASET_NAMES = ('colleges', 'careers', 'student_outcomes')
+
+# File extension per output format. 'parquet' and 'arrow' keep nested
+# list/struct columns typed; 'ndjson' is gzip-compressed JSON lines.
+FORMAT_EXTENSIONS = {
+    'parquet': 'parquet',
+    'arrow': 'arrow',
+    'csv': 'csv',
+    'ndjson': 'ndjson.gz',
+    'json': 'json'
+}
+DATASET_FORMATS = tuple(FORMAT_EXTENSIONS)
+DEFAULT_FORMATS = ('parquet',) if PYARROW_AVAILABLE else ('csv',)
+
 class DatasetGenerator:
-    def __init__(self):
+    def __init__(self,
+                 seed: Optional[Union[int, np.random.SeedSequence]] = None,
+                 generated_at: Optional[str] = None):
+        # Every random draw goes through this instance so that a seeded
+        # generator (or one shard of a sharded run) is fully reproducible.
+        if isinstance(seed, np.random.SeedSequence):
+            seed = int(seed.generate_state(1, dtype=np.uint64)[0])
+        self._random = random.Random(seed)
+        self.generated_at = generated_at
+        
         self.states = [
             'Andhra Pradesh', 'Arunachal Pradesh', 'Assam', 'Bihar', 'Chhattisgarh',
             'Goa', 'Gujarat', 'Haryana', 'Himachal Pradesh', 'Jharkhand', 'Karnataka',
@@ -24,9 +58,17 @@ class DatasetGenerator:
         
         self.streams = ['science', 'arts', 'commerce', 'engineering', 'medical', 'vocational']
         self.career_categories = ['technology', 'healthcare', 'education', 'business', 'government', 'creative', 'research']
+    
+    def _now(self) -> str:
+        """Timestamp for created_at/updated_at fields"""
+        return self.generated_at or datetime.now().isoformat()
         
-    def generate_colleges_dataset(self, num_colleges: int = 1000) -> pd.DataFrame:
-        """Generate comprehensive college dataset"""
+    def generate_colleges_dataset(self, num_colleges: int = 1000, start: int = 0) -> pd.DataFrame:
+        """Generate comprehensive college dataset
+
+        ``start`` offsets the generated rows so that shards of a larger dataset
+        carry globally unique ids.
+        """
         colleges = []
         
         # Major Indian universities and colleges
@@ -51,65 +93,65 @@ class DatasetGenerator:
         # Generate additional colleges
         college_types = ['State University', 'Private University', 'Deemed University', 'Central University', 'Engineering College', 'Medical College', 'Arts College', 'Commerce College']
         
-        for i in range(num_colleges):
+        for i in range(start, start + num_colleges):
             if i < len(major_colleges):
                 college = major_colleges[i].copy()
             else:
                 college = {
-                    'name': f'{random.choice(college_types)} {i+1}',
-                    'type': random.choice(college_types),
-                    'state': random.choice(self.states),
-                    'tier': random.choices(['Tier 1', 'Tier 2', 'Tier 3'], weights=[0.1, 0.3, 0.6])[0]
+                    'name': f'{self._random.choice(college_types)} {i+1}',
+                    'type': self._random.choice(college_types),
+                    'state': self._random.choice(self.states),
+                    'tier': self._random.choices(['Tier 1', 'Tier 2', 'Tier 3'], weights=[0.1, 0.3, 0.6])[0]
                 }
             
             # Generate additional attributes
             college.update({
                 'id': f'college_{i+1}',
-                'established_year': random.randint(1950, 2020),
-                'accreditation': random.choices(['NAAC A++', 'NAAC A+', 'NAAC A', 'NAAC B++', 'NAAC B'], weights=[0.05, 0.15, 0.3, 0.3, 0.2])[0],
-                'total_students': random.randint(1000, 50000),
-                'faculty_count': random.randint(50, 2000),
-                'campus_size': random.randint(10, 1000),  # acres
-                'hostel_facility': random.choice([True, False]),
-                'library_books': random.randint(10000, 500000),
-                'research_centers': random.randint(0, 20),
-                'placement_percentage': random.uniform(60, 98),
-                'average_package': random.randint(300000, 2000000),
-                'highest_package': random.randint(500000, 5000000),
+                'established_year': self._random.randint(1950, 2020),
+                'accreditation': self._random.choices(['NAAC A++', 'NAAC A+', 'NAAC A', 'NAAC B++', 'NAAC B'], weights=[0.05, 0.15, 0.3, 0.3, 0.2])[0],
+                'total_students': self._random.randint(1000, 50000),
+                'faculty_count': self._random.randint(50, 2000),
+                'campus_size': self._random.randint(10, 1000),  # acres
+                'hostel_facility': self._random.choice([True, False]),
+                'library_books': self._random.randint(10000, 500000),
+                'research_centers': self._random.randint(0, 20),
+                'placement_percentage': self._random.uniform(60, 98),
+                'average_package': self._random.randint(300000, 2000000),
+                'highest_package': self._random.randint(500000, 5000000),
                 'fees_range': {
-                    'min': random.randint(10000, 200000),
-                    'max': random.randint(50000, 500000)
+                    'min': self._random.randint(10000, 200000),
+                    'max': self._random.randint(50000, 500000)
                 },
                 'programs': self._generate_programs(),
                 'facilities': self._generate_facilities(),
                 'location': {
                     'city': f'City {i+1}',
                     'state': college['state'],
-                    'pincode': random.randint(100000, 999999),
-                    'latitude': random.uniform(6.0, 37.0),
-                    'longitude': random.uniform(68.0, 97.0)
+                    'pincode': self._random.randint(100000, 999999),
+                    'latitude': self._random.uniform(6.0, 37.0),
+                    'longitude': self._random.uniform(68.0, 97.0)
                 },
                 'contact': {
-                    'phone': f'+91-{random.randint(1000000000, 9999999999)}',
+                    'phone': f'+91-{self._random.randint(1000000000, 9999999999)}',
                     'email': f'info@{college["name"].lower().replace(" ", "")}.edu.in',
                     'website': f'https://www.{college["name"].lower().replace(" ", "")}.edu.in'
                 },
                 'cut_off_percentages': {
-                    'general': random.uniform(60, 95),
-                    'obc': random.uniform(55, 90),
-                    'sc': random.uniform(50, 85),
-                    'st': random.uniform(45, 80)
+                    'general': self._random.uniform(60, 95),
+                    'obc': self._random.uniform(55, 90),
+                    'sc': self._random.uniform(50, 85),
+                    'st': self._random.uniform(45, 80)
                 },
-                'entrance_exams': random.sample(['JEE Main', 'NEET', 'CUET', 'GATE', 'CAT', 'MAT', 'XAT'], random.randint(1, 4)),
-                'scholarships_available': random.choice([True, False]),
-                'international_programs': random.choice([True, False]),
-                'alumni_network': random.randint(1000, 100000),
-                'industry_partnerships': random.randint(0, 50),
-                'research_publications': random.randint(0, 1000),
-                'ranking_nirf': random.randint(1, 200) if random.random() < 0.3 else None,
-                'ranking_times': random.randint(1, 500) if random.random() < 0.2 else None,
-                'created_at': datetime.now().isoformat(),
-                'updated_at': datetime.now().isoformat()
+                'entrance_exams': self._random.sample(['JEE Main', 'NEET', 'CUET', 'GATE', 'CAT', 'MAT', 'XAT'], self._random.randint(1, 4)),
+                'scholarships_available': self._random.choice([True, False]),
+                'international_programs': self._random.choice([True, False]),
+                'alumni_network': self._random.randint(1000, 100000),
+                'industry_partnerships': self._random.randint(0, 50),
+                'research_publications': self._random.randint(0, 1000),
+                'ranking_nirf': self._random.randint(1, 200) if self._random.random() < 0.3 else None,
+                'ranking_times': self._random.randint(1, 500) if self._random.random() < 0.2 else None,
+                'created_at': self._now(),
+                'updated_at': self._now()
             })
             
             colleges.append(college)
@@ -120,28 +162,28 @@ class DatasetGenerator:
         """Generate programs offered by college"""
         programs = []
         program_types = [
-            {'name': 'B.Tech', 'duration': 4, 'stream': 'engineering', 'fees': random.randint(100000, 300000)},
-            {'name': 'B.Sc', 'duration': 3, 'stream': 'science', 'fees': random.randint(50000, 150000)},
-            {'name': 'B.A', 'duration': 3, 'stream': 'arts', 'fees': random.randint(30000, 100000)},
-            {'name': 'B.Com', 'duration': 3, 'stream': 'commerce', 'fees': random.randint(40000, 120000)},
-            {'name': 'MBBS', 'duration': 5, 'stream': 'medical', 'fees': random.randint(200000, 500000)},
-            {'name': 'B.Ed', 'duration': 2, 'stream': 'education', 'fees': random.randint(50000, 150000)},
-            {'name': 'M.Tech', 'duration': 2, 'stream': 'engineering', 'fees': random.randint(150000, 400000)},
-            {'name': 'M.Sc', 'duration': 2, 'stream': 'science', 'fees': random.randint(80000, 200000)},
-            {'name': 'M.A', 'duration': 2, 'stream': 'arts', 'fees': random.randint(60000, 150000)},
-            {'name': 'MBA', 'duration': 2, 'stream': 'business', 'fees': random.randint(200000, 800000)},
-            {'name': 'Ph.D', 'duration': 3, 'stream': 'research', 'fees': random.randint(50000, 200000)}
+            {'name': 'B.Tech', 'duration': 4, 'stream': 'engineering', 'fees': self._random.randint(100000, 300000)},
+            {'name': 'B.Sc', 'duration': 3, 'stream': 'science', 'fees': self._random.randint(50000, 150000)},
+            {'name': 'B.A', 'duration': 3, 'stream': 'arts', 'fees': self._random.randint(30000, 100000)},
+            {'name': 'B.Com', 'duration': 3, 'stream': 'commerce', 'fees': self._random.randint(40000, 120000)},
+            {'name': 'MBBS', 'duration': 5, 'stream': 'medical', 'fees': self._random.randint(200000, 500000)},
+            {'name': 'B.Ed', 'duration': 2, 'stream': 'education', 'fees': self._random.randint(50000, 150000)},
+            {'name': 'M.Tech', 'duration': 2, 'stream': 'engineering', 'fees': self._random.randint(150000, 400000)},
+            {'name': 'M.Sc', 'duration': 2, 'stream': 'science', 'fees': self._random.randint(80000, 200000)},
+            {'name': 'M.A', 'duration': 2, 'stream': 'arts', 'fees': self._random.randint(60000, 150000)},
+            {'name': 'MBA', 'duration': 2, 'stream': 'business', 'fees': self._random.randint(200000, 800000)},
+            {'name': 'Ph.D', 'duration': 3, 'stream': 'research', 'fees': self._random.randint(50000, 200000)}
         ]
         
         # Select random programs
-        selected_programs = random.sample(program_types, random.randint(3, 8))
+        selected_programs = self._random.sample(program_types, self._random.randint(3, 8))
         for program in selected_programs:
             programs.append({
                 **program,
                 'specializations': self._generate_specializations(program['name']),
                 'eligibility': self._generate_eligibility(program['name']),
-                'seats': random.randint(30, 300),
-                'cut_off': random.uniform(60, 95)
+                'seats': self._random.randint(30, 300),
+                'cut_off': self._random.uniform(60, 95)
             })
         
         return programs
@@ -159,15 +201,15 @@ class DatasetGenerator:
         }
         
         available_specs = specializations_map.get(program_name, ['General'])
-        return random.sample(available_specs, min(random.randint(1, 4), len(available_specs)))
+        return self._random.sample(available_specs, min(self._random.randint(1, 4), len(available_specs)))
     
     def _generate_eligibility(self, program_name: str) -> Dict:
         """Generate eligibility criteria for a program"""
         base_eligibility = {
-            'min_percentage': random.uniform(50, 85),
+            'min_percentage': self._random.uniform(50, 85),
             'required_subjects': [],
             'entrance_exam': None,
-            'age_limit': random.randint(17, 25)
+            'age_limit': self._random.randint(17, 25)
         }
         
         if program_name in ['B.Tech', 'M.Tech']:
@@ -177,7 +219,7 @@ class DatasetGenerator:
             base_eligibility['required_subjects'] = ['Biology', 'Physics', 'Chemistry']
             base_eligibility['entrance_exam'] = 'NEET'
         elif program_name == 'MBA':
-            base_eligibility['entrance_exam'] = random.choice(['CAT', 'MAT', 'XAT', 'GMAT'])
+            base_eligibility['entrance_exam'] = self._random.choice(['CAT', 'MAT', 'XAT', 'GMAT'])
         
         return base_eligibility
     
@@ -190,9 +232,9 @@ class DatasetGenerator:
             'Incubation Center', 'Placement Cell', 'Career Guidance', 'Alumni Network'
         ]
         
-        return random.sample(all_facilities, random.randint(5, 15))
+        return self._random.sample(all_facilities, self._random.randint(5, 15))
     
-    def generate_careers_dataset(self, num_careers: int = 500) -> pd.DataFrame:
+    def generate_careers_dataset(self, num_careers: int = 500, start: int = 0) -> pd.DataFrame:
         """Generate comprehensive career dataset"""
         careers = []
         
@@ -244,10 +286,7 @@ class DatasetGenerator:
             {'name': 'Biotechnologist', 'category': 'research', 'stream': 'science', 'growth_rate': 6.0, 'avg_salary': 800000, 'demand': 'medium'},
         ]
         
-        for i, template in enumerate(career_templates):
-            if i >= num_careers:
-                break
-                
+        for i, template in enumerate(career_templates[start:start + num_careers], start=start):
             career = template.copy()
             career.update({
                 'id': f'career_{i+1}',
@@ -265,25 +304,25 @@ class DatasetGenerator:
                 'duration_to_achieve': self._get_duration_to_achieve(career['name']),
                 'difficulty_level': self._get_difficulty_level(career['name']),
                 'work_environment': self._get_work_environment(career['category']),
-                'job_satisfaction': random.uniform(3.0, 5.0),
-                'work_life_balance': random.uniform(2.5, 5.0),
-                'stress_level': random.uniform(2.0, 5.0),
-                'remote_work_possibility': random.choice([True, False]),
-                'entrepreneurship_potential': random.uniform(2.0, 5.0),
+                'job_satisfaction': self._random.uniform(3.0, 5.0),
+                'work_life_balance': self._random.uniform(2.5, 5.0),
+                'stress_level': self._random.uniform(2.0, 5.0),
+                'remote_work_possibility': self._random.choice([True, False]),
+                'entrepreneurship_potential': self._random.uniform(2.0, 5.0),
                 'industry_trends': self._generate_industry_trends(career['category']),
                 'future_outlook': self._get_future_outlook(career['growth_rate']),
-                'created_at': datetime.now().isoformat(),
-                'updated_at': datetime.now().isoformat()
+                'created_at': self._now(),
+                'updated_at': self._now()
             })
             
             careers.append(career)
         
         # Generate additional careers if needed
         while len(careers) < num_careers:
-            base_career = random.choice(career_templates)
+            base_career = self._random.choice(career_templates)
             career = base_career.copy()
             career.update({
-                'id': f'career_{len(careers)+1}',
+                'id': f'career_{start + len(careers) + 1}',
                 'name': f'{base_career["name"]} (Specialized)',
                 'description': f'Specialized version of {base_career["name"]} with additional focus areas.',
                 'education_requirements': self._generate_education_requirements(base_career['name']),
@@ -299,15 +338,15 @@ class DatasetGenerator:
                 'duration_to_achieve': self._get_duration_to_achieve(base_career['name']),
                 'difficulty_level': self._get_difficulty_level(base_career['name']),
                 'work_environment': self._get_work_environment(base_career['category']),
-                'job_satisfaction': random.uniform(3.0, 5.0),
-                'work_life_balance': random.uniform(2.5, 5.0),
-                'stress_level': random.uniform(2.0, 5.0),
-                'remote_work_possibility': random.choice([True, False]),
-                'entrepreneurship_potential': random.uniform(2.0, 5.0),
+                'job_satisfaction': self._random.uniform(3.0, 5.0),
+                'work_life_balance': self._random.uniform(2.5, 5.0),
+                'stress_level': self._random.uniform(2.0, 5.0),
+                'remote_work_possibility': self._random.choice([True, False]),
+                'entrepreneurship_potential': self._random.uniform(2.0, 5.0),
                 'industry_trends': self._generate_industry_trends(base_career['category']),
                 'future_outlook': self._get_future_outlook(base_career['growth_rate']),
-                'created_at': datetime.now().isoformat(),
-                'updated_at': datetime.now().isoformat()
+                'created_at': self._now(),
+                'updated_at': self._now()
             })
             careers.append(career)
         
@@ -461,60 +500,60 @@ class DatasetGenerator:
         else:
             return 'Limited - Slow growth or declining demand'
     
-    def generate_student_outcomes_dataset(self, num_students: int = 10000) -> pd.DataFrame:
+    def generate_student_outcomes_dataset(self, num_students: int = 10000, start: int = 0) -> pd.DataFrame:
         """Generate student outcomes dataset for training ML models"""
         students = []
         
-        for i in range(num_students):
+        for i in range(start, start + num_students):
             # Generate student profile
             student = {
                 'id': f'student_{i+1}',
-                'age': random.randint(16, 25),
-                'gender': random.choice(['Male', 'Female', 'Other']),
-                'state': random.choice(self.states),
-                'class_level': random.choice(['10', '12', 'undergraduate', 'postgraduate']),
-                'family_income': random.randint(100000, 5000000),
-                'parent_education': random.choices(['Below 10th', '10th', '12th', 'Graduate', 'Post Graduate'], weights=[0.1, 0.2, 0.3, 0.3, 0.1])[0],
-                'interests': random.sample(['Mathematics', 'Science', 'Arts', 'Sports', 'Music', 'Technology', 'Business', 'Medicine'], random.randint(2, 5)),
+                'age': self._random.randint(16, 25),
+                'gender': self._random.choice(['Male', 'Female', 'Other']),
+                'state': self._random.choice(self.states),
+                'class_level': self._random.choice(['10', '12', 'undergraduate', 'postgraduate']),
+                'family_income': self._random.randint(100000, 5000000),
+                'parent_education': self._random.choices(['Below 10th', '10th', '12th', 'Graduate', 'Post Graduate'], weights=[0.1, 0.2, 0.3, 0.3, 0.1])[0],
+                'interests': self._random.sample(['Mathematics', 'Science', 'Arts', 'Sports', 'Music', 'Technology', 'Business', 'Medicine'], self._random.randint(2, 5)),
                 'personality_traits': {
-                    'extroversion': random.uniform(1, 5),
-                    'conscientiousness': random.uniform(1, 5),
-                    'openness': random.uniform(1, 5),
-                    'agreeableness': random.uniform(1, 5),
-                    'neuroticism': random.uniform(1, 5)
+                    'extroversion': self._random.uniform(1, 5),
+                    'conscientiousness': self._random.uniform(1, 5),
+                    'openness': self._random.uniform(1, 5),
+                    'agreeableness': self._random.uniform(1, 5),
+                    'neuroticism': self._random.uniform(1, 5)
                 },
                 'academic_performance': {
-                    'class_10_percentage': random.uniform(60, 95),
-                    'class_12_percentage': random.uniform(60, 95),
-                    'entrance_exam_score': random.uniform(50, 100),
-                    'overall_gpa': random.uniform(6.0, 10.0)
+                    'class_10_percentage': self._random.uniform(60, 95),
+                    'class_12_percentage': self._random.uniform(60, 95),
+                    'entrance_exam_score': self._random.uniform(50, 100),
+                    'overall_gpa': self._random.uniform(6.0, 10.0)
                 },
                 'quiz_scores': {
-                    'mathematics': random.uniform(3, 10),
-                    'science': random.uniform(3, 10),
-                    'arts': random.uniform(3, 10),
-                    'commerce': random.uniform(3, 10),
-                    'problem_solving': random.uniform(3, 10),
-                    'communication': random.uniform(3, 10),
-                    'creativity': random.uniform(3, 10),
-                    'leadership': random.uniform(3, 10)
+                    'mathematics': self._random.uniform(3, 10),
+                    'science': self._random.uniform(3, 10),
+                    'arts': self._random.uniform(3, 10),
+                    'commerce': self._random.uniform(3, 10),
+                    'problem_solving': self._random.uniform(3, 10),
+                    'communication': self._random.uniform(3, 10),
+                    'creativity': self._random.uniform(3, 10),
+                    'leadership': self._random.uniform(3, 10)
                 },
                 'recommended_stream': self._predict_stream(i),
                 'chosen_stream': self._predict_stream(i),  # In real data, this would be actual choice
                 'success_metrics': {
-                    'graduation_rate': random.uniform(0.7, 1.0),
-                    'placement_success': random.choice([True, False]),
-                    'salary_after_graduation': random.randint(200000, 2000000),
-                    'job_satisfaction': random.uniform(3.0, 5.0),
-                    'career_growth': random.uniform(2.0, 5.0)
+                    'graduation_rate': self._random.uniform(0.7, 1.0),
+                    'placement_success': self._random.choice([True, False]),
+                    'salary_after_graduation': self._random.randint(200000, 2000000),
+                    'job_satisfaction': self._random.uniform(3.0, 5.0),
+                    'career_growth': self._random.uniform(2.0, 5.0)
                 },
                 'feedback': {
-                    'recommendation_accuracy': random.uniform(0.6, 1.0),
-                    'user_satisfaction': random.uniform(3.0, 5.0),
-                    'would_recommend': random.choice([True, False])
+                    'recommendation_accuracy': self._random.uniform(0.6, 1.0),
+                    'user_satisfaction': self._random.uniform(3.0, 5.0),
+                    'would_recommend': self._random.choice([True, False])
                 },
-                'created_at': datetime.now().isoformat(),
-                'updated_at': datetime.now().isoformat()
+                'created_at': self._now(),
+                'updated_at': self._now()
             }
             
             students.append(student)
@@ -525,33 +564,297 @@ class DatasetGenerator:
         """Predict stream based on student characteristics (simplified model)"""
         # This is a simplified prediction - in real implementation, this would be based on ML model
         streams = ['science', 'arts', 'commerce', 'engineering', 'medical', 'vocational']
-        return random.choice(streams)
+        return self._random.choice(streams)
     
-    def save_datasets(self, output_dir: str = 'data'):
+    def save_datasets(self, output_dir: str = 'data', formats: Sequence[str] = DEFAULT_FORMATS):
         """Save all datasets to files"""
+        _check_formats(formats)
         os.makedirs(output_dir, exist_ok=True)
         
         print("Generating colleges dataset...")
         colleges_df = self.generate_colleges_dataset(1000)
-        colleges_df.to_csv(f'{output_dir}/colleges.csv', index=False)
-        colleges_df.to_json(f'{output_dir}/colleges.json', orient='records', indent=2)
+        write_dataset(colleges_df, f'{output_dir}/colleges', formats)
         
         print("Generating careers dataset...")
         careers_df = self.generate_careers_dataset(500)
-        careers_df.to_csv(f'{output_dir}/careers.csv', index=False)
-        careers_df.to_json(f'{output_dir}/careers.json', orient='records', indent=2)
+        write_dataset(careers_df, f'{output_dir}/careers', formats)
         
         print("Generating student outcomes dataset...")
         students_df = self.generate_student_outcomes_dataset(10000)
-        students_df.to_csv(f'{output_dir}/student_outcomes.csv', index=False)
-        students_df.to_json(f'{output_dir}/student_outcomes.json', orient='records', indent=2)
+        write_dataset(students_df, f'{output_dir}/student_outcomes', formats)
         
         print(f"All datasets saved to {output_dir}/")
         print(f"Colleges: {len(colleges_df)} records")
         print(f"Careers: {len(careers_df)} records")
         print(f"Student Outcomes: {len(students_df)} records")
+    
+    def save_sharded_datasets(self,
+                              output_dir: str = 'data',
+                              num_colleges: int = 1000,
+                              num_careers: int = 500,
+                              num_students: int = 10000,
+                              num_shards: int = 1,
+                              workers: Optional[int] = None,
+                              formats: Sequence[str] = DEFAULT_FORMATS,
+                              merge: bool = False,
+                              seed: Optional[int] = None) -> Dict[str, List[str]]:
+        """Generate and save all datasets in parallel shards
+        
+        Each dataset's row range is split into ``num_shards`` contiguous shards
+        which are generated and written by a process pool. Every shard draws from
+        its own ``SeedSequence`` child, so the output depends only on ``seed`` and
+        ``num_shards`` - never on ``workers``. With ``merge`` the shard files are
+        concatenated into one file per dataset and format afterwards.
+        
+        Returns the written file paths per dataset.
+        """
+        if num_shards < 1:
+            raise ValueError("Number of shards must be at least 1")
+        _check_formats(formats)
+        
+        os.makedirs(output_dir, exist_ok=True)
+        
+        root_seed = np.random.SeedSequence(seed)
+        dataset_seeds = root_seed.spawn(len(DATASET_NAMES))
+        generated_at = self._now()
+        sizes = {
+            'colleges': num_colleges,
+            'careers': num_careers,
+            'student_outcomes': num_students
+        }
+        
+        # Build one task per non-empty shard
+        tasks = []
+        for name, dataset_seed in zip(DATASET_NAMES, dataset_seeds):
+            shard_seeds = dataset_seed.spawn(num_shards)
+            for shard, (start, count) in enumerate(_shard_bounds(sizes[name], num_shards)):
+                if count == 0:
+                    continue
+                if num_shards == 1:
+                    path_stem = f'{output_dir}/{name}'
+                else:
+                    path_stem = f'{output_dir}/{name}-{shard:05d}-of-{num_shards:05d}'
+                tasks.append((name, start, count, shard_seeds[shard], generated_at, path_stem, tuple(formats)))
+        
+        print(f"Generating {len(tasks)} shards (seed entropy: {root_seed.entropy})...")
+        if workers == 1:
+            written = list(map(_generate_shard, tasks))
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                written = list(executor.map(_generate_shard, tasks))
+        
+        files = {name: [] for name in DATASET_NAMES}
+        for (name, _, _, _, _, path_stem, _), rows in zip(tasks, written):
+            files[name].extend(f'{path_stem}.{FORMAT_EXTENSIONS[fmt]}' for fmt in formats)
+        
+        if merge and num_shards > 1:
+            for name in DATASET_NAMES:
+                merged = []
+                for fmt in formats:
+                    extension = FORMAT_EXTENSIONS[fmt]
+                    shard_paths = [path for path in files[name] if path.endswith(f'.{extension}')]
+                    if not shard_paths:
+                        continue
+                    merged_path = f'{output_dir}/{name}.{extension}'
+                    _merge_shards(shard_paths, merged_path, fmt)
+                    for path in shard_paths:
+                        os.remove(path)
+                    merged.append(merged_path)
+                files[name] = merged
+        
+        print(f"All datasets saved to {output_dir}/")
+        for name in DATASET_NAMES:
+            print(f"{name}: {sizes[name]} records in {len(files[name])} files")
+        
+        return files
 
-if __name__ == "__main__":
-    generator = DatasetGenerator()
-    generator.save_datasets()
+_GENERATOR_METHODS = {
+    'colleges': 'generate_colleges_dataset',
+    'careers': 'generate_careers_dataset',
+    'student_outcomes': 'generate_student_outcomes_dataset'
+}
+
+def _shard_bounds(total: int, num_shards: int) -> List[tuple]:
+    """Split ``total`` rows into ``num_shards`` contiguous (start, count) ranges"""
+    base, extra = divmod(total, num_shards)
+    bounds = []
+    start = 0
+    for shard in range(num_shards):
+        count = base + (1 if shard < extra else 0)
+        bounds.append((start, count))
+        start += count
+    return bounds
+
+def _check_formats(formats: Sequence[str]):
+    """Validate requested output formats"""
+    for fmt in formats:
+        if fmt not in FORMAT_EXTENSIONS:
+            raise ValueError(f"Unsupported format: {fmt}")
+        if fmt in ('parquet', 'arrow') and not PYARROW_AVAILABLE:
+            raise ValueError(f"Format {fmt} requires pyarrow")
+
+def write_dataset(df: pd.DataFrame, path_stem: str, formats: Sequence[str] = DEFAULT_FORMATS):
+    """Write a dataset in each of the requested formats"""
+    _check_formats(formats)
+    for fmt in formats:
+        path = f'{path_stem}.{FORMAT_EXTENSIONS[fmt]}'
+        if fmt == 'parquet':
+            pq.write_table(pa.Table.from_pandas(df, preserve_index=False), path, compression='zstd')
+        elif fmt == 'arrow':
+            _write_arrow(pa.Table.from_pandas(df, preserve_index=False), path)
+        elif fmt == 'csv':
+            df.to_csv(path, index=False)
+        elif fmt == 'ndjson':
+            df.to_json(path, orient='records', lines=True, compression='gzip', double_precision=15)
+        elif fmt == 'json':
+            df.to_json(path, orient='records', indent=2)
+
+def _write_arrow(table, path: str):
+    """Write an uncompressed Arrow IPC file (memory-mappable on read)"""
+    with pa.OSFile(path, 'wb') as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+
+def _read_arrow_table(path: str):
+    """Read a Parquet or Arrow IPC file into a pyarrow Table"""
+    if path.endswith('.parquet'):
+        return pq.read_table(path)
+    with pa.memory_map(path, 'r') as source:
+        return pa.ipc.open_file(source).read_all()
+
+def find_dataset(data_dir: str, name: str) -> Optional[str]:
+    """Return the path of a saved dataset, preferring typed columnar formats"""
+    for fmt, extension in FORMAT_EXTENSIONS.items():
+        if fmt in ('parquet', 'arrow') and not PYARROW_AVAILABLE:
+            continue
+        path = f'{data_dir}/{name}.{extension}'
+        if os.path.exists(path):
+            return path
+    return None
+
+def read_dataset(path: str) -> pd.DataFrame:
+    """Read a dataset written by write_dataset
+    
+    Nested list/struct columns from Parquet and Arrow files come back as plain
+    Python lists and dicts, exactly as they were generated.
+    """
+    if path.endswith('.parquet') or path.endswith('.arrow'):
+        table = _read_arrow_table(path)
+        columns = {}
+        for column_name, column in zip(table.column_names, table.columns):
+            if pa.types.is_nested(column.type):
+                columns[column_name] = pd.Series(column.to_pylist(), dtype=object)
+            else:
+                columns[column_name] = column.to_pandas()
+        return pd.DataFrame(columns)
+    elif path.endswith('.ndjson.gz'):
+        return pd.read_json(path, orient='records', lines=True, compression='gzip', convert_dates=False)
+    elif path.endswith('.json'):
+        return pd.read_json(path, orient='records', convert_dates=False)
+    elif path.endswith('.csv'):
+        return _parse_nested_columns(pd.read_csv(path))
+    else:
+        raise ValueError(f"Unsupported dataset file: {path}")
+
+def _parse_nested_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """Turn CSV cells holding Python list/dict reprs back into lists and dicts"""
+    for column in df.columns:
+        if df[column].dtype.kind not in 'OSU':
+            continue
+        sample = df[column].dropna()
+        if sample.empty or not str(sample.iloc[0]).startswith(('[', '{')):
+            continue
+        df[column] = pd.Series(
+            [ast.literal_eval(value) if isinstance(value, str) else value for value in df[column]],
+            index=df.index, dtype=object
+        )
+    return df
+
+def load_dataset(data_dir: str, name: str) -> pd.DataFrame:
+    """Load a saved dataset by name from ``data_dir``"""
+    path = find_dataset(data_dir, name)
+    if path is None:
+        raise FileNotFoundError(f"No saved {name} dataset in {data_dir}")
+    return read_dataset(path)
+
+def dataset_version(paths: List[Optional[str]]) -> str:
+    """Version of the loaded dataset files, identical across workers and however the files are addressed"""
+    parts = []
+    for path in paths:
+        if not path or not os.path.exists(path):
+            return str(uuid.uuid4())
+        stat = os.stat(path)
+        parts.append(f"{os.path.basename(path)}:{stat.st_mtime_ns}:{stat.st_size}")
+    return hashlib.sha1('|'.join(parts).encode('utf-8')).hexdigest()[:16]
+
+def _generate_shard(task: tuple) -> int:
+    """Generate and write one shard (runs in a worker process)"""
+    name, start, count, seed, generated_at, path_stem, formats = task
+    generator = DatasetGenerator(seed=seed, generated_at=generated_at)
+    df = getattr(generator, _GENERATOR_METHODS[name])(count, start=start)
+    write_dataset(df, path_stem, formats)
+    return len(df)
 
+def _merge_shards(shard_paths: List[str], merged_path: str, fmt: str):
+    """Concatenate shard files (in shard order) into a single file"""
+    if fmt in ('parquet', 'arrow'):
+        # Shards may infer different types for all-null columns; promote them
+        table = pa.concat_tables([_read_arrow_table(path) for path in shard_paths],
+                                 promote_options='default')
+        if fmt == 'parquet':
+            pq.write_table(table, merged_path, compression='zstd')
+        else:
+            _write_arrow(table, merged_path)
+    elif fmt in ('csv', 'ndjson'):
+        with open(merged_path, 'wb') as out:
+            for i, path in enumerate(shard_paths):
+                with open(path, 'rb') as f:
+                    # Gzip members concatenate into a valid stream; CSV
+                    # shards each start with a header line
+                    if fmt == 'csv':
+                        header = f.readline()
+                        if i == 0:
+                            out.write(header)
+                    while True:
+                        chunk = f.read(1 << 20)
+                        if not chunk:
+                            break
+                        out.write(chunk)
+    else:
+        records = []
+        for path in shard_paths:
+            with open(path, 'r') as f:
+                records.extend(json.load(f))
+        with open(merged_path, 'w') as f:
+            json.dump(records, f, indent=2)
+
+if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Generate EduNiti datasets")
+    parser.add_argument('--output-dir', default='data', help="Directory to write datasets to")
+    parser.add_argument('--colleges', type=int, default=1000, help="Number of college rows")
+    parser.add_argument('--careers', type=int, default=500, help="Number of career rows")
+    parser.add_argument('--students', type=int, default=10000, help="Number of student outcome rows")
+    parser.add_argument('--shards', type=int, default=1, help="Number of shards per dataset")
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument('--formats', nargs='+', default=list(DEFAULT_FORMATS), choices=DATASET_FORMATS,
+                        help="Output formats")
+    parser.add_argument('--merge', action='store_true', help="Merge shard files into one file per dataset")
+    parser.add_argument('--seed', type=int, default=None, help="Root seed for reproducible output")
+    parser.add_argument('--generated-at', default=None,
+                        help="ISO timestamp for created_at/updated_at (default: now)")
+    args = parser.parse_args()
+    
+    generator = DatasetGenerator(generated_at=args.generated_at)
+    generator.save_sharded_datasets(
+        output_dir=args.output_dir,
+        num_colleges=args.colleges,
+        num_careers=args.careers,
+        num_students=args.students,
+        num_shards=args.shards,
+        workers=args.workers,
+        formats=args.formats,
+        merge=args.merge,
+        seed=args.seed
+    )
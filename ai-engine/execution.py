@@ -0,0 +1,223 @@
+"""
+Execution Layer for EduNiti AI Engine
+Runs CPU-bound scoring and blocking persistence off the asyncio event loop
+"""
+
+import asyncio
+import contextvars
+import functools
+import logging
+import multiprocessing
+import pickle
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import contextmanager
+from multiprocessing import shared_memory
+from typing import Dict, Iterator, List, Any, Optional, Callable, Tuple
+
+logger = logging.getLogger(__name__)
+
+EXECUTION_MODES = ('inline', 'thread', 'process')
+
+# Alignment of out-of-band array buffers in the shared catalogue block
+BUFFER_ALIGNMENT = 64
+
+# Shared blocks mapped by this (worker) process; installed arrays are views into them
+_attached: List[shared_memory.SharedMemory] = []
+
+class ExecutorSaturated(Exception):
+    """Raised when a bounded execution queue is full"""
+
+def _pack_catalogue(catalogue: Any) -> Tuple[shared_memory.SharedMemory, List[Tuple[int, int]]]:
+    """Pickle a catalogue into a new shared memory block: (block, [(offset, size), ...])
+
+    Pickle protocol 5 hands contiguous numpy buffers out of band; they are
+    copied into the block after the pickle stream, so workers can map them
+    instead of unpickling copies. The first layout entry is the stream.
+    """
+    buffers: List[pickle.PickleBuffer] = []
+    payload = pickle.dumps(catalogue, protocol=5, buffer_callback=buffers.append)
+    raw = [memoryview(payload)] + [buffer.raw() for buffer in buffers]
+
+    layout, offset = [], 0
+    for view in raw:
+        layout.append((offset, view.nbytes))
+        offset += -(-view.nbytes // BUFFER_ALIGNMENT) * BUFFER_ALIGNMENT
+    shm = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+    for (start, size), view in zip(layout, raw):
+        shm.buf[start:start + size] = view
+    for buffer in buffers:
+        buffer.release()
+    return shm, layout
+
+def _attach_catalogue(shm_name: str, layout: List[Tuple[int, int]], installer: Callable[[Any], None]):
+    """Process pool initializer: install the published catalogue from shared memory
+
+    Numeric arrays become read-only views of the shared block, which stays
+    mapped for the life of the worker; object columns are unpickled.
+    """
+    shm = shared_memory.SharedMemory(name=shm_name)
+    view = shm.buf.toreadonly()
+    (start, size), *buffers = layout
+    catalogue = pickle.loads(view[start:start + size], buffers=[view[offset:offset + length]
+                                                              for offset, length in buffers])
+    _attached.append(shm)
+    installer(catalogue)
+
+def _catalogue_executor(shm: shared_memory.SharedMemory, layout: List[Tuple[int, int]],
+                        installer: Callable[[Any], None], workers: Optional[int]) -> ProcessPoolExecutor:
+    """Spawned process pool whose workers install the catalogue packed into ``shm``"""
+    return ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=_attach_catalogue,
+        initargs=(shm.name, layout, installer)
+    )
+
+@contextmanager
+def catalogue_pool(catalogue: Any, installer: Callable[[Any], None],
+                   workers: Optional[int] = None) -> Iterator[ProcessPoolExecutor]:
+    """Process pool for offline tools whose workers install ``catalogue`` once via ``installer``
+
+    ``installer`` must be a module-level function. The catalogue is shared
+    the same way ExecutionLayer publishes it, and the block is released
+    when the pool has shut down.
+    """
+    shm, layout = _pack_catalogue(catalogue)
+    try:
+        with _catalogue_executor(shm, layout, installer, workers) as pool:
+            yield pool
+    finally:
+        shm.close()
+        shm.unlink()
+
+def _in_context(func: Callable, *args) -> Callable:
+    """Bind a call to the caller's context variables (e.g. request profiling) for a worker thread"""
+    return functools.partial(contextvars.copy_context().run, func, *args)
+
+class ExecutionLayer:
+    """Dispatches scoring to a worker pool and blocking I/O to a thread pool
+
+    ``mode`` selects where scoring runs: 'inline' on the event loop (the old
+    behaviour), 'thread' in a thread pool, or 'process' in a process pool whose
+    workers map the catalogue from a shared memory snapshot published with
+    ``publish_catalogue``. Both pools are bounded: once ``max_pending`` calls
+    are queued or running, new calls raise ExecutorSaturated so the caller can
+    shed load (HTTP 429) instead of queueing without limit.
+
+    Persistence runs on ``io_workers`` threads (one by default, which also
+    serializes access to the non-thread-safe A/B and feedback stores).
+    """
+
+    def __init__(self,
+                 mode: str = 'inline',
+                 scoring_workers: Optional[int] = None,
+                 max_pending: int = 64,
+                 io_workers: int = 1,
+                 max_pending_io: int = 256):
+        if mode not in EXECUTION_MODES:
+            raise ValueError(f"Execution mode must be one of {EXECUTION_MODES}")
+
+        self.mode = mode
+        self.scoring_workers = scoring_workers
+        self.max_pending = max_pending
+        self.max_pending_io = max_pending_io
+        self._scoring_pool: Optional[Executor] = None
+        self._io_pool = ThreadPoolExecutor(max_workers=io_workers, thread_name_prefix='io')
+        self._shm: Optional[shared_memory.SharedMemory] = None
+        self._pending = 0
+        self._pending_io = 0
+        self._counters = {
+            'scoring_calls': 0,
+            'io_calls': 0,
+            'scoring_rejected': 0,
+            'io_rejected': 0
+        }
+
+        if mode == 'thread':
+            self._scoring_pool = ThreadPoolExecutor(max_workers=scoring_workers, thread_name_prefix='scoring')
+
+    def publish_catalogue(self, catalogue: Dict[str, Any], installer: Callable[[Dict[str, Any]], None]):
+        """Make a (re)loaded catalogue available to scoring workers
+
+        In process mode the catalogue is written once into a shared memory
+        block and a fresh pool is started whose workers install it via
+        ``installer`` (a module-level function). Numeric arrays (score
+        columns, index postings, numeric DataFrame blocks) are shared by all
+        workers; object data such as strings and dicts is still unpickled by
+        each worker. Other modes share the caller's memory already, so this
+        is a no-op.
+        """
+        if self.mode != 'process':
+            return
+
+        shm, layout = _pack_catalogue(catalogue)
+
+        pool = _catalogue_executor(shm, layout, installer, self.scoring_workers)
+
+        old_pool, old_shm = self._scoring_pool, self._shm
+        self._scoring_pool, self._shm = pool, shm
+        if old_pool is not None:
+            # Let in-flight requests finish on the old snapshot before its
+            # shared memory is unlinked
+            threading.Thread(target=self._release, args=(old_pool, old_shm), daemon=True).start()
+        logger.info(f"Published {shm.size} byte catalogue snapshot to scoring workers "
+                    f"({len(layout) - 1} shared array buffers)")
+
+    async def run_scoring(self, func: Callable, *args) -> Any:
+        """Run a CPU-bound scoring function according to the execution mode"""
+        if self._scoring_pool is None:
+            self._counters['scoring_calls'] += 1
+            return func(*args)
+
+        if self._pending >= self.max_pending:
+            self._counters['scoring_rejected'] += 1
+            raise ExecutorSaturated("Scoring queue is full")
+
+        self._pending += 1
+        self._counters['scoring_calls'] += 1
+        try:
+            loop = asyncio.get_running_loop()
+            if self.mode == 'thread':
+                return await loop.run_in_executor(self._scoring_pool, _in_context(func, *args))
+            return await loop.run_in_executor(self._scoring_pool, func, *args)
+        finally:
+            self._pending -= 1
+
+    async def run_io(self, func: Callable, *args) -> Any:
+        """Run a blocking persistence call on the I/O thread pool"""
+        if self._pending_io >= self.max_pending_io:
+            self._counters['io_rejected'] += 1
+            raise ExecutorSaturated("I/O queue is full")
+
+        self._pending_io += 1
+        self._counters['io_calls'] += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._io_pool, _in_context(func, *args))
+        finally:
+            self._pending_io -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depths and call counters"""
+        return {
+            'mode': self.mode,
+            'scoring_pending': self._pending,
+            'io_pending': self._pending_io,
+            'max_pending': self.max_pending,
+            'max_pending_io': self.max_pending_io,
+            **self._counters
+        }
+
+    def shutdown(self):
+        """Stop both pools and release the shared catalogue snapshot"""
+        self._io_pool.shutdown(wait=True)
+        self._release(self._scoring_pool, self._shm)
+        self._scoring_pool, self._shm = None, None
+
+    def _release(self, pool: Optional[Executor], shm: Optional[shared_memory.SharedMemory]):
+        if pool is not None:
+            pool.shutdown(wait=True)
+        if shm is not None:
+            shm.close()
+            shm.unlink()
@@ -3,13 +3,14 @@ User Feedback System for EduNiti AI Engine
 Implements continuous feedback loops for model improvement
 """
 
-import json
 import uuid
 from typing import Dict, List, Any, Optional
 from datetime import datetime, timedelta
 from dataclasses import dataclass, asdict
 import pandas as pd
 import numpy as np
+from serialization import dump_file, load_file
+from instrumentation import timed_stage
 
 @dataclass
 class Feedback:
@@ -49,40 +50,24 @@ class FeedbackSystem:
         """Load existing feedback and analyses"""
         try:
             # Load feedback
-            with open(f'{self.data_dir}/feedback.json', 'r') as f:
-                feedback_data = json.load(f)
-                for item in feedback_data:
-                    feedback = Feedback(**item)
-                    feedback.timestamp = datetime.fromisoformat(feedback.timestamp)
-                    self.feedback_data.append(feedback)
+            feedback_data = load_file(f'{self.data_dir}/feedback.json')
+            for item in feedback_data:
+                feedback = Feedback(**item)
+                feedback.timestamp = datetime.fromisoformat(feedback.timestamp)
+                self.feedback_data.append(feedback)
             
             # Load analyses
-            with open(f'{self.data_dir}/feedback_analyses.json', 'r') as f:
-                analyses_data = json.load(f)
-                for item in analyses_data:
-                    analysis = FeedbackAnalysis(**item)
-                    analysis.timestamp = datetime.fromisoformat(analysis.timestamp)
-                    self.analyses.append(analysis)
+            analyses_data = load_file(f'{self.data_dir}/feedback_analyses.json')
+            for item in analyses_data:
+                analysis = FeedbackAnalysis(**item)
+                analysis.timestamp = datetime.fromisoformat(analysis.timestamp)
+                self.analyses.append(analysis)
                     
         except FileNotFoundError:
             # Files don't exist yet, start fresh
             pass
     
-    def _convert_numpy_types(self, obj):
-        """Convert numpy types to Python types for JSON serialization"""
-        if isinstance(obj, dict):
-            return {key: self._convert_numpy_types(value) for key, value in obj.items()}
-        elif isinstance(obj, list):
-            return [self._convert_numpy_types(item) for item in obj]
-        elif isinstance(obj, np.integer):
-            return int(obj)
-        elif isinstance(obj, np.floating):
-            return float(obj)
-        elif isinstance(obj, np.ndarray):
-            return obj.tolist()
-        else:
-            return obj
-    
+    @timed_stage('feedback_save_data')
     def _save_data(self):
         """Save feedback and analyses to files"""
         import os
@@ -93,24 +78,19 @@ class FeedbackSystem:
         for feedback in self.feedback_data:
             feedback_dict = asdict(feedback)
             feedback_dict['timestamp'] = feedback.timestamp.isoformat()
-            # Convert numpy types to Python types for JSON serialization
-            feedback_dict = self._convert_numpy_types(feedback_dict)
             feedback_data.append(feedback_dict)
         
-        with open(f'{self.data_dir}/feedback.json', 'w') as f:
-            json.dump(feedback_data, f, indent=2)
+        # numpy values are encoded natively by the shared serializer
+        dump_file(feedback_data, f'{self.data_dir}/feedback.json')
         
         # Save analyses
         analyses_data = []
         for analysis in self.analyses:
             analysis_dict = asdict(analysis)
             analysis_dict['timestamp'] = analysis.timestamp.isoformat()
-            # Convert numpy types to Python types for JSON serialization
-            analysis_dict = self._convert_numpy_types(analysis_dict)
             analyses_data.append(analysis_dict)
         
-        with open(f'{self.data_dir}/feedback_analyses.json', 'w') as f:
-            json.dump(analyses_data, f, indent=2)
+        dump_file(analyses_data, f'{self.data_dir}/feedback_analyses.json')
     
     def submit_feedback(self, 
                        user_id: str,
@@ -428,13 +408,11 @@ class FeedbackSystem:
             for feedback in self.feedback_data:
                 feedback_dict = asdict(feedback)
                 feedback_dict['timestamp'] = feedback.timestamp.isoformat()
-                # Convert numpy types to Python types for JSON serialization
-                feedback_dict = self._convert_numpy_types(feedback_dict)
                 feedback_data.append(feedback_dict)
             
+            # Exports are meant to be read by people, so they stay indented
             filename = f'{self.data_dir}/feedback_export_{datetime.now().strftime("%Y%m%d_%H%M%S")}.json'
-            with open(filename, 'w') as f:
-                json.dump(feedback_data, f, indent=2)
+            dump_file(feedback_data, filename, pretty=True)
             
             return filename
         
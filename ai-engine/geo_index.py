@@ -0,0 +1,127 @@
+"""
+Geospatial Index for EduNiti AI Engine
+Radius and nearest-neighbour college lookups over a KD-tree of unit-sphere coordinates
+"""
+
+from typing import Any, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+EARTH_RADIUS_KM = 6371.0088
+
+def _unit_vectors(latitudes: np.ndarray, longitudes: np.ndarray) -> np.ndarray:
+    """Project latitude/longitude degrees onto the unit sphere"""
+    lat = np.radians(latitudes)
+    lon = np.radians(longitudes)
+    cos_lat = np.cos(lat)
+    return np.column_stack((cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)))
+
+def _chord_length(distance_km: float) -> float:
+    """Straight-line distance through the unit sphere for a great-circle distance"""
+    angle = min(distance_km / EARTH_RADIUS_KM, np.pi)
+    return 2 * np.sin(angle / 2)
+
+def _great_circle_km(chords: np.ndarray) -> np.ndarray:
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.clip(chords / 2, 0, 1))
+
+def _coordinate(location: Any, key: str) -> float:
+    if isinstance(location, dict):
+        value = location.get(key)
+        if value is not None:
+            return float(value)
+    return np.nan
+
+class GeoIndex:
+    """KD-tree over college coordinates
+
+    Points are stored as 3D unit vectors, so Euclidean (chord) distance is a
+    monotonic function of great-circle distance: a radius query is a ball
+    query with the equivalent chord length, and results are exact haversine
+    distances rather than a flat-earth approximation. Positions returned by
+    queries are row positions in the college frame the index was built from;
+    colleges without coordinates are simply not indexed.
+    """
+
+    def __init__(self, latitudes: np.ndarray, longitudes: np.ndarray):
+        latitudes = np.asarray(latitudes, dtype=np.float64)
+        longitudes = np.asarray(longitudes, dtype=np.float64)
+        valid = ~(np.isnan(latitudes) | np.isnan(longitudes))
+
+        self.size = len(latitudes)
+        self.positions = np.flatnonzero(valid)
+        self.points = _unit_vectors(latitudes[valid], longitudes[valid])
+        # scipy.spatial is slow to import; defer it until an index is built
+        from scipy.spatial import cKDTree
+        self.tree = cKDTree(self.points)
+
+        # All-college vectors for dense distance computation (NaN where missing)
+        self._all_points = np.full((self.size, 3), np.nan)
+        self._all_points[valid] = self.points
+
+    @classmethod
+    def from_colleges(cls, college_data: pd.DataFrame) -> 'GeoIndex':
+        """Build from the ``location`` dicts (or latitude/longitude columns)"""
+        if 'latitude' in college_data and 'longitude' in college_data:
+            return cls(college_data['latitude'].to_numpy(), college_data['longitude'].to_numpy())
+
+        locations = college_data['location'] if 'location' in college_data else [None] * len(college_data)
+        latitudes = np.fromiter((_coordinate(loc, 'latitude') for loc in locations), dtype=np.float64,
+                                count=len(college_data))
+        longitudes = np.fromiter((_coordinate(loc, 'longitude') for loc in locations), dtype=np.float64,
+                                 count=len(college_data))
+        return cls(latitudes, longitudes)
+
+    def within_radius(self, latitude: float, longitude: float, radius_km: float,
+                      limit: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """College positions within ``radius_km`` and their distances, nearest first"""
+        if radius_km < 0:
+            raise ValueError("radius_km must be non-negative")
+
+        origin = _unit_vectors(np.array([latitude]), np.array([longitude]))[0]
+        hits = np.array(self.tree.query_ball_point(origin, _chord_length(radius_km)), dtype=np.int64)
+        if hits.size == 0:
+            return hits, np.empty(0)
+
+        distances = _great_circle_km(np.linalg.norm(self.points[hits] - origin, axis=1))
+        order = np.argsort(distances, kind='stable')
+        if limit is not None:
+            order = order[:limit]
+        return self.positions[hits[order]], distances[order]
+
+    def nearest(self, latitude: float, longitude: float, k: int = 10) -> Tuple[np.ndarray, np.ndarray]:
+        """The ``k`` nearest college positions and their distances"""
+        if k <= 0 or len(self.points) == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+
+        origin = _unit_vectors(np.array([latitude]), np.array([longitude]))[0]
+        chords, hits = self.tree.query(origin, k=min(k, len(self.points)))
+        hits = np.atleast_1d(hits)
+        return self.positions[hits], _great_circle_km(np.atleast_1d(chords))
+
+    def distances_km(self, latitude: float, longitude: float) -> np.ndarray:
+        """Distance from a point to every college (NaN where coordinates are missing)"""
+        origin = _unit_vectors(np.array([latitude]), np.array([longitude]))[0]
+        return _great_circle_km(np.linalg.norm(self._all_points - origin, axis=1))
+
+    def stats(self):
+        """Index size summary"""
+        return {'colleges': self.size, 'indexed': len(self.points)}
+
+if __name__ == "__main__":
+    import time
+
+    rng = np.random.default_rng(42)
+    n = 100000
+    index = GeoIndex(rng.uniform(8, 37, n), rng.uniform(68, 97, n))
+
+    queries = list(zip(rng.uniform(8, 37, 1000), rng.uniform(68, 97, 1000)))
+    start = time.perf_counter()
+    found = sum(len(index.within_radius(lat, lon, 50)[0]) for lat, lon in queries)
+    elapsed = (time.perf_counter() - start) / len(queries)
+    print(f"{n} colleges: 50 km radius query {elapsed * 1e6:.1f} us avg, {found / len(queries):.1f} hits avg")
+
+    start = time.perf_counter()
+    for lat, lon in queries:
+        index.nearest(lat, lon, 10)
+    print(f"10-nearest query {(time.perf_counter() - start) / len(queries) * 1e6:.1f} us avg")
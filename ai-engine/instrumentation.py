@@ -0,0 +1,242 @@
+"""
+Instrumentation for EduNiti AI Engine
+Prometheus-format request metrics and per-stage latency histograms
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from functools import wraps
+from typing import Dict, List, Any, Callable, Iterable, Optional, Sequence, Tuple
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# (labels, value) samples produced by a collector
+Samples = List[Tuple[Dict[str, str], float]]
+
+class _ThreadShards:
+    """One mutable shard per thread, so updates never contend or need a lock
+
+    Only the first update from a new thread takes the registration lock;
+    readers sum over all shards at scrape time.
+    """
+
+    def __init__(self, factory: Callable[[], Any]):
+        self._factory = factory
+        self._local = threading.local()
+        self._shards: List[Any] = []
+        self._lock = threading.Lock()
+
+    def local(self) -> Any:
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = self._factory()
+            with self._lock:
+                self._shards.append(shard)
+            self._local.shard = shard
+        return shard
+
+    def all(self) -> List[Any]:
+        with self._lock:
+            return list(self._shards)
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value))
+
+class Counter:
+    """Monotonic counter with optional labels"""
+
+    type = 'counter'
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._shards = _ThreadShards(dict)
+
+    def inc(self, labels: Tuple = (), amount: float = 1):
+        """Increment the series for ``labels`` (a tuple of label values)"""
+        shard = self._shards.local()
+        shard[labels] = shard.get(labels, 0) + amount
+
+    def values(self) -> Dict[Tuple, float]:
+        """Totals per label tuple"""
+        totals: Dict[Tuple, float] = {}
+        for shard in self._shards.all():
+            for labels, value in list(shard.items()):
+                totals[labels] = totals.get(labels, 0) + value
+        return totals
+
+    def render(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} counter']
+        for labels, value in sorted(self.values().items()):
+            lines.append(f'{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}')
+        return lines
+
+class Histogram:
+    """Fixed-bucket latency histogram with optional labels"""
+
+    type = 'histogram'
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._shards = _ThreadShards(dict)
+
+    def observe(self, value: float, labels: Tuple = ()):
+        """Record one observation in seconds"""
+        shard = self._shards.local()
+        entry = shard.get(labels)
+        if entry is None:
+            entry = shard[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+        entry[0][bisect_left(self.buckets, value)] += 1
+        entry[1] += value
+
+    def snapshot(self) -> Dict[Tuple, Tuple[List[int], float]]:
+        """Per-bucket (non-cumulative) counts and sum per label tuple"""
+        merged: Dict[Tuple, Tuple[List[int], float]] = {}
+        for shard in self._shards.all():
+            for labels, (counts, total) in list(shard.items()):
+                if labels in merged:
+                    previous_counts, previous_total = merged[labels]
+                    merged[labels] = ([a + b for a, b in zip(previous_counts, counts)], previous_total + total)
+                else:
+                    merged[labels] = (list(counts), total)
+        return merged
+
+    def render(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        for labels, (counts, total) in sorted(self.snapshot().items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                le = ('le', _format_value(bound) if bound != float('inf') else '+Inf')
+                lines.append(f'{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}')
+            label_text = _format_labels(self.labelnames, labels)
+            lines.append(f'{self.name}_sum{label_text} {_format_value(total)}')
+            lines.append(f'{self.name}_count{label_text} {cumulative}')
+        return lines
+
+class MetricsRegistry:
+    """Metrics and gauge collectors rendered in the Prometheus text format"""
+
+    def __init__(self):
+        self._metrics: List[Any] = []
+        self._collectors: List[Tuple[str, str, str, Callable[[], Samples]]] = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def register_gauge(self, name: str, help: str, collect: Callable[[], Samples]):
+        """Add a gauge whose samples are read from ``collect()`` at scrape time"""
+        self._collectors.append((name, 'gauge', help, collect))
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for name, kind, help, collect in self._collectors:
+            lines.append(f'# HELP {name} {help}')
+            lines.append(f'# TYPE {name} {kind}')
+            for labels, value in collect():
+                lines.append(f'{name}{_format_labels(list(labels), list(labels.values()))} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+REGISTRY = MetricsRegistry()
+
+HTTP_REQUESTS = REGISTRY.register(Counter(
+    'eduniti_http_requests_total', 'HTTP requests by route and status', ('method', 'endpoint', 'status')
+))
+HTTP_DURATION = REGISTRY.register(Histogram(
+    'eduniti_http_request_duration_seconds', 'HTTP request latency by route', ('method', 'endpoint')
+))
+STAGE_DURATION = REGISTRY.register(Histogram(
+    'eduniti_stage_duration_seconds', 'Time spent in internal processing stages', ('stage',)
+))
+
+# Per-request hooks called as hook(stage, seconds); used by request profiling
+stage_hooks: List[Callable[[str, float], None]] = []
+
+def record_stage(stage: str, seconds: float):
+    """Record the duration of an internal stage"""
+    STAGE_DURATION.observe(seconds, (stage,))
+    for hook in stage_hooks:
+        hook(stage, seconds)
+
+class stage_timer:
+    """Context manager timing a block as ``stage`` (also works around awaits)"""
+
+    __slots__ = ('stage', 'start')
+
+    def __init__(self, stage: str):
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        record_stage(self.stage, time.perf_counter() - self.start)
+        return False
+
+def timed_stage(stage: str):
+    """Decorator timing every call of a function as ``stage``"""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                record_stage(stage, time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+class MetricsMiddleware:
+    """ASGI middleware counting requests and timing them per route template
+
+    Routes are labelled with their path template (``/ab-tests/{test_id}/results``)
+    so label cardinality stays bounded; unmatched paths share one label.
+    """
+
+    def __init__(self, app, exclude: Iterable[str] = ('/metrics',)):
+        self.app = app
+        self.exclude = set(exclude)
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or scope['path'] in self.exclude:
+            await self.app(scope, receive, send)
+            return
+
+        status = [500]
+
+        async def send_wrapper(message):
+            if message['type'] == 'http.response.start':
+                status[0] = message['status']
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            route = scope.get('route')
+            endpoint = getattr(route, 'path', None) or 'unmatched'
+            method = scope['method']
+            HTTP_REQUESTS.inc((method, endpoint, str(status[0])))
+            HTTP_DURATION.observe(elapsed, (method, endpoint))
@@ -0,0 +1,345 @@
+"""
+Load Test for EduNiti AI Engine
+Replays a weighted endpoint mix against an in-process server and reports latency histograms
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import socket
+import threading
+import time
+from typing import Dict, List, Any, Optional, Tuple
+
+import numpy as np
+
+INTERESTS = ['Mathematics', 'Science', 'Arts', 'Sports', 'Music', 'Technology', 'Business', 'Medicine']
+QUIZ_SUBJECTS = ['mathematics', 'science', 'arts', 'commerce', 'problem_solving', 'communication', 'creativity', 'leadership']
+STREAMS = ['science', 'arts', 'commerce', 'engineering', 'medical', 'vocational']
+FEEDBACK_TYPES = ['recommendation', 'quiz', 'college', 'career', 'general']
+
+DEFAULT_MIX = {'stream': 3, 'college': 3, 'career': 2, 'feedback': 1, 'ab-tests': 1}
+
+def random_profile(rng: random.Random, user_id: str) -> Dict[str, Any]:
+    """Build a random (and therefore uncached) user profile"""
+    return {
+        'user_id': user_id,
+        'age': rng.randint(15, 22),
+        'stream': rng.choice(STREAMS),
+        'interests': rng.sample(INTERESTS, rng.randint(2, 5)),
+        'location': {'state': rng.choice(['Delhi', 'Maharashtra', 'Karnataka', 'Tamil Nadu'])},
+        'quiz_scores': {subject: round(rng.uniform(3, 10), 3) for subject in QUIZ_SUBJECTS},
+        'personality_traits': {'openness': rng.uniform(1, 5), 'agreeableness': rng.uniform(1, 5)},
+        'family_income': rng.randint(100000, 5000000)
+    }
+
+def generated_profiles(count: int, seed: int) -> List[Dict[str, Any]]:
+    """User profiles built from DatasetGenerator student outcomes"""
+    from data_generator import DatasetGenerator
+
+    students = DatasetGenerator(seed=seed).generate_student_outcomes_dataset(count)
+    return [
+        {
+            'user_id': student['id'],
+            'age': int(student['age']),
+            'class_level': student['class_level'],
+            'stream': student['recommended_stream'],
+            'interests': list(student['interests']),
+            'location': {'state': student['state']},
+            'quiz_scores': {key: round(value, 3) for key, value in student['quiz_scores'].items()},
+            'personality_traits': dict(student['personality_traits']),
+            'family_income': int(student['family_income']),
+            'parent_education': student['parent_education']
+        }
+        for _, student in students.iterrows()
+    ]
+
+class LatencyHistogram:
+    """HDR-style log-linear histogram of latencies in microseconds
+
+    Values below 2^11 us are recorded exactly; above that each power-of-two
+    range is split into 1024 sub-buckets, so every recorded value is kept to
+    ~0.1% precision with a fixed memory footprint regardless of sample count.
+    """
+
+    SUB_BUCKET_BITS = 11
+    MAX_VALUE_US = 3600 * 1000 * 1000
+
+    def __init__(self):
+        self.sub_buckets = 1 << self.SUB_BUCKET_BITS
+        self.half = self.sub_buckets // 2
+        self.counts = np.zeros(self._index(self.MAX_VALUE_US) + 1, dtype=np.int64)
+        self.total = 0
+        self.min_us = None
+        self.max_us = 0
+        self.sum_us = 0
+
+    def _index(self, value: int) -> int:
+        if value < self.sub_buckets:
+            return value
+        shift = value.bit_length() - self.SUB_BUCKET_BITS
+        return self.sub_buckets + (shift - 1) * self.half + (value >> shift) - self.half
+
+    def _highest_equivalent(self, index: int) -> int:
+        if index < self.sub_buckets:
+            return index
+        shift = (index - self.sub_buckets) // self.half + 1
+        mantissa = (index - self.sub_buckets) % self.half + self.half
+        return ((mantissa + 1) << shift) - 1
+
+    def record(self, seconds: float):
+        """Record one latency given in seconds"""
+        value = min(max(int(seconds * 1e6), 0), self.MAX_VALUE_US)
+        self.counts[self._index(value)] += 1
+        self.total += 1
+        self.sum_us += value
+        self.max_us = max(self.max_us, value)
+        self.min_us = value if self.min_us is None else min(self.min_us, value)
+
+    def percentile(self, percentile: float) -> float:
+        """Latency in milliseconds at ``percentile`` (0-100)"""
+        if not self.total:
+            return 0.0
+        target = max(1, int(np.ceil(percentile / 100 * self.total)))
+        index = int(np.searchsorted(np.cumsum(self.counts), target))
+        return min(self._highest_equivalent(index), self.max_us) / 1000
+
+    def summary(self) -> Dict[str, float]:
+        """Count, mean and tail percentiles in milliseconds"""
+        if not self.total:
+            return {'count': 0}
+        return {
+            'count': self.total,
+            'mean': self.sum_us / self.total / 1000,
+            'min': self.min_us / 1000,
+            'p50': self.percentile(50),
+            'p90': self.percentile(90),
+            'p99': self.percentile(99),
+            'p99.9': self.percentile(99.9),
+            'max': self.max_us / 1000
+        }
+
+    def percentile_distribution(self, ticks_per_half: int = 5) -> List[Tuple[float, float, int]]:
+        """(value ms, percentile, count at or below) rows in HdrHistogram's output layout"""
+        rows = []
+        cumulative = np.cumsum(self.counts)
+        percentile = 0.0
+        while percentile < 100 and self.total:
+            value = self.percentile(percentile)
+            count = int(cumulative[self._index(int(value * 1000))])
+            rows.append((value, percentile, count))
+            if count >= self.total:
+                return rows
+            remaining = 100 - percentile
+            percentile += remaining / (2 * ticks_per_half) if remaining > 1e-3 else 100
+        rows.append((self.max_us / 1000, 100.0, self.total))
+        return rows
+
+class EndpointStats:
+    """Per-endpoint latency histograms and outcome counters"""
+
+    def __init__(self):
+        self.response_time = LatencyHistogram()
+        self.service_time = LatencyHistogram()
+        self.statuses: Dict[int, int] = {}
+        self.errors = 0
+
+    def record(self, intended_start: float, actual_start: float, end: float, status: Optional[int]):
+        self.response_time.record(end - intended_start)
+        self.service_time.record(end - actual_start)
+        if status is None or status >= 400:
+            self.errors += 1
+        key = status if status is not None else 0
+        self.statuses[key] = self.statuses.get(key, 0) + 1
+
+    def report(self, elapsed: float) -> Dict[str, Any]:
+        total = self.response_time.total
+        return {
+            'requests': total,
+            'throughput': total / elapsed if elapsed else 0.0,
+            'error_rate': self.errors / total if total else 0.0,
+            'statuses': self.statuses,
+            'response_time_ms': self.response_time.summary(),
+            'service_time_ms': self.service_time.summary()
+        }
+
+def build_request(name: str, rng: random.Random, profiles: List[Dict[str, Any]], sequence: int) -> Tuple[str, str, Optional[Dict]]:
+    """(method, path, json body) for one call of the named endpoint"""
+    profile = dict(rng.choice(profiles), user_id=f'load_{sequence}')
+    if name in ('stream', 'college', 'career'):
+        return 'POST', f'/recommendations/{name}', {'user_profile': profile, 'recommendation_type': name, 'limit': 10}
+    if name == 'feedback':
+        return 'POST', '/feedback', {
+            'user_id': profile['user_id'],
+            'session_id': f'load_session_{sequence}',
+            'feedback_type': rng.choice(FEEDBACK_TYPES),
+            'rating': rng.randint(1, 5),
+            'comment': rng.choice([None, 'Helpful', 'Not relevant']),
+            'context': {'source': 'load_test'}
+        }
+    if name == 'ab-tests':
+        return 'GET', '/ab-tests', None
+    raise ValueError(f"Unknown endpoint: {name}")
+
+def parse_mix(values: List[str]) -> Dict[str, float]:
+    """Parse name=weight pairs"""
+    mix = {}
+    for value in values:
+        name, _, weight = value.partition('=')
+        mix[name] = float(weight or 1)
+    return mix
+
+def start_server(port: int):
+    """Run the production app with uvicorn in a background thread"""
+    import uvicorn
+    import main_production
+
+    config = uvicorn.Config(main_production.app, host='127.0.0.1', port=port, log_level='warning')
+    server = uvicorn.Server(config)
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, thread
+
+async def run_load(base_url: str, mix: Dict[str, float], total_requests: int, concurrency: int, seed: int,
+                   profiles: List[Dict[str, Any]], arrival_rate: Optional[float] = None, poisson: bool = False):
+    """Drive the endpoint mix closed-loop (``concurrency`` workers) or open-loop at ``arrival_rate``
+
+    In open-loop mode each request has an intended start time on a fixed
+    (or Poisson) schedule and its response time is measured from that time,
+    so a stalled server is charged for the requests it delayed instead of
+    the load generator politely waiting (coordinated omission). Service time
+    (from the actual send) is reported alongside.
+    """
+    import httpx
+
+    rng = random.Random(seed)
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    stats = {name: EndpointStats() for name in names}
+    stats['/health'] = EndpointStats()
+    done = asyncio.Event()
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=60, limits=limits) as client:
+        async def call(name: str, sequence: int, intended_start: float):
+            method, path, body = build_request(name, rng, profiles, sequence)
+            actual_start = time.perf_counter()
+            try:
+                response = await client.request(method, path, json=body)
+                status = response.status_code
+            except httpx.HTTPError:
+                status = None
+            stats[name].record(intended_start, actual_start, time.perf_counter(), status)
+
+        async def probe():
+            while not done.is_set():
+                start = time.perf_counter()
+                try:
+                    status = (await client.get('/health')).status_code
+                except httpx.HTTPError:
+                    status = None
+                stats['/health'].record(start, start, time.perf_counter(), status)
+                await asyncio.sleep(0.05)
+
+        probe_task = asyncio.create_task(probe())
+        started = time.perf_counter()
+
+        if arrival_rate:
+            tasks = []
+            intended = started
+            for sequence in range(total_requests):
+                delay = intended - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                name = rng.choices(names, weights)[0]
+                tasks.append(asyncio.create_task(call(name, sequence, intended)))
+                intended += rng.expovariate(arrival_rate) if poisson else 1 / arrival_rate
+            await asyncio.gather(*tasks)
+        else:
+            remaining = [total_requests]
+
+            async def worker():
+                while remaining[0] > 0:
+                    remaining[0] -= 1
+                    name = rng.choices(names, weights)[0]
+                    await call(name, remaining[0], time.perf_counter())
+
+            await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+        elapsed = time.perf_counter() - started
+        done.set()
+        await probe_task
+
+    return stats, elapsed
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test the production API with a realistic endpoint mix")
+    parser.add_argument('--mode', default=os.getenv('SCORING_EXECUTION_MODE', 'process'),
+                        choices=['inline', 'thread', 'process'], help="Scoring execution mode")
+    parser.add_argument('--requests', type=int, default=300, help="Total requests")
+    parser.add_argument('--concurrency', type=int, default=16,
+                        help="Closed-loop workers, or the connection pool size in open-loop mode")
+    parser.add_argument('--arrival-rate', type=float, default=None,
+                        help="Open-loop mode: requests per second on a fixed schedule")
+    parser.add_argument('--poisson', action='store_true', help="Open-loop mode: exponential inter-arrival times")
+    parser.add_argument('--mix', nargs='+', default=[f'{name}={weight}' for name, weight in DEFAULT_MIX.items()],
+                        help="Endpoint weights as name=weight (stream, college, career, feedback, ab-tests)")
+    parser.add_argument('--profiles', type=int, default=500, help="Generated user profiles to draw from")
+    parser.add_argument('--histogram', action='store_true', help="Print the response time percentile distribution")
+    parser.add_argument('--output', help="Write the report as JSON")
+    parser.add_argument('--port', type=int, default=0, help="Server port (default: a free port)")
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    mix = parse_mix(args.mix)
+    for name in mix:
+        if name not in DEFAULT_MIX:
+            parser.error(f"Unknown endpoint in --mix: {name}")
+
+    # The execution layer reads its configuration at import time
+    os.environ['SCORING_EXECUTION_MODE'] = args.mode
+    os.environ.setdefault('RECOMMENDATION_CACHE_SIZE', '0')
+
+    port = args.port
+    if not port:
+        with socket.socket() as sock:
+            sock.bind(('127.0.0.1', 0))
+            port = sock.getsockname()[1]
+
+    profiles = generated_profiles(args.profiles, args.seed)
+    server, thread = start_server(port)
+    try:
+        stats, elapsed = asyncio.run(run_load(
+            f'http://127.0.0.1:{port}', mix, args.requests, args.concurrency, args.seed,
+            profiles, args.arrival_rate, args.poisson
+        ))
+    finally:
+        server.should_exit = True
+        thread.join()
+
+    load = f"open loop at {args.arrival_rate:g} req/s" if args.arrival_rate else f"closed loop x{args.concurrency}"
+    total = sum(endpoint.response_time.total for name, endpoint in stats.items() if name != '/health')
+    errors = sum(endpoint.errors for name, endpoint in stats.items() if name != '/health')
+    print(f"Mode: {args.mode}, {load}, requests: {total}, elapsed: {elapsed:.1f}s")
+    print(f"Throughput: {total / elapsed:.1f} req/s, error rate: {errors / total if total else 0:.2%}")
+
+    report = {}
+    for name, endpoint in stats.items():
+        report[name] = endpoint.report(elapsed)
+        summary = report[name]['response_time_ms']
+        if summary['count']:
+            print(f"  {name:10s} n={summary['count']:5d} {report[name]['throughput']:7.1f} req/s "
+                  f"err={report[name]['error_rate']:6.2%} " +
+                  ' '.join(f"{key}={summary[key]:8.1f}ms" for key in ('p50', 'p90', 'p99', 'p99.9', 'max')))
+        if args.histogram and name != '/health' and summary['count']:
+            print(f"    {'Value(ms)':>12s} {'Percentile':>12s} {'TotalCount':>10s}")
+            for value, percentile, count in endpoint.response_time.percentile_distribution():
+                print(f"    {value:12.3f} {percentile / 100:12.6f} {count:10d}")
+
+    if args.output:
+        from serialization import dump_file
+        dump_file({'mode': args.mode, 'load': load, 'elapsed': elapsed, 'endpoints': report}, args.output, pretty=True)
+        print(f"Report written to {args.output}")
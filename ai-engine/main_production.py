@@ -3,20 +3,38 @@ EduNiti AI Recommendation Engine - Production Version
 Advanced AI-powered recommendation system with ML models, A/B testing, and feedback loops
 """
 
+# Created first so the startup timeline covers the imports below
+from startup import StartupTimeline, STARTUP_MODES
+startup_timeline = StartupTimeline()
+
+import asyncio
+import hmac
 from fastapi import FastAPI, HTTPException, BackgroundTasks, Depends, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from pydantic import BaseModel
-from typing import List, Dict, Optional, Any
+from typing import List, Dict, Optional, Any, Tuple
 import pandas as pd
 import numpy as np
-import httpx
 import os
 from dotenv import load_dotenv
 import logging
 import json
 from datetime import datetime
 import uuid
+from recommendation_cache import RecommendationCache, profile_fingerprint
+from execution import ExecutionLayer, ExecutorSaturated
+from program_index import ProgramIndex
+from geo_index import GeoIndex
+from stream_scoring import StreamScoringTable
+from variant_scoring import ScoringCatalogue, VariantScorers, BASELINE_SCORING
+from shadow_scoring import ShadowScorer, shadow_candidate
+from materialized_recommendations import MaterializedRecommendations, STREAM_SCORING_KEY
+from response_fragments import EntityFragments, FragmentResponse, merge_fields
+from serialization import ORJSONResponse
+from fastapi.responses import PlainTextResponse
+from instrumentation import REGISTRY, MetricsMiddleware, stage_timer, timed_stage
+from profiling import RequestProfiler, ProfilingMiddleware
 
 # Load environment variables
 load_dotenv()
@@ -29,7 +47,8 @@ logger = logging.getLogger(__name__)
 app = FastAPI(
     title="EduNiti AI Recommendation Engine",
     description="Production-ready AI-powered recommendation system with advanced ML, A/B testing, and feedback loops",
-    version="3.0.0"
+    version="3.0.0",
+    default_response_class=ORJSONResponse
 )
 
 # Add CORS middleware
@@ -41,19 +60,30 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Request counters and latency histograms per route, exposed on /metrics
+app.add_middleware(MetricsMiddleware)
+
+# Opt-in request profiling; disabled (and free) unless PROFILING_ADMIN_TOKEN is set
+profiler = RequestProfiler(token=os.getenv('PROFILING_ADMIN_TOKEN') or None)
+app.add_middleware(ProfilingMiddleware, profiler=profiler)
+
 # Security
 security = HTTPBearer()
 
 # Import our production systems
 try:
-    from data_generator import DatasetGenerator
-    from ab_testing import ABTestingFramework
+    from data_generator import DatasetGenerator, dataset_version, find_dataset, read_dataset, write_dataset
+    from ab_testing import ABTestingFramework, ABResultWriter
+    from ab_store import create_experiment_store
+    from segment_analysis import SegmentAnalyzer, parse_bins
     from feedback_system import FeedbackSystem
     PRODUCTION_SYSTEMS_AVAILABLE = True
 except ImportError as e:
     logger.warning(f"Production systems not available: {e}")
     PRODUCTION_SYSTEMS_AVAILABLE = False
 
+startup_timeline.mark('imports')
+
 # Pydantic models
 class UserProfile(BaseModel):
     user_id: str
@@ -98,29 +128,128 @@ class ABTestRequest(BaseModel):
 college_data = None
 career_data = None
 stream_data = None
+program_index = None
+geo_index = None
+stream_table = None
+
+# Compiled college/career scorers per A/B variant scoring configuration (one registry per process)
+variant_scorers = VariantScorers()
+college_fragments = None
+career_fragments = None
 dataset_generator = None
 ab_framework = None
+ab_result_writer = None
+segment_analyzer = None
 feedback_system = None
 
+# Precomputed rankings of known users (see materialized_recommendations.py), opened at
+# startup when MATERIALIZED_RECOMMENDATIONS_PATH is set
+materialized_recommendations: Optional[MaterializedRecommendations] = None
+
+# Recommendation response cache, invalidated whenever the catalogue is (re)loaded
+recommendation_cache = RecommendationCache(
+    max_entries=int(os.getenv('RECOMMENDATION_CACHE_SIZE', '10000')),
+    ttl_seconds=float(os.getenv('RECOMMENDATION_CACHE_TTL', '300'))
+)
+
+# Colleges within this distance of the student's coordinates score higher (variants with a distance weight)
+COLLEGE_DISTANCE_RADIUS_KM = float(os.getenv('COLLEGE_DISTANCE_RADIUS_KM', '100'))
+
+# Keeps CPU-bound scoring and blocking file writes off the event loop
+execution_layer = ExecutionLayer(
+    mode=os.getenv('SCORING_EXECUTION_MODE', 'process'),
+    scoring_workers=int(os.getenv('SCORING_WORKERS')) if os.getenv('SCORING_WORKERS') else None,
+    max_pending=int(os.getenv('SCORING_MAX_PENDING', '64')),
+    max_pending_io=int(os.getenv('IO_MAX_PENDING', '256'))
+)
+
+# Optional shadow candidate scored on sampled college/career requests after the
+# response is sent, on its own bounded pool; unset SHADOW_SCORING disables it
+shadow_scorer: Optional[ShadowScorer] = None
+if os.getenv('SHADOW_SCORING'):
+    shadow_scorer = ShadowScorer(
+        shadow_candidate(os.getenv('SHADOW_SCORING')),
+        ExecutionLayer(
+            mode=os.getenv('SHADOW_EXECUTION_MODE', 'process'),
+            scoring_workers=int(os.getenv('SHADOW_WORKERS', '1')),
+            max_pending=int(os.getenv('SHADOW_MAX_PENDING', '8'))
+        ),
+        sample_rate=float(os.getenv('SHADOW_SAMPLE_RATE', '0.05')),
+        top_k=int(os.getenv('SHADOW_TOP_K', '10')),
+        max_lag=float(os.getenv('SHADOW_MAX_LAG', '2.0'))
+    )
+
+# 'eager' loads datasets before serving; 'background' serves /health immediately
+# and reports readiness once datasets are loaded
+STARTUP_MODE = os.getenv('STARTUP_MODE', 'eager')
+if STARTUP_MODE not in STARTUP_MODES:
+    raise ValueError(f"STARTUP_MODE must be one of {STARTUP_MODES}")
+startup_task: Optional[asyncio.Task] = None
+
+# Finished A/B tests move to the archive this many days after they end
+AB_ARCHIVE_GRACE_DAYS = float(os.getenv('AB_ARCHIVE_GRACE_DAYS', '0'))
+AB_ARCHIVE_INTERVAL = float(os.getenv('AB_ARCHIVE_INTERVAL', '3600'))  # seconds
+archive_task: Optional[asyncio.Task] = None
+
+# Default test key -> test id, resolved at startup
+default_ab_tests: Dict[str, Optional[str]] = {}
+
 @app.on_event("startup")
 async def startup_event():
     """Initialize production systems on startup"""
-    global college_data, career_data, stream_data, dataset_generator, ab_framework, feedback_system
+    global dataset_generator, ab_framework, ab_result_writer, segment_analyzer, feedback_system, startup_task
+    global materialized_recommendations
     
-    logger.info("Initializing Production AI Recommendation Engine...")
+    logger.info(f"Initializing Production AI Recommendation Engine ({STARTUP_MODE} startup)...")
+    
+    if os.getenv('MATERIALIZED_RECOMMENDATIONS_PATH'):
+        try:
+            materialized_recommendations = MaterializedRecommendations(os.getenv('MATERIALIZED_RECOMMENDATIONS_PATH'))
+        except Exception as e:
+            logger.error(f"Error opening materialized recommendations: {e}")
     
     try:
         if PRODUCTION_SYSTEMS_AVAILABLE:
-            # Initialize production systems
-            dataset_generator = DatasetGenerator()
-            ab_framework = ABTestingFramework()
-            feedback_system = FeedbackSystem()
-            
+            with startup_timeline.phase('systems'):
+                # Initialize production systems
+                dataset_generator = DatasetGenerator()
+                ab_framework = ABTestingFramework(store=create_experiment_store(
+                    os.getenv('AB_STORE_BACKEND', 'json'),
+                    sqlite_path=os.getenv('AB_SQLITE_PATH') or None
+                ))
+                segment_analyzer = SegmentAnalyzer(ab_framework)
+                feedback_system = FeedbackSystem()
+                
+                # Batch A/B result writes in the background, on the I/O thread
+                ab_result_writer = ABResultWriter(
+                    ab_framework,
+                    max_queue=int(os.getenv('AB_WRITER_MAX_QUEUE', '10000')),
+                    max_batch=int(os.getenv('AB_WRITER_MAX_BATCH', '500')),
+                    flush_interval=float(os.getenv('AB_WRITER_FLUSH_INTERVAL', '0.5')),
+                    run_blocking=execution_layer.run_io
+                )
+                ab_result_writer.start()
+    except Exception as e:
+        logger.error(f"Error initializing production systems: {e}")
+        ab_framework = None
+        segment_analyzer = None
+    
+    if STARTUP_MODE == 'background':
+        # Accept traffic (liveness, /health) while datasets load
+        startup_task = asyncio.create_task(initialize_data())
+    else:
+        await initialize_data()
+
+async def initialize_data():
+    """Load datasets and default A/B tests, then report the engine ready"""
+    try:
+        if PRODUCTION_SYSTEMS_AVAILABLE and ab_framework is not None:
             # Load or generate datasets
             await load_production_data()
             
             # Create default A/B tests
-            await create_default_ab_tests()
+            with startup_timeline.phase('ab_tests'):
+                await create_default_ab_tests()
             
             logger.info("Production systems initialized successfully!")
         else:
@@ -130,58 +259,105 @@ async def startup_event():
             
     except Exception as e:
         logger.error(f"Error initializing production systems: {e}")
+        startup_timeline.mark_failed(str(e))
         await load_sample_data()
         logger.info("Falling back to sample data")
+    
+    startup_timeline.mark_ready()
+    logger.info(f"Ready after {startup_timeline.ready_after:.2f}s")
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Drain queued A/B results and stop worker pools"""
+    for task in (startup_task, archive_task):
+        if task is not None and not task.done():
+            task.cancel()
+    if ab_result_writer:
+        await ab_result_writer.stop()
+    execution_layer.shutdown()
+    if shadow_scorer:
+        shadow_scorer.execution.shutdown()
 
 async def load_production_data():
-    """Load production datasets"""
+    """Load production datasets and publish the derived catalogue"""
     global college_data, career_data, stream_data
     
     try:
-        # Try to load existing datasets
-        if os.path.exists('data/colleges.csv'):
-            college_data = pd.read_csv('data/colleges.csv')
-            logger.info(f"Loaded {len(college_data)} colleges from dataset")
-        else:
-            logger.info("Generating new college dataset...")
-            college_data = dataset_generator.generate_colleges_dataset(1000)
-            college_data.to_csv('data/colleges.csv', index=False)
-        
-        if os.path.exists('data/careers.csv'):
-            career_data = pd.read_csv('data/careers.csv')
-            logger.info(f"Loaded {len(career_data)} careers from dataset")
-        else:
-            logger.info("Generating new career dataset...")
-            career_data = dataset_generator.generate_careers_dataset(500)
-            career_data.to_csv('data/careers.csv', index=False)
+        # Reading and indexing block for seconds; keep them off the event loop
+        with startup_timeline.phase('datasets'):
+            college_data, career_data, stream_data = await execution_layer.run_io(read_production_datasets)
         
-        if os.path.exists('data/student_outcomes.csv'):
-            stream_data = pd.read_csv('data/student_outcomes.csv')
-            logger.info(f"Loaded {len(stream_data)} student outcomes from dataset")
-        else:
-            logger.info("Generating new student outcomes dataset...")
-            stream_data = dataset_generator.generate_student_outcomes_dataset(10000)
-            stream_data.to_csv('data/student_outcomes.csv', index=False)
+        with startup_timeline.phase('catalogue'):
+            version = dataset_version(
+                [find_dataset('data', name) for name in ('colleges', 'careers', 'student_outcomes')]
+            )
+            await execution_layer.run_io(catalogue_reloaded, version)
             
     except Exception as e:
         logger.error(f"Error loading production data: {e}")
         await load_sample_data()
 
+def read_production_datasets():
+    """Read (or generate and write) the college, career and student outcome datasets"""
+    # Try to load existing datasets (typed columnar files preferred over CSV)
+    colleges_path = find_dataset('data', 'colleges')
+    if colleges_path:
+        college_data = read_dataset(colleges_path)
+        logger.info(f"Loaded {len(college_data)} colleges from {colleges_path}")
+    else:
+        logger.info("Generating new college dataset...")
+        college_data = dataset_generator.generate_colleges_dataset(1000)
+        write_dataset(college_data, 'data/colleges')
+    
+    careers_path = find_dataset('data', 'careers')
+    if careers_path:
+        career_data = read_dataset(careers_path)
+        logger.info(f"Loaded {len(career_data)} careers from {careers_path}")
+    else:
+        logger.info("Generating new career dataset...")
+        career_data = dataset_generator.generate_careers_dataset(500)
+        write_dataset(career_data, 'data/careers')
+    
+    students_path = find_dataset('data', 'student_outcomes')
+    if students_path:
+        stream_data = read_dataset(students_path)
+        logger.info(f"Loaded {len(stream_data)} student outcomes from {students_path}")
+    else:
+        logger.info("Generating new student outcomes dataset...")
+        stream_data = dataset_generator.generate_student_outcomes_dataset(10000)
+        write_dataset(stream_data, 'data/student_outcomes')
+    
+    return college_data, career_data, stream_data
+
 async def create_default_ab_tests():
-    """Create default A/B tests"""
+    """Archive finished tests and ensure the default tests exist (idempotent across restarts and workers)"""
+    global archive_task
     try:
-        # Create recommendation algorithm test
-        test_id = ab_framework.create_recommendation_test()
-        ab_framework.start_test(test_id)
-        logger.info(f"Created and started recommendation test: {test_id}")
+        await execution_layer.run_io(ab_framework.archive_inactive_tests, AB_ARCHIVE_GRACE_DAYS)
+        default_ab_tests.update(await execution_layer.run_io(ab_framework.ensure_default_tests))
+        for key, test_id in default_ab_tests.items():
+            logger.info(f"A/B test '{key}': {test_id or 'finished (archived)'}")
         
-        # Create UI test
-        ui_test_id = ab_framework.create_ui_test()
-        ab_framework.start_test(ui_test_id)
-        logger.info(f"Created and started UI test: {ui_test_id}")
+        # Compile the scoring configuration of every running test's variants
+        for test in await execution_layer.run_io(ab_framework.get_all_tests):
+            if test['status'] == 'running':
+                variant_scorers.register_test(test)
+        logger.info(f"Variant scoring: {variant_scorers.stats()}")
         
     except Exception as e:
         logger.error(f"Error creating A/B tests: {e}")
+    
+    if archive_task is None:
+        archive_task = asyncio.create_task(archive_finished_tests())
+
+async def archive_finished_tests():
+    """Periodically move completed and expired A/B tests to the archive"""
+    while True:
+        await asyncio.sleep(AB_ARCHIVE_INTERVAL)
+        try:
+            await execution_layer.run_io(ab_framework.archive_inactive_tests, AB_ARCHIVE_GRACE_DAYS)
+        except Exception as e:
+            logger.error(f"Error archiving A/B tests: {e}")
 
 async def load_sample_data():
     """Load sample data as fallback"""
@@ -234,197 +410,224 @@ async def load_sample_data():
             'description': 'Focus on humanities and social sciences'
         }
     ])
+    
+    catalogue_reloaded('sample')
+
+def catalogue_reloaded(version: Optional[str] = None):
+    """Invalidate derived state after college/career/stream data is (re)loaded"""
+    global program_index, geo_index, stream_table
+    program_index = ProgramIndex(college_data)
+    geo_index = GeoIndex.from_colleges(college_data)
+    stream_table = StreamScoringTable(stream_data)
+    scoring_catalogue = ScoringCatalogue(college_data, career_data, program_index, geo_index,
+                                         COLLEGE_DISTANCE_RADIUS_KM)
+    variant_scorers.install(scoring_catalogue)
+    if not stream_table.streams:
+        logger.warning("Stream data has no stream definitions; stream recommendations will be empty")
+    
+    # Response fragments are only needed by the API process, not by scoring workers
+    global college_fragments, career_fragments
+    college_fragments = EntityFragments.from_frame(college_data, college_record, split_after='name')
+    career_fragments = EntityFragments.from_frame(career_data, career_record, split_after='growth_prospects')
+    recommendation_cache.invalidate(version)
+    catalogue = {
+        'college_data': college_data,
+        'career_data': career_data,
+        'stream_data': stream_data,
+        'program_index': program_index,
+        'geo_index': geo_index,
+        'stream_table': stream_table,
+        'scoring_catalogue': scoring_catalogue
+    }
+    execution_layer.publish_catalogue(catalogue, install_catalogue)
+    if shadow_scorer:
+        shadow_scorer.execution.publish_catalogue(catalogue, install_catalogue)
+    logger.info(f"Catalogue version {recommendation_cache.catalogue_version} loaded")
 
-def get_user_variant(user_id: str, test_type: str = "recommendation") -> str:
-    """Get user's A/B test variant"""
+def install_catalogue(catalogue: Dict[str, Any]):
+    """Install a published catalogue snapshot (runs in scoring worker processes)"""
+    global college_data, career_data, stream_data, program_index, geo_index, stream_table
+    college_data = catalogue['college_data']
+    career_data = catalogue['career_data']
+    stream_data = catalogue['stream_data']
+    program_index = catalogue['program_index']
+    geo_index = catalogue['geo_index']
+    stream_table = catalogue['stream_table']
+    variant_scorers.install(catalogue['scoring_catalogue'])
+
+async def compute_recommendations(recommendation_type: str,
+                                  variant: str,
+                                  scorer,
+                                  user_profile: UserProfile,
+                                  limit: Optional[int] = None,
+                                  scoring: Optional[Dict[str, Any]] = None,
+                                  background_tasks: Optional[BackgroundTasks] = None) -> List[Dict[str, Any]]:
+    """Serve recommendations from the cache or the materialized table, or score them on the execution layer
+    
+    With a variant ``scoring`` configuration the cache is keyed by the
+    configuration rather than the variant name, which tests may reuse.
+    Rankings scored live because the user's materialized ranking is missing
+    or stale are written back to the table once the response is sent.
+    """
+    profile = user_profile.dict()
+    with stage_timer('cache_lookup'):
+        key = recommendation_cache.make_key(profile, recommendation_type, limit,
+                                            scoring['key'] if scoring else variant)
+        recommendations = recommendation_cache.get(key)
+    if recommendations is not None:
+        return recommendations
+    
+    if materialized_recommendations:
+        fingerprint = profile_fingerprint(profile)
+        # Stream rankings are scored without a variant configuration
+        scoring_key = scoring['key'] if scoring else STREAM_SCORING_KEY
+        catalogue_version = recommendation_cache.catalogue_version
+        with stage_timer('materialized_lookup'):
+            recommendations = await execution_layer.run_io(
+                materialized_recommendations.lookup, user_profile.user_id, recommendation_type,
+                fingerprint, scoring_key, catalogue_version, limit
+            )
+        if recommendations is not None:
+            recommendation_cache.set(key, recommendations)
+            return recommendations
+    
+    args = (user_profile,) if limit is None else (user_profile, limit)
+    if scoring:
+        args += (scoring,)
+    # Measured from the API process, so it includes any worker dispatch
+    with stage_timer(f'score_{recommendation_type}'):
+        recommendations = await execution_layer.run_scoring(scorer, *args)
+    recommendation_cache.set(key, recommendations)
+    
+    if materialized_recommendations and background_tasks is not None:
+        background_tasks.add_task(refresh_materialized, user_profile.user_id, recommendation_type, profile,
+                                  fingerprint, scoring_key, catalogue_version, limit, recommendations)
+    return recommendations
+
+async def refresh_materialized(*args):
+    """Write a live-scored ranking back to the materialized table (runs after the response)"""
+    try:
+        await execution_layer.run_io(materialized_recommendations.refresh, *args)
+    except Exception as e:
+        logger.warning(f"Error refreshing materialized recommendations: {e}")
+
+def record_recommendation_result(test_id: Optional[str], user_profile: UserProfile, recommendation_type: str,
+                                 accuracy: float, recommendations: List[Dict[str, Any]]):
+    """Record an A/B test result for the test the user is in (written in the background)"""
+    if not (ab_result_writer and test_id):
+        return
+    ab_result_writer.enqueue(
+        test_id=test_id,
+        user_id=user_profile.user_id,
+        metrics={
+            'recommendation_accuracy': accuracy,
+            'user_satisfaction': 4.0,  # This would come from user feedback
+            'click_through_rate': 0.15  # This would be tracked
+        },
+        user_profile=user_profile.dict(),
+        recommendation_data={'recommendation_type': recommendation_type, 'recommendations': recommendations}
+    )
+
+def recorded_matches(frame: pd.DataFrame, matches: List[Dict[str, Any]], id_column: str) -> List[Dict[str, Any]]:
+    """Catalogue ids and match scores of scored matches, as recorded with an A/B result"""
+    return [
+        {id_column: frame.iloc[match['position']].get(id_column, ''), 'match_score': match['match_score']}
+        for match in matches
+    ]
+
+@timed_stage('get_user_variant')
+def get_user_assignment(user_id: str, layer: str = "recommendation") -> Tuple[Optional[str], str]:
+    """Get user's A/B test and variant in an experiment layer: (test_id, variant)"""
     if not ab_framework:
-        return "baseline"
+        return None, "baseline"
     
     try:
-        # Find active test for the type
-        tests = ab_framework.get_all_tests()
-        active_test = None
-        
-        for test in tests:
-            if test['status'] == 'running' and test_type in test['name'].lower():
-                active_test = test
-                break
+        assignment = ab_framework.resolve_assignments(user_id).get(layer)
+        if assignment:
+            return assignment['test_id'], assignment['variant']
         
-        if active_test:
-            return ab_framework.assign_user_to_variant(user_id, active_test['test_id'])
-        else:
-            return "baseline"
+        # Tests created without a layer: the first running test named after it
+        for test in ab_framework.get_all_tests():
+            if test['status'] == 'running' and not test.get('layer') and layer in test['name'].lower():
+                return test['test_id'], ab_framework.assign_user_to_variant(user_id, test['test_id'])
+        return None, "baseline"
     except Exception as e:
         logger.error(f"Error getting user variant: {e}")
-        return "baseline"
+        return None, "baseline"
+
+def get_user_arm(user_id: str, layer: str = "recommendation") -> Tuple[Optional[str], str, Dict[str, Any]]:
+    """Get user's A/B test, variant and the variant's scoring configuration"""
+    test_id, variant = get_user_assignment(user_id, layer)
+    scoring = variant_scorers.config(test_id, variant) if test_id else None
+    if scoring is None and test_id:
+        # A test started since this worker compiled its arms (e.g. by another worker)
+        try:
+            test = ab_framework.get_test(test_id)
+            if test:
+                scoring = variant_scorers.register_test(test).get(variant)
+        except Exception as e:
+            logger.error(f"Error compiling scoring for test {test_id}: {e}")
+    return test_id, variant, scoring or BASELINE_SCORING
 
 def calculate_advanced_stream_recommendation(user_profile: UserProfile) -> List[Dict[str, Any]]:
     """Calculate advanced stream recommendations using ML"""
-    recommendations = []
-    
-    # Enhanced scoring algorithm
-    stream_scores = {}
-    
-    for _, stream_row in stream_data.iterrows():
-        score = 0
-        stream = stream_row.get('stream', 'unknown')
-        
-        # Interest-based scoring
-        subjects = stream_row.get('subjects', [])
-        careers = stream_row.get('careers', [])
-        
-        for interest in user_profile.interests:
-            if interest.lower() in [s.lower() for s in subjects]:
-                score += 3
-            if interest.lower() in [c.lower() for c in careers]:
-                score += 4
-        
-        # Quiz score-based scoring
-        if user_profile.quiz_scores:
-            for subject, score_val in user_profile.quiz_scores.items():
-                if subject.lower() in [s.lower() for s in subjects]:
-                    score += score_val * 0.8
-        
-        # Personality-based scoring
-        if user_profile.personality_traits:
-            if stream == 'science' and user_profile.personality_traits.get('openness', 3) > 3.5:
-                score += 2
-            if stream == 'arts' and user_profile.personality_traits.get('agreeableness', 3) > 3.5:
-                score += 2
-            if stream == 'commerce' and user_profile.personality_traits.get('conscientiousness', 3) > 3.5:
-                score += 2
-        
-        # Age and class level considerations
-        if user_profile.age and user_profile.age < 18:
-            if stream in ['science', 'commerce']:
-                score += 1  # Slightly favor these for younger students
-        
-        stream_scores[stream] = score
-    
-    # Sort by score and create recommendations
-    sorted_streams = sorted(stream_scores.items(), key=lambda x: x[1], reverse=True)
-    
-    for stream, score in sorted_streams[:3]:
-        stream_row = stream_data[stream_data['stream'] == stream].iloc[0]
-        
-        confidence = min(score / 15, 1.0)  # Normalize to 0-1
-        
-        recommendations.append({
-            'stream': stream,
-            'confidence': confidence,
-            'reasoning': f"Based on your interests, academic strengths, and personality profile",
-            'career_paths': stream_row.get('careers', []),
-            'required_subjects': stream_row.get('subjects', []),
-            'description': stream_row.get('description', ''),
-            'match_score': score
-        })
-    
-    return recommendations
+    # Enhanced scoring algorithm over the precompiled stream x keyword tables
+    return stream_table.recommend(user_profile)
 
-def calculate_advanced_college_recommendations(user_profile: UserProfile, limit: int = 10) -> List[Dict[str, Any]]:
+def college_record(college: pd.Series) -> Dict[str, Any]:
+    """Static response fields of a college"""
+    return {
+        'college_id': college.get('id', ''),
+        'name': college.get('name', ''),
+        'programs': college.get('programs', []),
+        'location': college.get('location', {}),
+        'type': college.get('type', ''),
+        'facilities': college.get('facilities', [])
+    }
+
+def career_record(career: pd.Series) -> Dict[str, Any]:
+    """Static response fields of a career"""
+    return {
+        'career': career.get('career', ''),
+        'education_path': career.get('education_path', []),
+        'skills_required': career.get('skills', []),
+        'job_opportunities': [career.get('career', '')],
+        'salary_range': career.get('salary_range', {}),
+        'growth_prospects': career.get('growth', 'Medium'),
+        'stream': career.get('stream', '')
+    }
+
+def calculate_advanced_college_recommendations(user_profile: UserProfile, limit: int = 10,
+                                               scoring: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
     """Calculate advanced college recommendations"""
-    recommendations = []
-    
-    for _, college in college_data.iterrows():
-        match_score = 0
-        reasons = []
-        
-        # Location preference (enhanced)
-        if user_profile.location:
-            if college.get('state') == user_profile.location.get('state'):
-                match_score += 0.4
-                reasons.append("Located in your preferred state")
-            elif college.get('location', {}).get('state') == user_profile.location.get('state'):
-                match_score += 0.4
-                reasons.append("Located in your preferred state")
-        
-        # Stream match
-        if user_profile.stream:
-            college_streams = college.get('streams', [])
-            if user_profile.stream in college_streams:
-                match_score += 0.5
-                reasons.append(f"Offers {user_profile.stream} programs")
-        
-        # Interest match
-        for interest in user_profile.interests:
-            college_programs = college.get('programs', [])
-            if interest.lower() in ' '.join(college_programs).lower():
-                match_score += 0.1
-                reasons.append(f"Programs align with your interest in {interest}")
-        
-        # Academic profile match
-        if user_profile.quiz_scores:
-            avg_score = sum(user_profile.quiz_scores.values()) / len(user_profile.quiz_scores)
-            college_cutoff = college.get('cut_off', 70)
-            if avg_score >= college_cutoff * 0.8:
-                match_score += 0.3
-                reasons.append("Your academic profile matches the college requirements")
-        
-        # Family income consideration
-        if user_profile.family_income and college.get('fees_range'):
-            fees_min = college['fees_range'].get('min', 50000) if isinstance(college['fees_range'], dict) else 50000
-            if user_profile.family_income >= fees_min * 2:
-                match_score += 0.1
-                reasons.append("Affordable based on your family income")
-        
-        if match_score > 0:
-            recommendations.append({
-                'college_id': college.get('id', ''),
-                'name': college.get('name', ''),
-                'match_score': match_score,
-                'reasons': reasons,
-                'programs': college.get('programs', []),
-                'location': college.get('location', {}),
-                'type': college.get('type', ''),
-                'facilities': college.get('facilities', [])
-            })
+    return [
+        merge_fields(college_record(college_data.iloc[match.pop('position')]), match, split_after='name')
+        for match in score_college_matches(user_profile, limit, scoring)
+    ]
+
+def score_college_matches(user_profile: UserProfile, limit: int = 10,
+                          scoring: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    """Score colleges: catalogue position, match score and reasons of the best matches
     
-    # Sort by match score and return top recommendations
-    recommendations.sort(key=lambda x: x['match_score'], reverse=True)
-    return recommendations[:limit]
+    ``scoring`` is an A/B variant's scoring configuration (baseline when None);
+    its compiled scorer is looked up, or compiled on first use in this process.
+    """
+    college_scorer, _ = variant_scorers.scorers(scoring)
+    return college_scorer.score(user_profile, limit)
 
-def calculate_advanced_career_recommendations(user_profile: UserProfile) -> List[Dict[str, Any]]:
+def calculate_advanced_career_recommendations(user_profile: UserProfile,
+                                              scoring: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
     """Calculate advanced career recommendations"""
-    recommendations = []
-    
-    # Filter careers by stream
-    if user_profile.stream:
-        relevant_careers = career_data[career_data['stream'] == user_profile.stream]
-    else:
-        relevant_careers = career_data
-    
-    for _, career in relevant_careers.iterrows():
-        # Calculate match score
-        match_score = 0
-        
-        # Interest match
-        for interest in user_profile.interests:
-            if interest.lower() in career.get('career', '').lower():
-                match_score += 0.3
-            if interest.lower() in ' '.join(career.get('skills', [])).lower():
-                match_score += 0.2
-        
-        # Personality match
-        if user_profile.personality_traits:
-            if career.get('career') == 'Software Engineer' and user_profile.personality_traits.get('openness', 3) > 3.5:
-                match_score += 0.2
-            if career.get('career') == 'Doctor' and user_profile.personality_traits.get('agreeableness', 3) > 3.5:
-                match_score += 0.2
-        
-        recommendations.append({
-            'career': career.get('career', ''),
-            'education_path': career.get('education_path', []),
-            'skills_required': career.get('skills', []),
-            'job_opportunities': [career.get('career', '')],
-            'salary_range': career.get('salary_range', {}),
-            'growth_prospects': career.get('growth', 'Medium'),
-            'match_score': match_score,
-            'stream': career.get('stream', '')
-        })
-    
-    # Sort by match score
-    recommendations.sort(key=lambda x: x['match_score'], reverse=True)
-    return recommendations
+    return [
+        merge_fields(career_record(career_data.iloc[match.pop('position')]), match, split_after='growth_prospects')
+        for match in score_career_matches(user_profile, scoring)
+    ]
+
+def score_career_matches(user_profile: UserProfile,
+                         scoring: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    """Score careers: catalogue position and match score, best first"""
+    _, career_scorer = variant_scorers.scorers(scoring)
+    return career_scorer.score(user_profile)
 
 # API Endpoints
 @app.get("/")
@@ -439,9 +642,12 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    """Detailed health check"""
+    """Detailed health check (always 200 while the process is up)"""
     return {
-        "status": "healthy",
+        "status": "healthy" if startup_timeline.ready else "starting",
+        "live": True,
+        "ready": startup_timeline.ready,
+        "startup": startup_timeline.to_dict(),
         "version": "3.0.0",
         "production_systems": PRODUCTION_SYSTEMS_AVAILABLE,
         "models_loaded": {
@@ -456,92 +662,304 @@ async def health_check():
         }
     }
 
-@app.post("/recommendations/stream")
-async def get_stream_recommendations(request: RecommendationRequest):
+@app.get("/health/live")
+async def liveness_check():
+    """Liveness probe: the event loop is serving requests"""
+    return {"status": "alive"}
+
+@app.get("/health/ready")
+async def readiness_check():
+    """Readiness probe: 503 until datasets are loaded and the catalogue is published"""
+    if not startup_timeline.ready:
+        return ORJSONResponse(
+            status_code=503,
+            content={"status": "starting", "startup": startup_timeline.to_dict()},
+            headers={"Retry-After": "1"}
+        )
+    return {"status": "ready", "ready_after_s": startup_timeline.ready_after}
+
+@app.get("/cache/stats")
+async def get_cache_stats():
+    """Recommendation cache hit/miss/eviction counters"""
+    return recommendation_cache.stats()
+
+@app.get("/shadow-scoring/stats")
+async def get_shadow_scoring_stats():
+    """Shadow candidate outcomes, mean top-k diff against the primary ranking and recent comparisons"""
+    if not shadow_scorer:
+        return {"enabled": False}
+    return {"enabled": True, **shadow_scorer.stats()}
+
+@app.get("/materialized/stats")
+async def get_materialized_stats():
+    """Materialized table lookup outcomes, write-backs and the last precompute run"""
+    if not materialized_recommendations:
+        return {"enabled": False}
+    return {"enabled": True, **(await execution_layer.run_io(materialized_recommendations.stats))}
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Prometheus text exposition of request and stage metrics"""
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+def _stats_samples(stats: Optional[Dict[str, Any]], keys: List[str]) -> List:
+    """Gauge samples for selected numeric fields of a stats dict"""
+    if not stats:
+        return []
+    return [({'field': key}, stats[key]) for key in keys if isinstance(stats.get(key), (int, float))]
+
+REGISTRY.register_gauge(
+    'eduniti_recommendation_cache', 'Recommendation cache counters and size',
+    lambda: _stats_samples(recommendation_cache.stats(),
+                           ['hits', 'shared_hits', 'misses', 'evictions', 'expirations', 'size', 'hit_rate'])
+)
+REGISTRY.register_gauge(
+    'eduniti_execution', 'Execution layer queue depths and call counters',
+    lambda: _stats_samples(execution_layer.stats(),
+                           ['scoring_pending', 'io_pending', 'scoring_calls', 'io_calls',
+                            'scoring_rejected', 'io_rejected'])
+)
+REGISTRY.register_gauge(
+    'eduniti_ab_result_writer', 'Background A/B result writer queue and counters',
+    lambda: _stats_samples(ab_result_writer.stats() if ab_result_writer else None,
+                           ['queue_depth', 'enqueued', 'written', 'rejected', 'failed', 'dropped', 'batches'])
+)
+REGISTRY.register_gauge(
+    'eduniti_startup_phase_seconds', 'Duration of each startup phase',
+    lambda: [({'phase': phase['phase']}, phase['duration_s'])
+             for phase in startup_timeline.to_dict()['phases'] if phase['duration_s'] is not None]
+)
+REGISTRY.register_gauge(
+    'eduniti_ready', 'Whether datasets are loaded and recommendations can be served',
+    lambda: [({}, float(startup_timeline.ready))]
+)
+
+def require_ready():
+    """Reject catalogue-backed requests until background startup has finished"""
+    if not startup_timeline.ready:
+        raise HTTPException(status_code=503, detail="Service is starting", headers={"Retry-After": "1"})
+
+def require_profiling_admin(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    """Allow profiling administration only with the configured bearer token"""
+    if not profiler.token or not hmac.compare_digest(credentials.credentials, profiler.token):
+        raise HTTPException(status_code=403, detail="Profiling administration is not allowed")
+
+@app.post("/profiling/enable", dependencies=[Depends(require_profiling_admin)])
+async def enable_profiling(sample_rate: float = 0.1, interval_ms: float = 1.0):
+    """Profile a fraction of requests until disabled"""
+    try:
+        profiler.enable(sample_rate, interval_ms)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return profiler.status()
+
+@app.post("/profiling/disable", dependencies=[Depends(require_profiling_admin)])
+async def disable_profiling():
+    """Stop selecting requests for profiling"""
+    profiler.disable()
+    return profiler.status()
+
+@app.post("/profiling/reset", dependencies=[Depends(require_profiling_admin)])
+async def reset_profiling():
+    """Drop collected stacks and request breakdowns"""
+    profiler.reset()
+    return profiler.status()
+
+@app.get("/profiling/status", dependencies=[Depends(require_profiling_admin)])
+async def get_profiling_status():
+    """Profiler configuration and sample counts per endpoint"""
+    return profiler.status()
+
+@app.get("/profiling/flamegraph", response_class=PlainTextResponse,
+         dependencies=[Depends(require_profiling_admin)])
+async def get_profiling_flamegraph(endpoint: Optional[str] = None):
+    """Collapsed stacks for flamegraph.pl/speedscope, for one endpoint or all"""
+    return PlainTextResponse(profiler.collapsed(endpoint))
+
+@app.get("/profiling/requests", dependencies=[Depends(require_profiling_admin)])
+async def get_profiled_requests(limit: int = 50):
+    """Recent profiled requests with their scoring/A-B/serialization time breakdown"""
+    return {"requests": list(profiler.recent)[-limit:]}
+
+@app.get("/execution/stats")
+async def get_execution_stats():
+    """Execution layer queue depths and rejection counters"""
+    return execution_layer.stats()
+
+@app.get("/programs/search", dependencies=[Depends(require_ready)])
+async def search_programs(stream: Optional[str] = None,
+                          specialization: Optional[str] = None,
+                          max_fees: Optional[int] = None,
+                          max_cut_off: Optional[float] = None,
+                          min_seats: Optional[int] = None,
+                          entrance_exam: Optional[str] = None,
+                          limit: int = 50):
+    """Search programs across colleges, cheapest first"""
+    if program_index is None:
+        raise HTTPException(status_code=503, detail="Catalogue not loaded")
+    
+    programs = program_index.query(
+        stream=stream,
+        specialization=specialization,
+        max_fees=max_fees,
+        max_cut_off=max_cut_off,
+        min_seats=min_seats,
+        entrance_exam=entrance_exam,
+        limit=limit
+    )
+    programs['specializations'] = programs['specializations'].map(list)
+    return {
+        "programs": programs.to_dict('records'),
+        "count": len(programs),
+        "timestamp": datetime.now().isoformat()
+    }
+
+@app.get("/colleges/nearby", dependencies=[Depends(require_ready)])
+async def get_nearby_colleges(latitude: float,
+                              longitude: float,
+                              radius_km: Optional[float] = None,
+                              limit: int = 20):
+    """Colleges within radius_km of a point, or the nearest ones if no radius is given"""
+    if geo_index is None:
+        raise HTTPException(status_code=503, detail="Catalogue not loaded")
+    if not -90 <= latitude <= 90 or not -180 <= longitude <= 180:
+        raise HTTPException(status_code=400, detail="Invalid coordinates")
+    
+    try:
+        if radius_km is not None:
+            positions, distances = geo_index.within_radius(latitude, longitude, radius_km, limit=limit)
+        else:
+            positions, distances = geo_index.nearest(latitude, longitude, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    colleges = []
+    for position, distance in zip(positions, distances):
+        college = college_data.iloc[position]
+        colleges.append({
+            'college_id': college.get('id', ''),
+            'name': college.get('name', ''),
+            'distance_km': round(float(distance), 2),
+            'location': college.get('location', {}),
+            'type': college.get('type', '')
+        })
+    
+    return {
+        "colleges": colleges,
+        "count": len(colleges),
+        "timestamp": datetime.now().isoformat()
+    }
+
+@app.post("/recommendations/stream", dependencies=[Depends(require_ready)])
+async def get_stream_recommendations(request: RecommendationRequest, background_tasks: BackgroundTasks):
     """Get advanced stream recommendations"""
     try:
         user_profile = request.user_profile
         session_id = request.session_id or str(uuid.uuid4())
         
-        # Get user's A/B test variant
-        variant = get_user_variant(user_profile.user_id, "recommendation")
+        # Get user's A/B test variant (may persist a new assignment)
+        test_id, variant = await execution_layer.run_io(get_user_assignment, user_profile.user_id, "recommendation")
         
         # Calculate recommendations
-        recommendations = calculate_advanced_stream_recommendation(user_profile)
-        
-        # Record A/B test result
-        if ab_framework and variant != "baseline":
-            try:
-                ab_framework.record_result(
-                    test_id="recommendation_test",  # This would be dynamic in production
-                    user_id=user_profile.user_id,
-                    metrics={
-                        'recommendation_accuracy': recommendations[0]['confidence'] if recommendations else 0,
-                        'user_satisfaction': 4.0,  # This would come from user feedback
-                        'click_through_rate': 0.15  # This would be tracked
-                    },
-                    user_profile=user_profile.dict(),
-                    recommendation_data={'recommendations': recommendations}
-                )
-            except Exception as e:
-                logger.error(f"Error recording A/B test result: {e}")
+        recommendations = await compute_recommendations(
+            'stream', variant, calculate_advanced_stream_recommendation, user_profile,
+            background_tasks=background_tasks
+        )
         
-        return {
+        # Record A/B test result for the test the user is in (written in the background)
+        record_recommendation_result(test_id, user_profile, 'stream',
+                                     recommendations[0]['confidence'] if recommendations else 0, recommendations)
+        
+        # Returned as a response so FastAPI skips its jsonable_encoder pass
+        return ORJSONResponse({
             "recommendations": recommendations,
             "variant": variant,
             "session_id": session_id,
             "confidence_score": recommendations[0]['confidence'] if recommendations else 0
-        }
+        })
         
+    except ExecutorSaturated:
+        raise HTTPException(status_code=429, detail="Too many concurrent requests, please retry")
     except Exception as e:
         logger.error(f"Error in stream recommendations: {str(e)}")
         raise HTTPException(status_code=500, detail="Error generating stream recommendations")
 
-@app.post("/recommendations/college")
-async def get_college_recommendations(request: RecommendationRequest):
+@app.post("/recommendations/college", dependencies=[Depends(require_ready)])
+async def get_college_recommendations(request: RecommendationRequest, background_tasks: BackgroundTasks):
     """Get advanced college recommendations"""
     try:
         user_profile = request.user_profile
         limit = request.limit
         session_id = request.session_id or str(uuid.uuid4())
         
-        # Get user's A/B test variant
-        variant = get_user_variant(user_profile.user_id, "recommendation")
+        # Get user's A/B test variant (may persist a new assignment)
+        test_id, variant, scoring = await execution_layer.run_io(get_user_arm, user_profile.user_id, "recommendation")
         
-        # Calculate recommendations
-        recommendations = calculate_advanced_college_recommendations(user_profile, limit)
+        # Calculate recommendations with the variant's compiled scorer
+        matches = await compute_recommendations(
+            'college', variant, score_college_matches, user_profile, limit, scoring, background_tasks
+        )
         
-        return {
-            "recommendations": recommendations,
+        # Record A/B test result for the test the user is in (written in the background)
+        record_recommendation_result(test_id, user_profile, 'college',
+                                     min(matches[0]['match_score'], 1.0) if matches else 0,
+                                     recorded_matches(college_data, matches, 'id'))
+        
+        # Compare a shadow candidate on this request once the response is sent
+        if shadow_scorer and shadow_scorer.sample():
+            background_tasks.add_task(shadow_scorer.run, 'college', score_college_matches, matches,
+                                      (user_profile, limit), scoring)
+        
+        # Splice the pre-encoded college fragments with the per-user fields
+        return FragmentResponse({
+            "recommendations": college_fragments.render_list(matches),
             "variant": variant,
             "session_id": session_id,
-            "total_found": len(recommendations)
-        }
+            "total_found": len(matches)
+        })
         
+    except ExecutorSaturated:
+        raise HTTPException(status_code=429, detail="Too many concurrent requests, please retry")
     except Exception as e:
         logger.error(f"Error in college recommendations: {str(e)}")
         raise HTTPException(status_code=500, detail="Error generating college recommendations")
 
-@app.post("/recommendations/career")
-async def get_career_recommendations(request: RecommendationRequest):
+@app.post("/recommendations/career", dependencies=[Depends(require_ready)])
+async def get_career_recommendations(request: RecommendationRequest, background_tasks: BackgroundTasks):
     """Get advanced career recommendations"""
     try:
         user_profile = request.user_profile
         session_id = request.session_id or str(uuid.uuid4())
         
-        # Get user's A/B test variant
-        variant = get_user_variant(user_profile.user_id, "recommendation")
+        # Get user's A/B test variant (may persist a new assignment)
+        test_id, variant, scoring = await execution_layer.run_io(get_user_arm, user_profile.user_id, "recommendation")
         
-        # Calculate recommendations
-        recommendations = calculate_advanced_career_recommendations(user_profile)
+        # Calculate recommendations with the variant's compiled scorer
+        matches = await compute_recommendations(
+            'career', variant, score_career_matches, user_profile, scoring=scoring,
+            background_tasks=background_tasks
+        )
         
-        return {
-            "recommendations": recommendations,
+        # Record A/B test result for the test the user is in (written in the background)
+        record_recommendation_result(test_id, user_profile, 'career',
+                                     min(matches[0]['match_score'], 1.0) if matches else 0,
+                                     recorded_matches(career_data, matches, 'career'))
+        
+        # Compare a shadow candidate on this request once the response is sent
+        if shadow_scorer and shadow_scorer.sample():
+            background_tasks.add_task(shadow_scorer.run, 'career', score_career_matches, matches,
+                                      (user_profile,), scoring)
+        
+        # Splice the pre-encoded career fragments with the per-user fields
+        return FragmentResponse({
+            "recommendations": career_fragments.render_list(matches),
             "variant": variant,
             "session_id": session_id,
-            "total_found": len(recommendations)
-        }
+            "total_found": len(matches)
+        })
         
+    except ExecutorSaturated:
+        raise HTTPException(status_code=429, detail="Too many concurrent requests, please retry")
     except Exception as e:
         logger.error(f"Error in career recommendations: {str(e)}")
         raise HTTPException(status_code=500, detail="Error generating career recommendations")
@@ -553,13 +971,14 @@ async def submit_feedback(feedback: FeedbackRequest):
         if not feedback_system:
             raise HTTPException(status_code=503, detail="Feedback system not available")
         
-        feedback_id = feedback_system.submit_feedback(
-            user_id=feedback.user_id,
-            session_id=feedback.session_id,
-            feedback_type=feedback.feedback_type,
-            rating=feedback.rating,
-            comment=feedback.comment,
-            context=feedback.context
+        feedback_id = await execution_layer.run_io(
+            feedback_system.submit_feedback,
+            feedback.user_id,
+            feedback.session_id,
+            feedback.feedback_type,
+            feedback.rating,
+            feedback.comment,
+            feedback.context
         )
         
         return {
@@ -568,6 +987,10 @@ async def submit_feedback(feedback: FeedbackRequest):
             "message": "Thank you for your feedback!"
         }
         
+    except HTTPException:
+        raise
+    except ExecutorSaturated:
+        raise HTTPException(status_code=429, detail="Too many concurrent requests, please retry")
     except Exception as e:
         logger.error(f"Error submitting feedback: {str(e)}")
         raise HTTPException(status_code=500, detail="Error submitting feedback")
@@ -587,19 +1010,39 @@ async def get_feedback_summary(feedback_type: Optional[str] = None, days: int =
         raise HTTPException(status_code=500, detail="Error getting feedback summary")
 
 @app.get("/ab-tests")
-async def get_ab_tests():
-    """Get all A/B tests"""
+async def get_ab_tests(include_archived: bool = False):
+    """Get active A/B tests (and archived ones on request)"""
     try:
         if not ab_framework:
             raise HTTPException(status_code=503, detail="A/B testing system not available")
         
-        tests = ab_framework.get_all_tests()
+        tests = await execution_layer.run_io(ab_framework.get_all_tests)
+        if include_archived:
+            return {"tests": tests, "archived": await execution_layer.run_io(ab_framework.get_archived_tests)}
         return {"tests": tests}
         
+    except HTTPException:
+        raise
+    except ExecutorSaturated:
+        raise HTTPException(status_code=429, detail="Too many concurrent requests, please retry")
     except Exception as e:
         logger.error(f"Error getting A/B tests: {str(e)}")
         raise HTTPException(status_code=500, detail="Error getting A/B tests")
 
+@app.get("/ab-tests/writer/stats")
+async def get_ab_writer_stats():
+    """Background A/B result writer queue depth, batch sizes and drops"""
+    if not ab_result_writer:
+        raise HTTPException(status_code=503, detail="A/B testing system not available")
+    return ab_result_writer.stats()
+
+@app.get("/ab-tests/assignments/{user_id}")
+async def get_ab_test_assignments(user_id: str):
+    """A user's test and variant in every experiment layer"""
+    if not ab_framework:
+        raise HTTPException(status_code=503, detail="A/B testing system not available")
+    return {"user_id": user_id, "layers": await execution_layer.run_io(ab_framework.resolve_assignments, user_id)}
+
 @app.get("/ab-tests/{test_id}/results")
 async def get_ab_test_results(test_id: str):
     """Get A/B test results"""
@@ -607,18 +1050,58 @@ async def get_ab_test_results(test_id: str):
         if not ab_framework:
             raise HTTPException(status_code=503, detail="A/B testing system not available")
         
-        results = ab_framework.get_test_results(test_id)
-        analysis = ab_framework.analyze_test(test_id)
+        results = await execution_layer.run_io(ab_framework.get_test_results, test_id)
+        analysis = await execution_layer.run_io(ab_framework.analyze_test, test_id)
         
         return {
             "results": results,
             "analysis": analysis
         }
         
+    except HTTPException:
+        raise
+    except ExecutorSaturated:
+        raise HTTPException(status_code=429, detail="Too many concurrent requests, please retry")
     except Exception as e:
         logger.error(f"Error getting A/B test results: {str(e)}")
         raise HTTPException(status_code=500, detail="Error getting A/B test results")
 
+@app.get("/ab-tests/{test_id}/allocation")
+async def get_ab_test_allocation(test_id: str):
+    """Current traffic weights of a test (fixed split or adaptive posterior weights)"""
+    if not ab_framework:
+        raise HTTPException(status_code=503, detail="A/B testing system not available")
+    try:
+        return await execution_layer.run_io(ab_framework.get_allocation, test_id)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+@app.get("/ab-tests/{test_id}/segments")
+async def get_ab_test_segments(test_id: str,
+                               dimension: str = 'state',
+                               bins: Optional[str] = None,
+                               start: Optional[datetime] = None,
+                               end: Optional[datetime] = None,
+                               min_count: int = 1):
+    """A/B test results per user_profile segment
+    
+    ``dimension`` is a precomputed one (state, age_band, class_level, stream,
+    income_band, parent_education) or any dotted profile path; ``bins``
+    ("16,18,21") buckets a numeric path.
+    """
+    if not segment_analyzer:
+        raise HTTPException(status_code=503, detail="A/B testing system not available")
+    try:
+        edges = parse_bins(bins) if bins else None
+        return await execution_layer.run_io(segment_analyzer.analyze, test_id, dimension, edges, start, end, min_count)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except ExecutorSaturated:
+        raise HTTPException(status_code=429, detail="Too many concurrent requests, please retry")
+    except Exception as e:
+        logger.error(f"Error analyzing A/B test segments: {str(e)}")
+        raise HTTPException(status_code=500, detail="Error analyzing A/B test segments")
+
 @app.get("/analytics/improvement-roadmap")
 async def get_improvement_roadmap():
     """Get improvement roadmap based on feedback"""
@@ -640,16 +1123,21 @@ async def record_ab_test_result(result: ABTestRequest):
         if not ab_framework:
             raise HTTPException(status_code=503, detail="A/B testing system not available")
         
-        ab_framework.record_result(
-            test_id=result.test_id,
-            user_id=result.user_id,
-            metrics=result.metrics,
-            user_profile=result.user_profile,
-            recommendation_data=result.recommendation_data
+        await execution_layer.run_io(
+            ab_framework.record_result,
+            result.test_id,
+            result.user_id,
+            result.metrics,
+            result.user_profile,
+            result.recommendation_data
         )
         
         return {"status": "recorded", "message": "A/B test result recorded successfully"}
         
+    except HTTPException:
+        raise
+    except ExecutorSaturated:
+        raise HTTPException(status_code=429, detail="Too many concurrent requests, please retry")
     except Exception as e:
         logger.error(f"Error recording A/B test result: {str(e)}")
         raise HTTPException(status_code=500, detail="Error recording A/B test result")
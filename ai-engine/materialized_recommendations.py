@@ -0,0 +1,633 @@
+"""
+Materialized Recommendations for EduNiti AI Engine
+Precomputed stream, college and career rankings of known users, keyed by user and profile fingerprint
+"""
+
+import argparse
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import as_completed
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, List, Any, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from execution import catalogue_pool
+from instrumentation import REGISTRY, Counter
+from recommendation_cache import profile_fingerprint
+from replay_evaluator import LoggedRequests, load_catalogue, replay_profile
+from serialization import dumps, loads
+from stream_scoring import StreamScoringTable
+from variant_scoring import ScoringCatalogue, VariantScorers, BASELINE_SCORING, scoring_config
+
+MATERIALIZED_KINDS = ('stream', 'college', 'career')
+
+# Kinds ranked over catalogue rows; their rankings carry catalogue positions
+RANKED_KINDS = ('college', 'career')
+
+# Stream rankings do not depend on the A/B arm, so they share one scoring key
+STREAM_SCORING_KEY = 'stream'
+
+# Colleges kept per user; requests for more are scored live unless the ranking is exhausted
+DEFAULT_COLLEGE_DEPTH = 20
+
+DEFAULT_CHUNK_SIZE = 2000
+
+# Users whose rankings are read per query while classifying entries
+LOOKUP_BATCH = 500
+
+LOOKUP_OUTCOMES = ('hit', 'missing', 'stale_profile', 'stale_scoring', 'stale_catalogue', 'shallow')
+
+MATERIALIZED_LOOKUPS = REGISTRY.register(Counter(
+    'eduniti_materialized_lookups_total', 'Materialized recommendation lookups by kind and outcome', ('kind', 'outcome')
+))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS materialized_profiles (
+    user_id TEXT PRIMARY KEY,
+    fingerprint TEXT NOT NULL,
+    profile TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS materialized_rankings (
+    user_id TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    fingerprint TEXT NOT NULL,
+    scoring_key TEXT NOT NULL,
+    catalogue_version TEXT NOT NULL,
+    depth INTEGER,
+    recommendations TEXT NOT NULL,
+    computed_at TEXT NOT NULL,
+    PRIMARY KEY (user_id, kind)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS materialized_catalogue (
+    kind TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    row_key TEXT NOT NULL,
+    row_hash TEXT NOT NULL,
+    PRIMARY KEY (kind, position)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS materialized_meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+) WITHOUT ROWID;
+"""
+
+_RANKING_COLUMNS = ('user_id', 'kind', 'fingerprint', 'scoring_key', 'catalogue_version', 'depth',
+                    'recommendations', 'computed_at')
+_SELECT_RANKING = ("SELECT fingerprint, scoring_key, catalogue_version, depth, recommendations "
+                   "FROM materialized_rankings WHERE user_id = ? AND kind = ?")
+_UPSERT_RANKING = (f"INSERT OR REPLACE INTO materialized_rankings ({', '.join(_RANKING_COLUMNS)}) "
+                   f"VALUES ({', '.join('?' * len(_RANKING_COLUMNS))})")
+_UPSERT_PROFILE = ("INSERT OR REPLACE INTO materialized_profiles (user_id, fingerprint, profile, updated_at) "
+                   "VALUES (?, ?, ?, ?)")
+_SELECT_PROFILES = "SELECT user_id, fingerprint, profile, updated_at FROM materialized_profiles"
+_SELECT_CATALOGUE = "SELECT kind, row_key, row_hash FROM materialized_catalogue ORDER BY kind, position"
+_INSERT_CATALOGUE = "INSERT INTO materialized_catalogue (kind, position, row_key, row_hash) VALUES (?, ?, ?, ?)"
+_UPSERT_META = "INSERT OR REPLACE INTO materialized_meta (key, value) VALUES (?, ?)"
+_SELECT_META = "SELECT key, value FROM materialized_meta"
+
+# A stored ranking: its recommendations stay encoded until they are needed
+RankingRow = namedtuple('RankingRow', ['fingerprint', 'scoring_key', 'catalogue_version', 'depth', 'recommendations'])
+
+def _encode(value: Any) -> str:
+    return dumps(value).decode('utf-8')
+
+def _now() -> str:
+    return datetime.now().isoformat(timespec='seconds')
+
+class MaterializedRecommendations:
+    """Materialized rankings in SQLite (WAL), read by every API worker and written by the precompute job
+
+    One row per user and kind holds the ranking together with what it was
+    computed from: the profile fingerprint, the A/B arm's scoring key and the
+    catalogue version. A lookup serves a row only when all three match the
+    request; otherwise the caller scores live and writes the fresh ranking
+    back with ``refresh``. Connections are per thread, as in the SQLite
+    experiment store; keep the database on a local disk.
+    """
+
+    def __init__(self, path: str = 'data/materialized_recommendations.db', busy_timeout_ms: int = 5000):
+        self.path = path
+        self.busy_timeout_ms = busy_timeout_ms
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._counts: Dict[str, Dict[str, int]] = {}
+        self._refreshes = 0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._connection().executescript(_SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=self.busy_timeout_ms / 1000,
+                                         isolation_level=None, cached_statements=64)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.execute(f'PRAGMA busy_timeout={int(self.busy_timeout_ms)}')
+            self._local.connection = connection
+        return connection
+
+    @contextmanager
+    def _transaction(self):
+        connection = self._connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            yield connection
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        connection.execute('COMMIT')
+
+    def _count(self, kind: str, outcome: str):
+        MATERIALIZED_LOOKUPS.inc((kind, outcome))
+        with self._lock:
+            self._counts.setdefault(kind, dict.fromkeys(LOOKUP_OUTCOMES, 0))[outcome] += 1
+
+    def lookup(self,
+               user_id: str,
+               kind: str,
+               fingerprint: str,
+               scoring_key: str,
+               catalogue_version: str,
+               limit: Optional[int] = None) -> Optional[List[Dict[str, Any]]]:
+        """The materialized ranking of a request, or None when it is missing or stale"""
+        row = self._connection().execute(_SELECT_RANKING, (user_id, kind)).fetchone()
+        if row is None:
+            outcome = 'missing'
+        else:
+            row = RankingRow(*row)
+            if row.fingerprint != fingerprint:
+                outcome = 'stale_profile'
+            elif row.scoring_key != scoring_key:
+                outcome = 'stale_scoring'
+            elif row.catalogue_version != catalogue_version:
+                outcome = 'stale_catalogue'
+            else:
+                recommendations = loads(row.recommendations)
+                # A truncated ranking only answers requests within its depth
+                if limit is not None and row.depth is not None and limit > row.depth \
+                        and len(recommendations) >= row.depth:
+                    outcome = 'shallow'
+                else:
+                    self._count(kind, 'hit')
+                    return recommendations[:limit] if limit is not None else recommendations
+        self._count(kind, outcome)
+        return None
+
+    def refresh(self,
+                user_id: str,
+                kind: str,
+                profile: Dict[str, Any],
+                fingerprint: str,
+                scoring_key: str,
+                catalogue_version: str,
+                depth: Optional[int],
+                recommendations: List[Dict[str, Any]]):
+        """Store a live-scored ranking and the profile it was scored for"""
+        now = _now()
+        with self._transaction() as connection:
+            connection.execute(_UPSERT_PROFILE, (user_id, fingerprint, _encode(profile), now))
+            connection.execute(_UPSERT_RANKING, (user_id, kind, fingerprint, scoring_key, catalogue_version,
+                                                 depth, _encode(recommendations), now))
+        with self._lock:
+            self._refreshes += 1
+
+    def load_rankings(self, user_ids: Sequence[str]) -> Dict[Tuple[str, str], RankingRow]:
+        """(user, kind) -> stored ranking of the given users"""
+        rankings = {}
+        connection = self._connection()
+        for start in range(0, len(user_ids), LOOKUP_BATCH):
+            batch = list(user_ids[start:start + LOOKUP_BATCH])
+            rows = connection.execute(
+                f"SELECT user_id, kind, fingerprint, scoring_key, catalogue_version, depth, recommendations "
+                f"FROM materialized_rankings WHERE user_id IN ({', '.join('?' * len(batch))})", batch
+            )
+            for row in rows:
+                rankings[(row[0], row[1])] = RankingRow(*row[2:])
+        return rankings
+
+    def write_rankings(self, rows: Sequence[Tuple]):
+        """Upsert rankings (in ``_RANKING_COLUMNS`` order) in one transaction"""
+        with self._transaction() as connection:
+            connection.executemany(_UPSERT_RANKING, rows)
+
+    def load_profiles(self) -> Dict[str, Tuple[str, Dict[str, Any], str]]:
+        """user -> (fingerprint, profile, updated_at) of every stored profile"""
+        return {user_id: (fingerprint, loads(profile), updated_at)
+                for user_id, fingerprint, profile, updated_at in self._connection().execute(_SELECT_PROFILES)}
+
+    def write_profiles(self, rows: Sequence[Tuple[str, str, Dict[str, Any], str]]):
+        """Upsert (user_id, fingerprint, profile, updated_at) rows in one transaction"""
+        with self._transaction() as connection:
+            connection.executemany(_UPSERT_PROFILE, [(user_id, fingerprint, _encode(profile), updated_at)
+                                                     for user_id, fingerprint, profile, updated_at in rows])
+
+    def meta(self) -> Dict[str, str]:
+        """Catalogue version and signature of the last precompute run"""
+        return dict(self._connection().execute(_SELECT_META).fetchall())
+
+    def load_snapshot(self) -> Optional['CatalogueSnapshot']:
+        """Catalogue the last precompute run materialized against, or None before the first run"""
+        meta = self.meta()
+        if 'catalogue_version' not in meta:
+            return None
+        rows = {kind: ([], []) for kind in RANKED_KINDS}
+        for kind, row_key, row_hash in self._connection().execute(_SELECT_CATALOGUE):
+            rows[kind][0].append(row_key)
+            rows[kind][1].append(row_hash)
+        return CatalogueSnapshot(meta['catalogue_version'], rows, meta.get('stream_signature'))
+
+    def save_snapshot(self, snapshot: 'CatalogueSnapshot'):
+        """Record the catalogue the stored rankings were brought up to date with"""
+        with self._transaction() as connection:
+            connection.execute("DELETE FROM materialized_catalogue")
+            for kind, (keys, hashes) in snapshot.rows.items():
+                connection.executemany(_INSERT_CATALOGUE, [(kind, position, key, row_hash) for position, (key, row_hash)
+                                                           in enumerate(zip(keys, hashes))])
+            connection.executemany(_UPSERT_META, [('catalogue_version', snapshot.version),
+                                                  ('stream_signature', snapshot.stream_signature),
+                                                  ('refreshed_at', _now())])
+
+    def stats(self) -> Dict[str, Any]:
+        """Lookup outcomes per kind, refreshes and the last precompute run"""
+        with self._lock:
+            kinds = {}
+            for kind, counts in self._counts.items():
+                lookups = sum(counts.values())
+                kinds[kind] = {**counts, 'hit_rate': counts['hit'] / lookups if lookups else 0}
+            refreshes = self._refreshes
+        return {'path': self.path, 'kinds': kinds, 'refreshes': refreshes, 'last_run': self.meta()}
+
+    def close(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+def _row_keys(frame: pd.DataFrame) -> List[str]:
+    """Stable identity of each catalogue row: a unique id/name column, else the position"""
+    for column in ('id', 'name', 'career'):
+        if column in frame and frame[column].notna().all() and frame[column].is_unique:
+            return [str(value) for value in frame[column].tolist()]
+    return [str(position) for position in range(len(frame))]
+
+def _row_hashes(frame: pd.DataFrame) -> List[str]:
+    return [hashlib.blake2b(dumps(record), digest_size=8).hexdigest() for record in frame.to_dict('records')]
+
+def stream_signature(stream_table: StreamScoringTable) -> str:
+    """Hash of everything stream rankings are computed from"""
+    content = [stream_table.streams, stream_table.details, stream_table.keywords,
+               stream_table.interest_weights.tolist(), stream_table.subject_matrix.tolist()]
+    return hashlib.blake2b(dumps(content), digest_size=8).hexdigest()
+
+class CatalogueSnapshot:
+    """Row keys and content hashes of the college and career catalogues of one version"""
+
+    def __init__(self, version: str, rows: Dict[str, Tuple[List[str], List[str]]], stream_signature: Optional[str]):
+        self.version = version
+        self.rows = rows
+        self.stream_signature = stream_signature
+
+    @classmethod
+    def from_catalogue(cls,
+                       version: str,
+                       college_data: pd.DataFrame,
+                       career_data: pd.DataFrame,
+                       stream_table: StreamScoringTable) -> 'CatalogueSnapshot':
+        return cls(version, {
+            'college': (_row_keys(college_data), _row_hashes(college_data)),
+            'career': (_row_keys(career_data), _row_hashes(career_data))
+        }, stream_signature(stream_table))
+
+class CatalogueDelta:
+    """Rows that changed between two catalogue snapshots
+
+    ``remap[kind]`` maps an old catalogue position to the row's new position,
+    or -1 when the row was removed or modified; ``entered[kind]`` holds the
+    new positions of added and modified rows.
+    """
+
+    def __init__(self, previous: CatalogueSnapshot, current: CatalogueSnapshot):
+        self.remap: Dict[str, np.ndarray] = {}
+        self.entered: Dict[str, np.ndarray] = {}
+        for kind in RANKED_KINDS:
+            old_keys, old_hashes = previous.rows[kind]
+            new_keys, new_hashes = current.rows[kind]
+            new_positions = {key: position for position, key in enumerate(new_keys)}
+            remap = np.full(len(old_keys), -1, dtype=np.int64)
+            unchanged = np.zeros(len(new_keys), dtype=bool)
+            for old, (key, row_hash) in enumerate(zip(old_keys, old_hashes)):
+                new = new_positions.get(key)
+                if new is not None and new_hashes[new] == row_hash:
+                    remap[old] = new
+                    unchanged[new] = True
+            self.remap[kind] = remap
+            self.entered[kind] = np.flatnonzero(~unchanged)
+        self.stream_changed = previous.stream_signature != current.stream_signature
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            **{kind: {'departed': int((self.remap[kind] < 0).sum()), 'entered': len(self.entered[kind])}
+               for kind in RANKED_KINDS},
+            'stream_changed': self.stream_changed
+        }
+
+def rank_profile(scorers: VariantScorers,
+                 stream_table: StreamScoringTable,
+                 profile: Dict[str, Any],
+                 config: Dict[str, Any],
+                 kinds: Sequence[str],
+                 college_depth: int) -> Dict[str, List[Dict[str, Any]]]:
+    """The rankings the endpoints would compute for a profile under a scoring configuration"""
+    scorer_input = replay_profile(profile)
+    college_scorer, career_scorer = scorers.scorers(config)
+    rankings = {}
+    for kind in kinds:
+        if kind == 'stream':
+            rankings[kind] = stream_table.recommend(scorer_input)
+        elif kind == 'college':
+            rankings[kind] = college_scorer.score(scorer_input, college_depth)
+        else:
+            rankings[kind] = career_scorer.score(scorer_input)
+    return rankings
+
+# Scorers and stream table of the worker process, installed by the pool initializer
+_worker_state: Optional[Tuple[VariantScorers, StreamScoringTable]] = None
+
+def _install_catalogue(catalogue: Tuple[ScoringCatalogue, StreamScoringTable]):
+    """Process pool initializer: compile against the parent's catalogue"""
+    global _worker_state
+    scoring_catalogue, stream_table = catalogue
+    scorers = VariantScorers()
+    scorers.install(scoring_catalogue)
+    _worker_state = (scorers, stream_table)
+
+def _materialize_chunk(items: List[Tuple[Dict[str, Any], Dict[str, Any], Tuple[str, ...]]],
+                       college_depth: int,
+                       state: Optional[Tuple[VariantScorers, StreamScoringTable]] = None) -> List[Dict[str, str]]:
+    """Encoded rankings of each (profile, config, kinds) item of a chunk"""
+    scorers, stream_table = state or _worker_state
+    return [{kind: _encode(ranking)
+             for kind, ranking in rank_profile(scorers, stream_table, profile, config, kinds, college_depth).items()}
+            for profile, config, kinds in items]
+
+class RecommendationMaterializer:
+    """Brings the materialized rankings of known users up to date with their profiles, arms and the catalogue
+
+    A ranking is recomputed when the user's profile fingerprint or arm
+    changed. After a catalogue change it is recomputed only when it contains
+    a removed or modified row, or when an added or modified row would enter
+    it - found by scoring the profile against just those rows, since every
+    row's score depends on the profile and that row alone. Other rankings
+    keep their items and have their catalogue positions remapped. Profiles
+    sharing a fingerprint and arm are scored once, in chunks on ``workers``
+    processes that install the catalogue once (``workers=0`` scores in-process).
+    """
+
+    def __init__(self,
+                 table: MaterializedRecommendations,
+                 scoring_catalogue: ScoringCatalogue,
+                 stream_table: StreamScoringTable,
+                 version: str,
+                 college_depth: int = DEFAULT_COLLEGE_DEPTH,
+                 workers: Optional[int] = None,
+                 chunk_size: int = DEFAULT_CHUNK_SIZE):
+        if college_depth < 1:
+            raise ValueError("college_depth must be at least 1")
+        self.table = table
+        self.scoring_catalogue = scoring_catalogue
+        self.stream_table = stream_table
+        self.snapshot = CatalogueSnapshot.from_catalogue(version, scoring_catalogue.college_data,
+                                                         scoring_catalogue.career_data, stream_table)
+        self.college_depth = college_depth
+        self.workers = workers
+        self.chunk_size = chunk_size
+
+    def _delta_scorers(self, delta: CatalogueDelta) -> Optional[VariantScorers]:
+        """Scorers over only the added and modified rows"""
+        if not any(len(delta.entered[kind]) for kind in RANKED_KINDS):
+            return None
+        from geo_index import GeoIndex
+        from program_index import ProgramIndex
+
+        catalogue = self.scoring_catalogue
+        colleges = catalogue.college_data.iloc[delta.entered['college']].reset_index(drop=True)
+        careers = catalogue.career_data.iloc[delta.entered['career']].reset_index(drop=True)
+        scorers = VariantScorers()
+        scorers.install(ScoringCatalogue(colleges, careers, ProgramIndex(colleges), GeoIndex.from_colleges(colleges),
+                                         catalogue.radius_km))
+        return scorers
+
+    def _carry(self,
+               kind: str,
+               row: RankingRow,
+               profile: Dict[str, Any],
+               config: Dict[str, Any],
+               delta: CatalogueDelta,
+               delta_scorers: Optional[VariantScorers]) -> Optional[str]:
+        """A stored ranking moved onto the current catalogue, or None when the change reaches it"""
+        if kind == 'stream':
+            return None if delta.stream_changed else row.recommendations
+
+        recommendations = loads(row.recommendations)
+        remap = delta.remap[kind]
+        positions = np.array([match['position'] for match in recommendations], dtype=np.int64)
+        if len(positions) and ((positions >= len(remap)).any() or (remap[positions] < 0).any()):
+            return None
+
+        if delta_scorers is not None and len(delta.entered[kind]):
+            college_scorer, career_scorer = delta_scorers.scorers(config)
+            scorer_input = replay_profile(profile)
+            if kind == 'college':
+                entering = college_scorer.score(scorer_input, 1)
+                truncated = row.depth is not None and len(recommendations) >= row.depth
+                if entering and (not truncated or entering[0]['match_score'] >= recommendations[-1]['match_score']):
+                    return None
+            elif career_scorer.score(scorer_input):
+                # Career rankings hold every candidate, so any candidate row enters
+                return None
+
+        for match, position in zip(recommendations, remap[positions].tolist()):
+            match['position'] = position
+        return _encode(recommendations)
+
+    def run(self,
+            profiles: Dict[str, Tuple[str, Dict[str, Any]]],
+            arms: Dict[str, Dict[str, Any]],
+            full: bool = False) -> Dict[str, Any]:
+        """Refresh the rankings of ``profiles`` (user -> (fingerprint, profile)) under their ``arms``
+        (user -> scoring config, baseline when absent); ``full`` recomputes every ranking"""
+        started = time.perf_counter()
+        version = self.snapshot.version
+        previous = None if full else self.table.load_snapshot()
+        delta = CatalogueDelta(previous, self.snapshot) if previous and previous.version != version else None
+        delta_scorers = self._delta_scorers(delta) if delta else None
+        counts = {'fresh': 0, 'carried': 0, 'recomputed': 0}
+
+        # (fingerprint, scoring key) -> [fingerprint, profile, config, kinds, [(user, kind), ...]]
+        groups: Dict[Tuple[str, str], List] = {}
+        users = list(profiles)
+        for start in range(0, len(users), self.chunk_size):
+            batch = users[start:start + self.chunk_size]
+            stored = self.table.load_rankings(batch)
+            carried = []
+            for user in batch:
+                fingerprint, profile = profiles[user]
+                config = arms.get(user) or BASELINE_SCORING
+                for kind in MATERIALIZED_KINDS:
+                    scoring_key = STREAM_SCORING_KEY if kind == 'stream' else config['key']
+                    row = stored.get((user, kind))
+                    recommendations = None
+                    if full or row is None or row.fingerprint != fingerprint or row.scoring_key != scoring_key:
+                        pass
+                    elif row.catalogue_version == version:
+                        counts['fresh'] += 1
+                        continue
+                    elif delta is not None and row.catalogue_version == previous.version:
+                        recommendations = self._carry(kind, row, profile, config, delta, delta_scorers)
+
+                    if recommendations is not None:
+                        carried.append((user, kind, fingerprint, scoring_key, version, row.depth,
+                                        recommendations, _now()))
+                        continue
+                    group = groups.setdefault((fingerprint, config['key']), [fingerprint, profile, config, set(), []])
+                    group[3].add(kind)
+                    group[4].append((user, kind))
+            if carried:
+                self.table.write_rankings(carried)
+                counts['carried'] += len(carried)
+
+        counts['recomputed'] = self._recompute(list(groups.values()))
+        self.table.save_snapshot(self.snapshot)
+        return {
+            'users': len(profiles),
+            **counts,
+            'scored_profiles': len(groups),
+            'catalogue_version': version,
+            'previous_version': previous.version if previous else None,
+            'catalogue_changes': delta.summary() if delta else None,
+            'elapsed_seconds': time.perf_counter() - started
+        }
+
+    def _recompute(self, groups: List[List]) -> int:
+        """Score every group and write the rankings of its users; returns the rankings written"""
+        chunks = [groups[start:start + self.chunk_size] for start in range(0, len(groups), self.chunk_size)]
+        written = 0
+
+        def write(chunk: List[List], encoded: List[Dict[str, str]]) -> int:
+            now = _now()
+            rows = []
+            for (fingerprint, _, config, _, targets), rankings in zip(chunk, encoded):
+                for user, kind in targets:
+                    rows.append((user, kind, fingerprint, STREAM_SCORING_KEY if kind == 'stream' else config['key'],
+                                 self.snapshot.version, self.college_depth if kind == 'college' else None,
+                                 rankings[kind], now))
+            self.table.write_rankings(rows)
+            return len(rows)
+
+        items = [[(profile, config, tuple(kinds)) for _, profile, config, kinds, _ in chunk] for chunk in chunks]
+        # A single chunk is not worth starting a pool for
+        if self.workers == 0 or len(chunks) <= 1:
+            scorers = VariantScorers()
+            scorers.install(self.scoring_catalogue)
+            for chunk, chunk_items in zip(chunks, items):
+                written += write(chunk, _materialize_chunk(chunk_items, self.college_depth,
+                                                           (scorers, self.stream_table)))
+            return written
+
+        with catalogue_pool((self.scoring_catalogue, self.stream_table), _install_catalogue, self.workers) as pool:
+            futures = {pool.submit(_materialize_chunk, chunk_items, self.college_depth): chunk
+                       for chunk, chunk_items in zip(chunks, items)}
+            for future in as_completed(futures):
+                written += write(futures[future], future.result())
+        return written
+
+def known_profiles(table: MaterializedRecommendations,
+                   logged: LoggedRequests) -> Tuple[Dict[str, Tuple[str, Dict[str, Any]]], List[Tuple]]:
+    """Latest profile of every known user: user -> (fingerprint, profile), plus the profile rows
+    to store for users whose logged profile is newer than the stored one"""
+    stored = table.load_profiles()
+    profiles = {user: (fingerprint, profile) for user, (fingerprint, profile, _) in stored.items()}
+    updates = []
+    if len(logged):
+        # Last request of each user
+        order = np.lexsort((logged.timestamps, logged.user_index))
+        last = order[np.r_[logged.user_index[order][1:] != logged.user_index[order][:-1], True]]
+        for request in last.tolist():
+            user = logged.users[logged.user_index[request]]
+            updated_at = str(logged.timestamps[request])
+            if user in stored and stored[user][2] >= updated_at:
+                continue
+            profile = logged.profiles[logged.profile_index[request]]
+            fingerprint = profile_fingerprint(profile)
+            profiles[user] = (fingerprint, profile)
+            if user not in stored or stored[user][0] != fingerprint:
+                updates.append((user, fingerprint, profile, updated_at))
+    return profiles, updates
+
+def user_arms(framework: Any, users: Sequence[str], layer: str = 'recommendation') -> Dict[str, Dict[str, Any]]:
+    """Scoring config of each user's arm in an experiment layer, without writing assignments"""
+    tests: Dict[str, Dict[str, Dict[str, Any]]] = {}
+    arms = {}
+    for user in users:
+        assignment = framework.resolve_assignments(user, assign=False).get(layer)
+        if not assignment:
+            continue
+        test_id = assignment['test_id']
+        if test_id not in tests:
+            test = framework.get_test(test_id)
+            tests[test_id] = {variant['name']: scoring_config(variant) for variant in test['variants']} if test else {}
+        config = tests[test_id].get(assignment['variant'])
+        if config:
+            arms[user] = config
+    return arms
+
+def main():
+    from ab_store import create_experiment_store
+    from ab_testing import ABTestingFramework
+
+    parser = argparse.ArgumentParser(description="Precompute the materialized recommendations of known users")
+    parser.add_argument('--data-dir', default='data')
+    parser.add_argument('--path', default=os.getenv('MATERIALIZED_RECOMMENDATIONS_PATH') or
+                        'data/materialized_recommendations.db')
+    parser.add_argument('--backend', default=os.getenv('AB_STORE_BACKEND', 'json'), choices=['json', 'sqlite'])
+    parser.add_argument('--sqlite-path', default=os.getenv('AB_SQLITE_PATH') or None)
+    parser.add_argument('--full', action='store_true', help="Recompute every ranking instead of only changed ones")
+    parser.add_argument('--college-depth', type=int, default=DEFAULT_COLLEGE_DEPTH, help="Colleges kept per user")
+    parser.add_argument('--workers', type=int, default=None, help="Scoring processes (0 scores in-process)")
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help="Profiles per scoring task")
+    parser.add_argument('--radius-km', type=float, default=float(os.getenv('COLLEGE_DISTANCE_RADIUS_KM', '100')))
+    args = parser.parse_args()
+
+    scoring_catalogue, stream_table, version = load_catalogue(args.data_dir, args.radius_km)
+    if stream_table is None:
+        raise FileNotFoundError(f"No saved student_outcomes dataset in {args.data_dir}")
+    store = create_experiment_store(args.backend, args.data_dir, args.sqlite_path)
+    table = MaterializedRecommendations(args.path)
+    profiles, updates = known_profiles(table, LoggedRequests.from_store(store))
+    if updates:
+        table.write_profiles(updates)
+    arms = user_arms(ABTestingFramework(data_dir=args.data_dir, store=store), list(profiles))
+
+    materializer = RecommendationMaterializer(table, scoring_catalogue, stream_table, version,
+                                              college_depth=args.college_depth, workers=args.workers,
+                                              chunk_size=args.chunk_size)
+    summary = materializer.run(profiles, arms, full=args.full)
+    print(f"Materialized {summary['users']} users against catalogue {summary['catalogue_version']} "
+          f"in {summary['elapsed_seconds']:.1f}s: {summary['recomputed']} rankings recomputed "
+          f"({summary['scored_profiles']} distinct profiles scored), {summary['carried']} carried over, "
+          f"{summary['fresh']} already fresh")
+    if summary['catalogue_changes']:
+        print(f"Catalogue changes since {summary['previous_version']}: {summary['catalogue_changes']}")
+
+if __name__ == "__main__":
+    main()
@@ -5,20 +5,18 @@ Implements production-ready machine learning models for recommendations
 
 import pandas as pd
 import numpy as np
-import joblib
 import json
 from typing import Dict, List, Any, Tuple, Optional
-from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor, GradientBoostingClassifier
-from sklearn.neural_network import MLPClassifier, MLPRegressor
-from sklearn.model_selection import train_test_split, cross_val_score, GridSearchCV
-from sklearn.preprocessing import StandardScaler, LabelEncoder, OneHotEncoder
-from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score, mean_squared_error, r2_score
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.cluster import KMeans
-from sklearn.decomposition import PCA
 import warnings
+from data_generator import load_dataset
 warnings.filterwarnings('ignore')
 
+def _numeric_column(frame: pd.DataFrame, column: str, default: float) -> np.ndarray:
+    """Float values of a column; missing columns and values take the default"""
+    if column not in frame:
+        return np.full(len(frame), float(default))
+    return pd.to_numeric(frame[column], errors='coerce').fillna(default).to_numpy(dtype=np.float64)
+
 class AdvancedMLModels:
     def __init__(self, data_dir: str = 'data'):
         self.data_dir = data_dir
@@ -29,10 +27,10 @@ class AdvancedMLModels:
         self.feature_importance = {}
         self.model_metrics = {}
         
-        # Load datasets
-        self.colleges_df = pd.read_csv(f'{data_dir}/colleges.csv')
-        self.careers_df = pd.read_csv(f'{data_dir}/careers.csv')
-        self.students_df = pd.read_csv(f'{data_dir}/student_outcomes.csv')
+        # Load datasets (Parquet/Arrow when available, CSV otherwise)
+        self.colleges_df = load_dataset(data_dir, 'colleges')
+        self.careers_df = load_dataset(data_dir, 'careers')
+        self.students_df = load_dataset(data_dir, 'student_outcomes')
         
         # Prepare data
         self._prepare_data()
@@ -54,6 +52,9 @@ class AdvancedMLModels:
     
     def _prepare_student_data(self):
         """Prepare student data for stream prediction model"""
+        # sklearn and joblib are imported where used, so importing this module stays cheap
+        from sklearn.preprocessing import LabelEncoder
+        
         # Convert categorical variables
         self.students_df['gender_encoded'] = LabelEncoder().fit_transform(self.students_df['gender'])
         self.students_df['state_encoded'] = LabelEncoder().fit_transform(self.students_df['state'])
@@ -112,6 +113,8 @@ class AdvancedMLModels:
     
     def _prepare_college_data(self):
         """Prepare college data for recommendation"""
+        from sklearn.preprocessing import LabelEncoder
+        
         # Convert categorical variables
         self.colleges_df['type_encoded'] = LabelEncoder().fit_transform(self.colleges_df['type'])
         self.colleges_df['state_encoded'] = LabelEncoder().fit_transform(self.colleges_df['state'])
@@ -157,6 +160,8 @@ class AdvancedMLModels:
     
     def _prepare_career_data(self):
         """Prepare career data for recommendation"""
+        from sklearn.preprocessing import LabelEncoder
+        
         # Convert categorical variables
         self.careers_df['category_encoded'] = LabelEncoder().fit_transform(self.careers_df['category'])
         self.careers_df['stream_encoded'] = LabelEncoder().fit_transform(self.careers_df['stream'])
@@ -191,6 +196,12 @@ class AdvancedMLModels:
     
     def train_stream_prediction_model(self):
         """Train model to predict suitable stream for students"""
+        from sklearn.ensemble import RandomForestClassifier
+        from sklearn.neural_network import MLPClassifier
+        from sklearn.model_selection import train_test_split
+        from sklearn.preprocessing import StandardScaler
+        from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score
+        
         print("Training stream prediction model...")
         
         # Split data
@@ -268,6 +279,7 @@ class AdvancedMLModels:
         
         # Create similarity matrix based on features
         from sklearn.metrics.pairwise import cosine_similarity
+        from sklearn.preprocessing import StandardScaler
         
         # Normalize college features
         scaler = StandardScaler()
@@ -288,6 +300,7 @@ class AdvancedMLModels:
         
         # Create similarity matrix based on features
         from sklearn.metrics.pairwise import cosine_similarity
+        from sklearn.preprocessing import StandardScaler
         
         # Normalize career features
         scaler = StandardScaler()
@@ -304,6 +317,11 @@ class AdvancedMLModels:
     
     def train_success_prediction_model(self):
         """Train model to predict student success"""
+        from sklearn.ensemble import RandomForestRegressor
+        from sklearn.model_selection import train_test_split
+        from sklearn.preprocessing import StandardScaler
+        from sklearn.metrics import mean_squared_error, r2_score
+        
         print("Training success prediction model...")
         
         # Prepare success data
@@ -416,6 +434,26 @@ class AdvancedMLModels:
             }
         }
     
+    @staticmethod
+    def college_quality_scores(colleges: pd.DataFrame) -> np.ndarray:
+        """Profile-independent college score used by recommend_colleges, for every row at once"""
+        score = _numeric_column(colleges, 'ranking_nirf', 200) / 200 * 0.3         # Rating score
+        score += _numeric_column(colleges, 'placement_percentage', 70) / 100 * 0.3  # Placement score
+        score += np.minimum(_numeric_column(colleges, 'average_package', 500000) / 1000000, 1) * 0.2  # Package score
+        score += np.minimum(_numeric_column(colleges, 'campus_size', 50) / 100, 1) * 0.1  # Infrastructure score
+        score += np.minimum(_numeric_column(colleges, 'faculty_count', 100) / 500, 1) * 0.1  # Faculty score
+        return score
+    
+    @staticmethod
+    def career_quality_scores(careers: pd.DataFrame) -> np.ndarray:
+        """Profile-independent career score used by recommend_careers, for every row at once"""
+        score = _numeric_column(careers, 'growth_rate', 5) / 15 * 0.3                 # Growth rate score
+        score += np.minimum(_numeric_column(careers, 'avg_salary', 500000) / 2000000, 1) * 0.3  # Salary score
+        score += _numeric_column(careers, 'job_satisfaction', 3) / 5 * 0.2          # Job satisfaction score
+        score += _numeric_column(careers, 'work_life_balance', 3) / 5 * 0.1         # Work-life balance score
+        score += _numeric_column(careers, 'entrepreneurship_potential', 3) / 5 * 0.1  # Entrepreneurship potential
+        return score
+    
     def recommend_colleges(self, user_profile: Dict[str, Any], num_recommendations: int = 10) -> List[Dict[str, Any]]:
         """Recommend colleges based on user profile"""
         if 'college_similarity' not in self.models:
@@ -440,28 +478,12 @@ class AdvancedMLModels:
         
         # Score colleges based on various factors
         college_scores = []
-        for _, college in filtered_colleges.iterrows():
-            score = 0
-            
-            # Rating score
-            score += college.get('ranking_nirf', 200) / 200 * 0.3
-            
-            # Placement score
-            score += college.get('placement_percentage', 70) / 100 * 0.3
-            
-            # Package score
-            score += min(college.get('average_package', 500000) / 1000000, 1) * 0.2
-            
-            # Infrastructure score
-            score += min(college.get('campus_size', 50) / 100, 1) * 0.1
-            
-            # Faculty score
-            score += min(college.get('faculty_count', 100) / 500, 1) * 0.1
-            
+        scores = self.college_quality_scores(filtered_colleges)
+        for score, (_, college) in zip(scores, filtered_colleges.iterrows()):
             college_scores.append({
                 'college_id': college['id'],
                 'name': college['name'],
-                'score': score,
+                'score': float(score),
                 'college_data': college.to_dict()
             })
         
@@ -483,28 +505,12 @@ class AdvancedMLModels:
         
         # Score careers based on various factors
         career_scores = []
-        for _, career in filtered_careers.iterrows():
-            score = 0
-            
-            # Growth rate score
-            score += career.get('growth_rate', 5) / 15 * 0.3
-            
-            # Salary score
-            score += min(career.get('avg_salary', 500000) / 2000000, 1) * 0.3
-            
-            # Job satisfaction score
-            score += career.get('job_satisfaction', 3) / 5 * 0.2
-            
-            # Work-life balance score
-            score += career.get('work_life_balance', 3) / 5 * 0.1
-            
-            # Entrepreneurship potential
-            score += career.get('entrepreneurship_potential', 3) / 5 * 0.1
-            
+        scores = self.career_quality_scores(filtered_careers)
+        for score, (_, career) in zip(scores, filtered_careers.iterrows()):
             career_scores.append({
                 'career_id': career['id'],
                 'name': career['name'],
-                'score': score,
+                'score': float(score),
                 'career_data': career.to_dict()
             })
         
@@ -606,6 +612,7 @@ class AdvancedMLModels:
     def save_models(self, output_dir: str = 'models'):
         """Save trained models and metadata"""
         import os
+        import joblib
         os.makedirs(output_dir, exist_ok=True)
         
         # Save models
@@ -635,6 +642,8 @@ class AdvancedMLModels:
     def load_models(self, model_dir: str = 'models'):
         """Load trained models and metadata"""
         import os
+        import joblib
+        from sklearn.preprocessing import LabelEncoder
         
         if not os.path.exists(model_dir):
             raise ValueError(f"Model directory {model_dir} does not exist")
@@ -0,0 +1,241 @@
+"""
+Request Profiling for EduNiti AI Engine
+Opt-in sampled stack profiling and per-request stage breakdowns
+"""
+
+import asyncio
+import contextvars
+import hmac
+import os
+import random
+import sys
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Any, Optional
+
+import instrumentation
+
+# Stage name prefixes grouped for the per-request breakdown
+STAGE_CATEGORIES = (
+    ('score_', 'scoring'),
+    ('get_user_variant', 'ab_testing'),
+    ('ab_', 'ab_testing'),
+    ('feedback_', 'feedback'),
+    ('serialize', 'serialization'),
+    ('render_fragments', 'serialization'),
+    ('cache_', 'cache'),
+)
+
+_current_request: contextvars.ContextVar[Optional[Dict[str, Any]]] = contextvars.ContextVar(
+    'profiled_request', default=None
+)
+
+def _category(stage: str) -> str:
+    for prefix, category in STAGE_CATEGORIES:
+        if stage.startswith(prefix):
+            return category
+    return 'other'
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+class RequestProfiler:
+    """Samples the event loop thread's stack while selected requests run
+
+    A daemon thread wakes every ``interval`` seconds, reads the loop
+    thread's current frame and, if the task running on the loop belongs to
+    a profiled request, adds the collapsed stack to that request's endpoint.
+    Requests are selected with probability ``sample_rate`` while enabled, or
+    individually with the ``X-Profile`` header carrying the admin token.
+
+    Stage timers (scoring, A/B, serialization, ...) feed a per-request
+    breakdown through an instrumentation hook that is only installed while
+    profiling is active.
+    """
+
+    def __init__(self, token: Optional[str] = None, max_requests: int = 200):
+        self.token = token
+        self.enabled = False
+        self.sample_rate = 0.0
+        self.interval = 0.001
+        self.stacks: Dict[str, Dict[str, int]] = {}
+        self.recent = deque(maxlen=max_requests)
+        self._active: Dict[Any, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._sampler: Optional[threading.Thread] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread: Optional[int] = None
+
+    @property
+    def idle(self) -> bool:
+        """True when neither sampling nor header-triggered profiling can happen"""
+        return not self.enabled and self.token is None
+
+    def enable(self, sample_rate: float = 0.1, interval_ms: float = 1.0):
+        """Start profiling a fraction of requests"""
+        if not 0 < sample_rate <= 1:
+            raise ValueError("sample_rate must be in (0, 1]")
+        if interval_ms <= 0:
+            raise ValueError("interval_ms must be positive")
+        self.sample_rate = sample_rate
+        self.interval = interval_ms / 1000
+        self.enabled = True
+
+    def disable(self):
+        """Stop selecting new requests; in-flight profiles complete"""
+        self.enabled = False
+
+    def reset(self):
+        """Drop collected stacks and request breakdowns"""
+        with self._lock:
+            self.stacks.clear()
+            self.recent.clear()
+
+    def should_profile(self, headers: List) -> bool:
+        if self.token is not None:
+            for name, value in headers:
+                if name == b'x-profile':
+                    # Constant-time, like the admin endpoints' check of the same token
+                    return hmac.compare_digest(value, self.token.encode('utf-8'))
+        return self.enabled and random.random() < self.sample_rate
+
+    def begin(self, endpoint: str) -> Dict[str, Any]:
+        """Register the current task as a profiled request"""
+        record = {
+            'endpoint': endpoint,
+            'started_at': time.time(),
+            'start': time.perf_counter(),
+            'samples': 0,
+            'stacks': {},
+            'stages': {}
+        }
+        task = asyncio.current_task()
+        with self._lock:
+            self._loop = asyncio.get_running_loop()
+            self._loop_thread = threading.get_ident()
+            self._active[task] = record
+            if not instrumentation.stage_hooks:
+                instrumentation.stage_hooks.append(_record_stage)
+            if self._sampler is None or not self._sampler.is_alive():
+                self._sampler = threading.Thread(target=self._sample_loop, name='profiler', daemon=True)
+                self._sampler.start()
+        return record
+
+    def end(self, record: Dict[str, Any], endpoint: str, status: int):
+        """Finish a profiled request and keep its breakdown"""
+        total = time.perf_counter() - record.pop('start')
+        categories: Dict[str, float] = {}
+        for stage, seconds in record['stages'].items():
+            categories[_category(stage)] = categories.get(_category(stage), 0) + seconds
+        categories['unaccounted'] = max(total - sum(categories.values()), 0)
+
+        record.update({
+            'endpoint': endpoint,
+            'status': status,
+            'total_ms': total * 1000,
+            'stages_ms': {stage: seconds * 1000 for stage, seconds in record.pop('stages').items()},
+            'breakdown_ms': {category: seconds * 1000 for category, seconds in categories.items()}
+        })
+        with self._lock:
+            self._active = {task: active for task, active in self._active.items() if active is not record}
+            if not self._active and _record_stage in instrumentation.stage_hooks:
+                instrumentation.stage_hooks.remove(_record_stage)
+            # Stacks are merged under the route template, known only after routing
+            endpoint_stacks = self.stacks.setdefault(endpoint, {})
+            for stack, count in record.pop('stacks').items():
+                endpoint_stacks[stack] = endpoint_stacks.get(stack, 0) + count
+            self.recent.append(record)
+
+    def _sample_loop(self):
+        while True:
+            with self._lock:
+                if not self._active and not self.enabled:
+                    self._sampler = None
+                    return
+                loop, thread_id = self._loop, self._loop_thread
+            time.sleep(self.interval)
+            if loop is None:
+                continue
+
+            try:
+                task = asyncio.current_task(loop)
+            except RuntimeError:
+                continue
+            record = self._active.get(task)
+            frame = sys._current_frames().get(thread_id)
+            if record is None or frame is None:
+                continue
+
+            labels = []
+            while frame is not None:
+                labels.append(_frame_label(frame))
+                frame = frame.f_back
+            stack = ';'.join(reversed(labels))
+            with self._lock:
+                if self._active.get(task) is not record:
+                    continue  # finished while we were walking its stack
+                record['stacks'][stack] = record['stacks'].get(stack, 0) + 1
+                record['samples'] += 1
+
+    def collapsed(self, endpoint: Optional[str] = None) -> str:
+        """Collapsed stacks ("frame;frame;frame count") for flamegraph.pl or speedscope"""
+        with self._lock:
+            selected = [endpoint] if endpoint else sorted(self.stacks)
+            lines = []
+            for name in selected:
+                for stack, count in sorted(self.stacks.get(name, {}).items()):
+                    prefix = f"{name};" if endpoint is None else ''
+                    lines.append(f"{prefix}{stack} {count}")
+        return '\n'.join(lines) + ('\n' if lines else '')
+
+    def status(self) -> Dict[str, Any]:
+        """Profiler configuration and collected volume"""
+        with self._lock:
+            return {
+                'enabled': self.enabled,
+                'header_trigger': self.token is not None,
+                'sample_rate': self.sample_rate,
+                'interval_ms': self.interval * 1000,
+                'active_requests': len(self._active),
+                'profiled_requests': len(self.recent),
+                'samples': {name: sum(stacks.values()) for name, stacks in self.stacks.items()}
+            }
+
+def _record_stage(stage: str, seconds: float):
+    record = _current_request.get()
+    if record is not None:
+        record['stages'][stage] = record['stages'].get(stage, 0) + seconds
+
+class ProfilingMiddleware:
+    """ASGI middleware selecting requests for profiling
+
+    Costs a single attribute check per request unless profiling is enabled
+    or a header trigger token is configured.
+    """
+
+    def __init__(self, app, profiler: RequestProfiler):
+        self.app = app
+        self.profiler = profiler
+
+    async def __call__(self, scope, receive, send):
+        if self.profiler.idle or scope['type'] != 'http' or not self.profiler.should_profile(scope['headers']):
+            await self.app(scope, receive, send)
+            return
+
+        status = [500]
+
+        async def send_wrapper(message):
+            if message['type'] == 'http.response.start':
+                status[0] = message['status']
+            await send(message)
+
+        record = self.profiler.begin(scope['path'])
+        token = _current_request.set(record)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current_request.reset(token)
+            route = scope.get('route')
+            self.profiler.end(record, getattr(route, 'path', None) or scope['path'], status[0])
@@ -0,0 +1,229 @@
+"""
+Program Index for EduNiti AI Engine
+Explodes the nested college programs column into a typed program-level table
+"""
+
+from typing import Dict, List, Any, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+def _as_program(program: Any) -> Dict[str, Any]:
+    """Normalize a program entry (sample data lists bare program names)"""
+    if isinstance(program, dict):
+        return program
+    return {'name': str(program)}
+
+def _as_list(value: Any) -> list:
+    if isinstance(value, (list, tuple, np.ndarray)):
+        return list(value)
+    return []
+
+def _numeric(values: List[Any], dtype: Any, missing: float) -> np.ndarray:
+    """Typed column from raw program values; null, NaN or unparseable values become ``missing``"""
+    numbers = pd.to_numeric(pd.Series(values, dtype=object), errors='coerce')
+    return numbers.fillna(missing).to_numpy(dtype=np.float64).astype(dtype)
+
+class ProgramIndex:
+    """One row per college x program with typed columns and posting lists
+
+    ``programs`` holds the exploded table (college position, stream, fees,
+    seats, cut-off, minimum percentage and entrance exam; missing fees,
+    seats and duration are -1) and ``required_subjects`` a boolean programs x
+    subjects matrix. Posting lists per stream and per specialization hold
+    program row numbers sorted by fees, so fee ceilings are a binary search
+    and the remaining filters are vectorized masks over the candidates.
+    """
+
+    def __init__(self, college_data: pd.DataFrame):
+        self.num_colleges = len(college_data)
+        self.college_ids = college_data['id'].astype(str).to_numpy() if 'id' in college_data else \
+            np.arange(self.num_colleges).astype(str)
+        self.college_names = college_data['name'].astype(str).to_numpy() if 'name' in college_data else \
+            np.full(self.num_colleges, '', dtype=object)
+
+        subjects: Dict[str, int] = {}
+        rows = {
+            'college_pos': [], 'program': [], 'stream': [], 'fees': [], 'seats': [],
+            'cut_off': [], 'duration': [], 'min_percentage': [], 'entrance_exam': [],
+            'required_subjects': [], 'specializations': []
+        }
+        college_text: List[str] = []
+        college_streams: List[set] = []
+        declared_streams: List[set] = []
+
+        programs_column = college_data['programs'] if 'programs' in college_data else [[]] * self.num_colleges
+        streams_column = college_data['streams'] if 'streams' in college_data else [[]] * self.num_colleges
+
+        for pos, (programs, extra_streams) in enumerate(zip(programs_column, streams_column)):
+            text_parts = []
+            streams = {str(stream).lower() for stream in _as_list(extra_streams)}
+            declared_streams.append({stream for stream in _as_list(extra_streams) if isinstance(stream, str)})
+
+            for program in map(_as_program, _as_list(programs)):
+                eligibility = program.get('eligibility') or {}
+                specializations = [str(spec) for spec in _as_list(program.get('specializations'))]
+                stream = program.get('stream')
+
+                required = [subjects.setdefault(str(subject).lower(), len(subjects))
+                            for subject in _as_list(eligibility.get('required_subjects'))]
+
+                rows['college_pos'].append(pos)
+                rows['program'].append(program.get('name', ''))
+                rows['stream'].append(stream)
+                rows['fees'].append(program.get('fees'))
+                rows['seats'].append(program.get('seats'))
+                rows['cut_off'].append(program.get('cut_off'))
+                rows['duration'].append(program.get('duration'))
+                rows['min_percentage'].append(eligibility.get('min_percentage'))
+                rows['entrance_exam'].append(eligibility.get('entrance_exam'))
+                rows['required_subjects'].append(required)
+                rows['specializations'].append(tuple(specializations))
+
+                text_parts.append(str(program.get('name', '')))
+                text_parts.extend(specializations)
+                if stream:
+                    streams.add(str(stream).lower())
+
+            college_text.append(' '.join(text_parts).lower())
+            college_streams.append(streams)
+
+        self.subject_columns = subjects
+        self.programs = pd.DataFrame({
+            'college_pos': np.array(rows['college_pos'], dtype=np.int32),
+            'program': pd.Categorical(rows['program']),
+            'stream': pd.Categorical(rows['stream']),
+            'fees': _numeric(rows['fees'], np.int64, -1),
+            'seats': _numeric(rows['seats'], np.int32, -1),
+            'cut_off': _numeric(rows['cut_off'], np.float64, np.nan),
+            'duration': _numeric(rows['duration'], np.int8, -1),
+            'min_percentage': _numeric(rows['min_percentage'], np.float64, np.nan),
+            'entrance_exam': pd.Categorical(rows['entrance_exam']),
+            'specializations': rows['specializations']
+        })
+        self.required_subjects = np.zeros((len(self.programs), len(subjects)), dtype=bool)
+        for row, required in enumerate(rows['required_subjects']):
+            self.required_subjects[row, required] = True
+
+        # Posting lists of program rows, each sorted by fees
+        order = np.argsort(self.programs['fees'].to_numpy(), kind='stable')
+        stream_codes = self.programs['stream'].cat.codes.to_numpy()[order]
+        self.stream_postings: Dict[str, np.ndarray] = {
+            str(stream).lower(): order[stream_codes == code]
+            for code, stream in enumerate(self.programs['stream'].cat.categories)
+        }
+        specialization_rows: Dict[str, List[int]] = {}
+        for row in order:
+            for spec in rows['specializations'][row]:
+                specialization_rows.setdefault(spec.lower(), []).append(row)
+        self.specialization_postings: Dict[str, np.ndarray] = {
+            spec: np.array(posting, dtype=np.int64) for spec, posting in specialization_rows.items()
+        }
+
+        # Per-college lookups used by college scoring
+        self._college_text = pd.Series(college_text, dtype=object)
+        self._college_streams = college_streams
+        self._declared_streams = declared_streams
+        self._stream_masks: Dict[Tuple[str, bool], np.ndarray] = {}
+        self._fees = self.programs['fees'].to_numpy()
+
+    def offers_stream(self, stream: str, exact: bool = False) -> np.ndarray:
+        """Boolean array over colleges: offers at least one program in ``stream``
+
+        With ``exact`` only the college's ``streams`` list counts, compared
+        case-sensitively (the original heuristic's stream match).
+        """
+        key = (stream, True) if exact else (stream.lower(), False)
+        mask = self._stream_masks.get(key)
+        if mask is None:
+            college_streams = self._declared_streams if exact else self._college_streams
+            mask = np.fromiter((key[0] in streams for streams in college_streams),
+                               dtype=bool, count=self.num_colleges)
+            self._stream_masks[key] = mask
+        return mask
+
+    def matches_interest(self, interest: str) -> np.ndarray:
+        """Boolean array over colleges: program names/specializations mention ``interest``"""
+        return self._college_text.str.contains(interest.lower(), regex=False).to_numpy(dtype=bool)
+
+    def query(self,
+              stream: Optional[str] = None,
+              specialization: Optional[str] = None,
+              max_fees: Optional[int] = None,
+              max_cut_off: Optional[float] = None,
+              min_seats: Optional[int] = None,
+              entrance_exam: Optional[str] = None,
+              subjects: Optional[Sequence[str]] = None,
+              limit: Optional[int] = None) -> pd.DataFrame:
+        """Programs matching all given filters, cheapest first
+
+        ``subjects`` are the student's subjects: only programs whose required
+        subjects are all among them are returned.
+        """
+        if stream is not None:
+            candidates = self.stream_postings.get(stream.lower(), np.empty(0, dtype=np.int64))
+        else:
+            candidates = np.argsort(self._fees, kind='stable')
+
+        if max_fees is not None:
+            candidates = candidates[:np.searchsorted(self._fees[candidates], max_fees, side='right')]
+
+        if specialization is not None:
+            posting = self.specialization_postings.get(specialization.lower(), np.empty(0, dtype=np.int64))
+            candidates = candidates[np.isin(candidates, posting)]
+
+        mask = np.ones(len(candidates), dtype=bool)
+        if max_cut_off is not None:
+            mask &= self.programs['cut_off'].to_numpy()[candidates] <= max_cut_off
+        if min_seats is not None:
+            mask &= self.programs['seats'].to_numpy()[candidates] >= min_seats
+        if entrance_exam is not None:
+            exams = self.programs['entrance_exam'].astype(object).to_numpy()[candidates]
+            mask &= exams == entrance_exam
+        if subjects is not None:
+            missing = np.ones(len(self.subject_columns), dtype=bool)
+            for subject in subjects:
+                column = self.subject_columns.get(subject.lower())
+                if column is not None:
+                    missing[column] = False
+            mask &= ~(self.required_subjects[candidates] & missing).any(axis=1)
+
+        rows = candidates[mask]
+        if limit is not None:
+            rows = rows[:limit]
+
+        result = self.programs.iloc[rows].copy()
+        positions = result['college_pos'].to_numpy()
+        result.insert(0, 'college_id', self.college_ids[positions])
+        result.insert(1, 'college_name', self.college_names[positions])
+        return result.drop(columns=['college_pos'])
+
+    def stats(self) -> Dict[str, Any]:
+        """Index size summary"""
+        return {
+            'colleges': self.num_colleges,
+            'programs': len(self.programs),
+            'streams': len(self.stream_postings),
+            'specializations': len(self.specialization_postings),
+            'subjects': len(self.subject_columns)
+        }
+
+if __name__ == "__main__":
+    # Incomplete program entries and a wide subject vocabulary
+    subject_names = [f'Subject {i}' for i in range(70)]
+    colleges = pd.DataFrame({
+        'id': ['c1', 'c2', 'c3'],
+        'name': ['College 1', 'College 2', 'College 3'],
+        'programs': [
+            [{'name': 'B.Tech', 'stream': 'science', 'fees': None, 'seats': float('nan'), 'duration': '4',
+              'eligibility': {'min_percentage': None, 'required_subjects': subject_names[:40]}}],
+            [{'name': 'B.Sc', 'stream': 'science', 'fees': 80000, 'cut_off': 'n/a',
+              'eligibility': {'required_subjects': subject_names[40:]}}],
+            ['BA', {'name': 'B.Com', 'stream': 'commerce', 'fees': 50000, 'seats': 120}]
+        ]
+    })
+    index = ProgramIndex(colleges)
+    print(index.stats())
+    print(index.programs[['program', 'fees', 'seats', 'cut_off', 'duration', 'min_percentage']])
+    print(index.query(stream='science', subjects=subject_names[40:])[['college_id', 'program', 'fees']])
+    print(index.query(max_fees=60000)[['college_id', 'program', 'fees']])
@@ -0,0 +1,175 @@
+"""
+Recommendation Response Cache for EduNiti AI Engine
+Caches computed recommendations keyed by a normalized profile fingerprint
+"""
+
+import hashlib
+import json
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
+
+# UserProfile fields that influence scoring. user_id is deliberately excluded
+# so that identical profiles share cache entries.
+SCORING_FIELDS = (
+    'age', 'class_level', 'stream', 'interests', 'location', 'quiz_scores',
+    'personality_traits', 'family_income', 'parent_education'
+)
+
+class CacheBackend(ABC):
+    """Interface for a cache shared between workers (e.g. Redis/Memcached)"""
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value or None"""
+
+    @abstractmethod
+    def set(self, key: str, value: Any, ttl_seconds: float):
+        """Store a value for ``ttl_seconds``"""
+
+    @abstractmethod
+    def clear(self):
+        """Drop all entries"""
+
+class InMemoryCacheBackend(CacheBackend):
+    """Process-local stand-in for a shared backend, used in tests and development"""
+
+    def __init__(self):
+        self._entries: Dict[str, Tuple[float, Any]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            return value
+
+    def set(self, key: str, value: Any, ttl_seconds: float):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl_seconds, value)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+def profile_fingerprint(user_profile: Dict[str, Any]) -> str:
+    """Canonical hash of the scoring-relevant fields of a user profile"""
+    relevant = {
+        field: user_profile[field]
+        for field in SCORING_FIELDS
+        if user_profile.get(field) not in (None, [], {})
+    }
+    canonical = json.dumps(relevant, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+class RecommendationCache:
+    """In-process LRU/TTL cache with an optional shared second tier
+
+    Keys combine the profile fingerprint with the recommendation type, limit,
+    A/B variant and the catalogue version. ``invalidate`` switches to a new
+    version, so entries computed against a previous catalogue can never be
+    served again - including those still sitting in a shared backend, which
+    simply expire.
+    """
+
+    def __init__(self,
+                 max_entries: int = 10000,
+                 ttl_seconds: float = 300,
+                 backend: Optional[CacheBackend] = None,
+                 namespace: str = 'recommendations'):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.backend = backend
+        self.namespace = namespace
+        self.catalogue_version = '0'
+        self._entries: 'OrderedDict[str, Tuple[float, Any]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {
+            'hits': 0,
+            'shared_hits': 0,
+            'misses': 0,
+            'evictions': 0,
+            'expirations': 0,
+            'invalidations': 0
+        }
+
+    def make_key(self,
+                 user_profile: Dict[str, Any],
+                 recommendation_type: str,
+                 limit: Optional[int] = None,
+                 variant: str = 'baseline') -> str:
+        """Build the cache key for a recommendation request"""
+        return (f'{self.namespace}:v{self.catalogue_version}:{recommendation_type}:'
+                f'{limit}:{variant}:{profile_fingerprint(user_profile)}')
+
+    def get(self, key: str) -> Optional[Any]:
+        """Look up a key in the local tier, then the shared backend"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self._counters['hits'] += 1
+                    return value
+                del self._entries[key]
+                self._counters['expirations'] += 1
+
+        if self.backend is not None:
+            value = self.backend.get(key)
+            if value is not None:
+                self._store_local(key, value)
+                with self._lock:
+                    self._counters['shared_hits'] += 1
+                return value
+
+        with self._lock:
+            self._counters['misses'] += 1
+        return None
+
+    def set(self, key: str, value: Any):
+        """Store a value in both tiers"""
+        self._store_local(key, value)
+        if self.backend is not None:
+            self.backend.set(key, value, self.ttl_seconds)
+
+    def _store_local(self, key: str, value: Any):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._counters['evictions'] += 1
+
+    def invalidate(self, catalogue_version: Optional[str] = None):
+        """Drop all entries after the catalogue has been reloaded
+
+        Workers sharing a backend should pass a version derived from the
+        catalogue contents so that they agree on keys; without one a local
+        counter is used.
+        """
+        with self._lock:
+            self._counters['invalidations'] += 1
+            self.catalogue_version = catalogue_version or str(self._counters['invalidations'])
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss/eviction counters and current size"""
+        with self._lock:
+            lookups = self._counters['hits'] + self._counters['shared_hits'] + self._counters['misses']
+            return {
+                **self._counters,
+                'size': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl_seconds,
+                'catalogue_version': self.catalogue_version,
+                'hit_rate': (self._counters['hits'] + self._counters['shared_hits']) / lookups if lookups else 0
+            }
@@ -0,0 +1,438 @@
+"""
+Replay Evaluator for EduNiti AI Engine
+Replays logged A/B request profiles through candidate scoring configurations and compares ranking metrics
+"""
+
+import argparse
+import os
+import time
+from collections import namedtuple
+from datetime import datetime
+from typing import Dict, List, Any, Optional, Sequence, Tuple
+
+import numpy as np
+
+from ab_store import ExperimentStore, create_experiment_store
+from execution import catalogue_pool
+from result_columns import NO_PAYLOAD
+from serialization import dumps, dump_file, load_file
+from stream_scoring import StreamScoringTable
+from variant_scoring import ScoringCatalogue, VariantScorers, scoring_config
+
+REPLAY_KINDS = ('college', 'career')
+
+# Feedback context keys naming the rated item, per recommendation kind
+ITEM_CONTEXT_KEYS = {
+    'college': ('college_id', 'college', 'item_id'),
+    'career': ('career_id', 'career', 'item_id')
+}
+
+# Graded relevance of a rated item is rating - 2 (1-2 stars: not relevant);
+# an item rated at least HIT_RATING counts as a hit when it is in the top k
+RELEVANCE_OFFSET = 2
+HIT_RATING = 4
+
+DEFAULT_CHUNK_SIZE = 2000
+
+# Logged profile fields read by the scorers (UserProfile defaults)
+ReplayProfile = namedtuple(
+    'ReplayProfile',
+    ['location', 'stream', 'interests', 'quiz_scores', 'family_income', 'personality_traits', 'age'],
+    defaults=[None, None, (), None, None, None, None]
+)
+
+def replay_profile(profile: Dict[str, Any]) -> ReplayProfile:
+    """Scorer input built from a logged ``user_profile`` payload"""
+    return ReplayProfile(
+        location=profile.get('location'),
+        stream=profile.get('stream'),
+        interests=[str(interest) for interest in profile.get('interests') or []],
+        quiz_scores=profile.get('quiz_scores'),
+        family_income=profile.get('family_income'),
+        personality_traits=profile.get('personality_traits'),
+        age=profile.get('age')
+    )
+
+class LoggedRequests:
+    """Logged requests with their profiles deduplicated
+
+    ``profiles`` holds each distinct logged profile once and ``profile_index``
+    points every request at its profile, so a scorer ranks each distinct
+    profile once however often it was logged. Users are dense codes into
+    ``users``; timestamps are ``datetime64[s]``.
+    """
+
+    def __init__(self):
+        self.profiles: List[Dict[str, Any]] = []
+        self.users: List[str] = []
+        self.profile_index = np.empty(0, dtype=np.int32)
+        self.user_index = np.empty(0, dtype=np.int32)
+        self.timestamps = np.empty(0, dtype='datetime64[s]')
+        self.skipped = 0  # results logged without a profile
+
+    def __len__(self):
+        return len(self.profile_index)
+
+    @classmethod
+    def from_store(cls,
+                   store: ExperimentStore,
+                   test_ids: Optional[Sequence[str]] = None,
+                   archived: bool = False,
+                   max_requests: Optional[int] = None) -> 'LoggedRequests':
+        """Collect the results of ``test_ids`` (all stored tests by default) from an experiment store
+
+        With ``max_requests`` only the first requests with a profile are kept
+        (in test order, then logging order); later tests are not loaded.
+        """
+        if test_ids is None:
+            tests = store.load_archived_tests() if archived else store.load_tests()
+            test_ids = [test['test_id'] for test in tests]
+
+        logged = cls()
+        profile_codes: Dict[bytes, int] = {}
+        user_codes: Dict[str, int] = {}
+        profile_parts, user_parts, time_parts = [], [], []
+        remaining = max_requests
+        for test_id in test_ids:
+            if remaining is not None and remaining <= 0:
+                break
+            columns = store.load_result_columns(test_id, archived=archived, profiles=True)
+            rows = np.flatnonzero(columns.mask(test_id=test_id))
+            refs = columns.profile_refs[rows]
+            logged.skipped += int((refs == NO_PAYLOAD).sum())
+            rows, refs = rows[refs != NO_PAYLOAD], refs[refs != NO_PAYLOAD]
+            if remaining is not None:
+                # Truncate before deduplicating, so only kept requests' profiles are decoded and ranked
+                rows, refs = rows[:remaining], refs[:remaining]
+                remaining -= len(rows)
+
+            # Deduplicate per distinct payload, not per row
+            distinct, inverse = np.unique(refs, return_inverse=True)
+            codes = np.empty(len(distinct), dtype=np.int32)
+            for i, ref in enumerate(distinct.tolist()):
+                profile = columns.payloads.get(ref)
+                codes[i] = profile_codes.setdefault(dumps(profile), len(profile_codes))
+                if codes[i] == len(logged.profiles):
+                    logged.profiles.append(profile)
+
+            users = columns.user_codes[rows]
+            distinct_users, user_inverse = np.unique(users, return_inverse=True)
+            global_users = np.array([user_codes.setdefault(columns.users[code], len(user_codes))
+                                     for code in distinct_users.tolist()], dtype=np.int32)
+
+            profile_parts.append(codes[inverse])
+            user_parts.append(global_users[user_inverse] if len(rows) else np.empty(0, dtype=np.int32))
+            time_parts.append(columns.timestamps[rows].astype('datetime64[s]'))
+
+        if profile_parts:
+            logged.profile_index = np.concatenate(profile_parts)
+            logged.user_index = np.concatenate(user_parts)
+            logged.timestamps = np.concatenate(time_parts)
+        logged.users = list(user_codes)
+        return logged
+
+def feedback_judgments(feedback: Sequence[Dict[str, Any]],
+                       kind: str,
+                       item_positions: Dict[str, int],
+                       users: Dict[str, int]) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """(user code, timestamp, catalogue position, rating) of feedback rating a catalogue item of ``kind``"""
+    rows = []
+    for item in feedback:
+        if item.get('feedback_type') not in (kind, 'recommendation') or item.get('user_id') not in users:
+            continue
+        context = item.get('context') or {}
+        for key in ITEM_CONTEXT_KEYS[kind]:
+            position = item_positions.get(str(context.get(key)))
+            if position is not None:
+                rows.append((users[item['user_id']], item['timestamp'], position, int(item['rating'])))
+                break
+    if not rows:
+        return (np.empty(0, dtype=np.int32), np.empty(0, dtype='datetime64[s]'),
+                np.empty(0, dtype=np.int32), np.empty(0, dtype=np.int32))
+    user, timestamp, position, rating = zip(*rows)
+    return (np.array(user, dtype=np.int32), np.array(timestamp, dtype='datetime64[us]').astype('datetime64[s]'),
+            np.array(position, dtype=np.int32), np.array(rating, dtype=np.int32))
+
+def join_later_feedback(logged: LoggedRequests,
+                        judgments: Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray],
+                        horizon_days: float) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(request, item position, rating) for feedback a user gave within the horizon after a request
+
+    Requests and feedback are keyed by (user, second) on one int64 axis, so
+    each feedback item's matching requests are one contiguous range found by
+    binary search. An item rated more than once for a request keeps its best rating.
+    """
+    fb_user, fb_time, fb_item, fb_rating = judgments
+    if not len(logged) or not len(fb_user):
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int32), np.empty(0, dtype=np.int32)
+
+    horizon = int(horizon_days * 86400)
+    origin = min(logged.timestamps.min(), fb_time.min()).astype(np.int64)
+    span = int(max(logged.timestamps.max(), fb_time.max()).astype(np.int64) - origin) + horizon + 1
+    request_keys = logged.user_index.astype(np.int64) * span + (logged.timestamps.astype(np.int64) - origin)
+    order = np.argsort(request_keys, kind='stable')
+    sorted_keys = request_keys[order]
+
+    feedback_keys = fb_user.astype(np.int64) * span + (fb_time.astype(np.int64) - origin)
+    # Requests strictly before the feedback and no more than the horizon before it
+    lo = np.searchsorted(sorted_keys, feedback_keys - horizon, side='left')
+    hi = np.searchsorted(sorted_keys, feedback_keys, side='left')
+    counts = hi - lo
+    owner = np.repeat(np.arange(len(fb_user)), counts)
+    offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    requests = order[np.repeat(lo, counts) + offsets]
+    items, ratings = fb_item[owner], fb_rating[owner]
+
+    best = np.lexsort((-ratings, items, requests))
+    requests, items, ratings = requests[best], items[best], ratings[best]
+    first = np.ones(len(requests), dtype=bool)
+    first[1:] = (requests[1:] != requests[:-1]) | (items[1:] != items[:-1])
+    return requests[first], items[first], ratings[first]
+
+def ranking_metrics(rankings: np.ndarray,
+                    logged: LoggedRequests,
+                    judged: Tuple[np.ndarray, np.ndarray, np.ndarray],
+                    catalogue_size: int) -> Dict[str, Any]:
+    """NDCG@k, hit rate@k and catalogue coverage of one scorer's top-k rankings (one row per distinct profile)"""
+    k = rankings.shape[1]
+    requests, items, ratings = judged
+    gains = np.maximum(ratings - RELEVANCE_OFFSET, 0).astype(np.float64)
+    discounts = 1 / np.log2(np.arange(k) + 2)
+
+    # Rank of each judged item in its request's ranking (k when not ranked)
+    ranked = rankings[logged.profile_index[requests]] == items[:, None]
+    rank = np.where(ranked.any(axis=1), ranked.argmax(axis=1), k)
+    gain_values = 2 ** gains - 1
+    dcg = np.bincount(requests, weights=np.where(rank < k, gain_values * np.append(discounts, 0)[rank], 0),
+                      minlength=len(logged))
+
+    # Ideal DCG: a request's judged gains sorted best first
+    order = np.lexsort((-gains, requests))
+    sorted_requests = requests[order]
+    starts = np.flatnonzero(np.r_[True, sorted_requests[1:] != sorted_requests[:-1]]) if len(order) else order
+    position = np.arange(len(order)) - np.repeat(starts, np.diff(np.r_[starts, len(order)]))
+    ideal = np.bincount(sorted_requests, weights=np.where(position < k, gain_values[order] *
+                                                          np.append(discounts, 0)[np.minimum(position, k)], 0),
+                        minlength=len(logged))
+
+    relevant = ideal > 0
+    hit_items = ratings >= HIT_RATING
+    hit_requests = np.unique(requests[hit_items])
+    hits = np.unique(requests[hit_items & (rank < k)])
+
+    recommended = np.unique(rankings[np.unique(logged.profile_index)])
+    return {
+        'ndcg': float((dcg[relevant] / ideal[relevant]).mean()) if relevant.any() else None,
+        'hit_rate': len(hits) / len(hit_requests) if len(hit_requests) else None,
+        'coverage': int((recommended >= 0).sum()) / catalogue_size if catalogue_size else 0.0,
+        'judged_requests': int(relevant.sum()),
+        'hit_requests': int(len(hit_requests)),
+        'empty_rankings': int((rankings[:, 0] < 0)[logged.profile_index].sum())
+    }
+
+# Scorers of the worker process, installed by the pool initializer
+_worker_scorers: Optional[VariantScorers] = None
+
+def _install_catalogue(catalogue: ScoringCatalogue):
+    """Process pool initializer: compile against the parent's scoring catalogue"""
+    global _worker_scorers
+    _worker_scorers = VariantScorers()
+    _worker_scorers.install(catalogue)
+
+def _score_chunk(kind: str, config: Dict[str, Any], profiles: List[Dict[str, Any]], k: int,
+                 scorers: Optional[VariantScorers] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """Top-k catalogue positions (-1 padded) and scoring latency of each profile in a chunk"""
+    college_scorer, career_scorer = (scorers or _worker_scorers).scorers(config)
+    rankings = np.full((len(profiles), k), -1, dtype=np.int32)
+    latencies = np.empty(len(profiles))
+    for i, profile in enumerate(profiles):
+        profile = replay_profile(profile)
+        start = time.perf_counter()
+        if kind == 'college':
+            matches = college_scorer.score(profile, k)
+        else:
+            matches = career_scorer.score(profile)[:k]
+        latencies[i] = time.perf_counter() - start
+        top = [match['position'] for match in matches]
+        rankings[i, :len(top)] = top
+    return rankings, latencies
+
+class ReplayEvaluator:
+    """Scores logged profiles with candidate configurations and compares ranking metrics
+
+    ``candidates`` are A/B variant definitions (a ``name`` plus ``scoring``
+    settings or the default test's ``algorithm``/``parameters``). Distinct
+    profiles are split into chunks and scored on ``workers`` processes that
+    install the scoring catalogue once; ``workers=0`` scores in-process.
+    """
+
+    def __init__(self,
+                 catalogue: ScoringCatalogue,
+                 candidates: Sequence[Dict[str, Any]],
+                 k: int = 10,
+                 workers: Optional[int] = None,
+                 chunk_size: int = DEFAULT_CHUNK_SIZE):
+        names = [candidate['name'] for candidate in candidates]
+        if len(set(names)) != len(names):
+            raise ValueError("Candidate names must be unique")
+        if k < 1:
+            raise ValueError("k must be at least 1")
+        self.catalogue = catalogue
+        self.candidates = {candidate['name']: scoring_config(candidate) for candidate in candidates}
+        self.k = k
+        self.workers = workers
+        self.chunk_size = chunk_size
+
+    def item_positions(self, kind: str) -> Dict[str, int]:
+        """Catalogue position of every id and name an item of ``kind`` is known by"""
+        frame = self.catalogue.college_data if kind == 'college' else self.catalogue.career_data
+        positions: Dict[str, int] = {}
+        for column in ('name', 'career', 'id'):
+            if column in frame:
+                positions.update({str(value): position for position, value in enumerate(frame[column].tolist())})
+        return positions
+
+    def rank(self, logged: LoggedRequests, kinds: Sequence[str]) -> Dict[Tuple[str, str], Tuple[np.ndarray, np.ndarray]]:
+        """(kind, candidate) -> top-k rankings and latencies of every distinct profile"""
+        chunks = [logged.profiles[start:start + self.chunk_size]
+                  for start in range(0, len(logged.profiles), self.chunk_size)]
+        tasks = [(kind, name, chunk) for kind in kinds for name in self.candidates for chunk in chunks]
+
+        if self.workers == 0:
+            scorers = VariantScorers()
+            scorers.install(self.catalogue)
+            parts = [_score_chunk(kind, self.candidates[name], chunk, self.k, scorers) for kind, name, chunk in tasks]
+        else:
+            with catalogue_pool(self.catalogue, _install_catalogue, self.workers) as pool:
+                futures = [pool.submit(_score_chunk, kind, self.candidates[name], chunk, self.k)
+                           for kind, name, chunk in tasks]
+                parts = [future.result() for future in futures]
+
+        ranked: Dict[Tuple[str, str], List] = {}
+        for (kind, name, _), part in zip(tasks, parts):
+            ranked.setdefault((kind, name), []).append(part)
+        empty = (np.empty((0, self.k), dtype=np.int32), np.empty(0))
+        return {
+            (kind, name): (np.concatenate([r for r, _ in ranked[(kind, name)]]),
+                           np.concatenate([l for _, l in ranked[(kind, name)]]))
+            if (kind, name) in ranked else empty
+            for kind in kinds for name in self.candidates
+        }
+
+    def evaluate(self,
+                 logged: LoggedRequests,
+                 feedback: Sequence[Dict[str, Any]],
+                 kinds: Sequence[str] = REPLAY_KINDS,
+                 horizon_days: float = 30) -> Dict[str, Any]:
+        """Comparison report of every candidate on every recommendation kind"""
+        for kind in kinds:
+            if kind not in REPLAY_KINDS:
+                raise ValueError(f"Replay kind must be one of {REPLAY_KINDS}")
+        started = time.perf_counter()
+        rankings = self.rank(logged, kinds)
+        scoring_seconds = time.perf_counter() - started
+
+        users = {user: code for code, user in enumerate(logged.users)}
+        report = {
+            'generated_at': datetime.now().isoformat(),
+            'requests': len(logged),
+            'distinct_profiles': len(logged.profiles),
+            'skipped_without_profile': logged.skipped,
+            'k': self.k,
+            'horizon_days': horizon_days,
+            'kinds': {}
+        }
+        for kind in kinds:
+            judged = join_later_feedback(
+                logged, feedback_judgments(feedback, kind, self.item_positions(kind), users), horizon_days
+            )
+            catalogue_size = self.catalogue.num_colleges if kind == 'college' else self.catalogue.num_careers
+            report['kinds'][kind] = {}
+            for name, config in self.candidates.items():
+                ranking, latencies = rankings[(kind, name)]
+                metrics = ranking_metrics(ranking, logged, judged, catalogue_size)
+                metrics.update({
+                    'algorithm': config['algorithm'],
+                    'scoring_key': config['key'],
+                    'latency_ms': {
+                        'mean': float(latencies.mean() * 1000) if len(latencies) else None,
+                        'p50': float(np.percentile(latencies, 50) * 1000) if len(latencies) else None,
+                        'p95': float(np.percentile(latencies, 95) * 1000) if len(latencies) else None
+                    }
+                })
+                report['kinds'][kind][name] = metrics
+        report['scoring_seconds'] = scoring_seconds
+        report['elapsed_seconds'] = time.perf_counter() - started
+        return report
+
+def load_catalogue(data_dir: str, radius_km: float) -> Tuple[ScoringCatalogue, Optional[StreamScoringTable], str]:
+    """Scoring catalogue, stream table and dataset version of the saved datasets, as the API loads them
+
+    Shared by the offline tools. The stream table is None when no
+    student_outcomes dataset is saved.
+    """
+    from data_generator import dataset_version, find_dataset, read_dataset
+    from geo_index import GeoIndex
+    from program_index import ProgramIndex
+
+    paths = [find_dataset(data_dir, name) for name in ('colleges', 'careers', 'student_outcomes')]
+    for name, path in zip(('colleges', 'careers'), paths):
+        if path is None:
+            raise FileNotFoundError(f"No saved {name} dataset in {data_dir}")
+    colleges, careers = read_dataset(paths[0]), read_dataset(paths[1])
+    catalogue = ScoringCatalogue(colleges, careers, ProgramIndex(colleges), GeoIndex.from_colleges(colleges), radius_km)
+    stream_table = StreamScoringTable(read_dataset(paths[2])) if paths[2] else None
+    return catalogue, stream_table, dataset_version(paths)
+
+def default_candidates() -> List[Dict[str, Any]]:
+    """The variants of the default recommendation algorithm test"""
+    from ab_testing import DEFAULT_TESTS
+    return DEFAULT_TESTS['recommendation_algorithm']['variants']
+
+def print_report(report: Dict[str, Any]):
+    print(f"Replayed {report['requests']} requests ({report['distinct_profiles']} distinct profiles, "
+          f"k={report['k']}) in {report['elapsed_seconds']:.1f}s")
+    for kind, candidates in report['kinds'].items():
+        print(f"  {kind}")
+        for name, metrics in candidates.items():
+            ndcg = f"{metrics['ndcg']:.4f}" if metrics['ndcg'] is not None else '-'
+            hit_rate = f"{metrics['hit_rate']:.3f}" if metrics['hit_rate'] is not None else '-'
+            latency = metrics['latency_ms']['p50']
+            print(f"    {name:20s} ndcg={ndcg:>7s} hit_rate={hit_rate:>6s} coverage={metrics['coverage']:.3f} "
+                  f"judged={metrics['judged_requests']:6d} p50={latency if latency is not None else 0:.3f}ms")
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay logged A/B requests through candidate scorers")
+    parser.add_argument('--data-dir', default='data')
+    parser.add_argument('--backend', default=os.getenv('AB_STORE_BACKEND', 'json'), choices=['json', 'sqlite'])
+    parser.add_argument('--sqlite-path', default=os.getenv('AB_SQLITE_PATH') or None)
+    parser.add_argument('--test-ids', nargs='+', help="Tests whose results to replay (default: all stored tests)")
+    parser.add_argument('--archived', action='store_true', help="Replay archived tests instead of active ones")
+    parser.add_argument('--candidates', help="JSON file with a list of variant definitions "
+                                             "(default: the recommendation algorithm test's variants)")
+    parser.add_argument('--kinds', nargs='+', default=list(REPLAY_KINDS), choices=REPLAY_KINDS)
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--horizon-days', type=float, default=30, help="Feedback this long after a request counts")
+    parser.add_argument('--max-requests', type=int)
+    parser.add_argument('--workers', type=int, default=None, help="Scoring processes (0 scores in-process)")
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help="Profiles per scoring task")
+    parser.add_argument('--radius-km', type=float, default=float(os.getenv('COLLEGE_DISTANCE_RADIUS_KM', '100')))
+    parser.add_argument('--output', default='replay_report.json', help="Where to write the report")
+    args = parser.parse_args()
+
+    store = create_experiment_store(args.backend, args.data_dir, args.sqlite_path)
+    logged = LoggedRequests.from_store(store, args.test_ids, args.archived, args.max_requests)
+    feedback_path = os.path.join(args.data_dir, 'feedback.json')
+    feedback = load_file(feedback_path) if os.path.exists(feedback_path) else []
+
+    candidates = load_file(args.candidates) if args.candidates else default_candidates()
+    catalogue, _, _ = load_catalogue(args.data_dir, args.radius_km)
+    evaluator = ReplayEvaluator(catalogue, candidates,
+                                k=args.k, workers=args.workers, chunk_size=args.chunk_size)
+    report = evaluator.evaluate(logged, feedback, args.kinds, args.horizon_days)
+    print_report(report)
+    dump_file(report, args.output, pretty=True)
+    print(f"Report written to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Pre-serialized Response Fragments for EduNiti AI Engine
+Encodes static catalogue entities once and splices them into response bodies
+"""
+
+from typing import Dict, List, Any, Callable, Iterable, Tuple
+
+from fastapi.responses import Response
+
+from serialization import dumps as encode
+from instrumentation import stage_timer
+
+class RawJSON(bytes):
+    """Already-encoded JSON, inserted verbatim by encode_object"""
+
+def _members(fields: Dict[str, Any]) -> bytes:
+    return b','.join(
+        encode(key) + b':' + (value if isinstance(value, RawJSON) else encode(value))
+        for key, value in fields.items()
+    )
+
+def encode_object(fields: Dict[str, Any]) -> bytes:
+    """Encode a top-level object, splicing RawJSON values without re-encoding"""
+    return b'{' + _members(fields) + b'}'
+
+def merge_fields(static: Dict[str, Any], dynamic: Dict[str, Any], split_after: str) -> Dict[str, Any]:
+    """Insert per-user fields into a static record right after ``split_after``"""
+    merged = {}
+    for key, value in static.items():
+        merged[key] = value
+        if key == split_after:
+            merged.update(dynamic)
+    return merged
+
+class EntityFragments:
+    """Per-entity JSON encoded once at catalogue load
+
+    Each record is encoded as two member lists: the fields up to and
+    including ``split_after`` and the fields after it. Per-user fields
+    (match score, reasons) are encoded at request time and spliced between
+    the two, so a response reproduces the original key order while nested
+    structures such as programs and locations are never encoded again.
+    """
+
+    def __init__(self, records: Iterable[Dict[str, Any]], split_after: str):
+        self.split_after = split_after
+        self._fragments: List[Tuple[bytes, bytes]] = []
+        for record in records:
+            keys = list(record)
+            cut = keys.index(split_after) + 1 if split_after in record else len(keys)
+            head = _members({key: record[key] for key in keys[:cut]})
+            tail = _members({key: record[key] for key in keys[cut:]})
+            self._fragments.append((head, tail))
+
+    @classmethod
+    def from_frame(cls, df, build_record: Callable[[Any], Dict[str, Any]], split_after: str) -> 'EntityFragments':
+        """Build from a DataFrame with ``build_record(row)`` producing the static fields"""
+        return cls((build_record(row) for _, row in df.iterrows()), split_after)
+
+    def __len__(self):
+        return len(self._fragments)
+
+    def render(self, position: int, dynamic: Dict[str, Any]) -> RawJSON:
+        """One entity object with the per-user fields spliced in"""
+        head, tail = self._fragments[position]
+        parts = [part for part in (head, _members(dynamic) if dynamic else b'', tail) if part]
+        return RawJSON(b'{' + b','.join(parts) + b'}')
+
+    def render_list(self, matches: List[Dict[str, Any]], position_key: str = 'position') -> RawJSON:
+        """A JSON array of entities from scored matches carrying a position"""
+        with stage_timer('render_fragments'):
+            items = [
+                self.render(match[position_key], {key: value for key, value in match.items() if key != position_key})
+                for match in matches
+            ]
+            return RawJSON(b'[' + b','.join(items) + b']')
+
+    def size_bytes(self) -> int:
+        """Total encoded size"""
+        return sum(len(head) + len(tail) for head, tail in self._fragments)
+
+class FragmentResponse(Response):
+    """JSON response whose body was assembled from fragments"""
+
+    media_type = 'application/json'
+
+    def __init__(self, fields: Dict[str, Any], **kwargs):
+        with stage_timer('serialize'):
+            content = encode_object(fields)
+        super().__init__(content=content, **kwargs)
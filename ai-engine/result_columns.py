@@ -0,0 +1,441 @@
+"""
+Columnar Result Store for EduNiti AI Engine
+A/B test results held column-wise with interned ids and deduplicated payloads
+"""
+
+import hashlib
+import uuid
+from datetime import datetime
+from typing import Dict, List, Any, Iterable, Optional, Sequence
+
+import numpy as np
+
+from serialization import dumps, loads
+
+NO_PAYLOAD = -1
+
+def _result_id_bytes(result_id: str, foreign_ids: Dict[bytes, str]) -> bytes:
+    """16-byte form of a result id: the UUID itself, or a hash of any other id (kept in ``foreign_ids``)"""
+    try:
+        return uuid.UUID(result_id).bytes
+    except (ValueError, TypeError, AttributeError):
+        result_id = str(result_id)
+        digest = hashlib.blake2b(result_id.encode('utf-8'), digest_size=16).digest()
+        foreign_ids[digest] = result_id
+        return digest
+
+class Interner:
+    """Maps repeated strings (test ids, variants, users, metric names) to dense int32 codes"""
+
+    def __init__(self, values: Iterable[str] = ()):
+        self.codes: Dict[str, int] = {}
+        self.values: List[str] = []
+        for value in values:
+            self.code(value)
+
+    def code(self, value: str) -> int:
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def lookup(self, value: str) -> int:
+        """Code of a known value, -1 otherwise (matches nothing)"""
+        return self.codes.get(value, -1)
+
+    def __getitem__(self, code: int) -> str:
+        return self.values[code]
+
+    def __len__(self):
+        return len(self.values)
+
+class PayloadStore:
+    """Content-addressed JSON payloads: identical payloads are stored once, encoded"""
+
+    def __init__(self):
+        self._index: Dict[bytes, int] = {}
+        self._payloads: List[bytes] = []
+
+    def add(self, value: Any) -> int:
+        data = dumps(value)
+        digest = hashlib.blake2b(data, digest_size=16).digest()
+        ref = self._index.get(digest)
+        if ref is None:
+            ref = self._index[digest] = len(self._payloads)
+            self._payloads.append(data)
+        return ref
+
+    def get(self, ref: int) -> Any:
+        return loads(self._payloads[ref]) if ref != NO_PAYLOAD else {}
+
+    def __len__(self):
+        return len(self._payloads)
+
+    def size_bytes(self) -> int:
+        return sum(len(payload) for payload in self._payloads)
+
+class ResultColumns:
+    """A/B test results stored as parallel numpy columns
+
+    Test, variant and user ids are interned to int32 codes, timestamps are
+    int64 microseconds (``datetime64[us]``), metric values form a float64
+    matrix with one column per metric name (NaN where a result lacks the
+    metric), and ``user_profile``/``recommendation_data`` are references into
+    a deduplicating PayloadStore. Result ids are UUIDs stored as 16 bytes;
+    other ids (external or legacy results) are stored as a 16-byte hash and
+    their original string is kept aside. Filtering by test, variant and time is a
+    vectorized mask; records are only materialized for export.
+
+    Rows are only ever appended; readers on other threads should work on a
+    snapshot() so concurrent appends can't change column lengths under them.
+    """
+
+    _ARRAYS = ('_result_ids', '_test', '_variant', '_user', '_timestamp', '_metrics', '_profile', '_recommendation')
+
+    def __init__(self, capacity: int = 1024):
+        self.source = self  # the store snapshots were taken from
+        self.tests = Interner()
+        self.variants = Interner()
+        self.users = Interner()
+        self.metric_names = Interner()
+        self.payloads = PayloadStore()
+        self.foreign_ids: Dict[bytes, str] = {}  # hashed non-UUID result id -> original id
+        self._size = 0
+        self._result_ids = np.empty(capacity, dtype='S16')
+        self._test = np.empty(capacity, dtype=np.int32)
+        self._variant = np.empty(capacity, dtype=np.int32)
+        self._user = np.empty(capacity, dtype=np.int32)
+        self._timestamp = np.empty(capacity, dtype='datetime64[us]')
+        self._metrics = np.full((capacity, 0), np.nan)
+        self._profile = np.empty(capacity, dtype=np.int32)
+        self._recommendation = np.empty(capacity, dtype=np.int32)
+
+    @classmethod
+    def from_records(cls, records: Sequence[Dict[str, Any]]) -> 'ResultColumns':
+        """Build from JSON-shaped result records"""
+        columns = cls(capacity=max(len(records), 16))
+        columns.extend(records)
+        return columns
+
+    def snapshot(self) -> 'ResultColumns':
+        """A view of the rows present now, sharing interners and payloads; no copies"""
+        view = ResultColumns.__new__(ResultColumns)
+        view.__dict__.update(self.__dict__)
+        size = self._size
+        for name in self._ARRAYS:
+            setattr(view, name, getattr(self, name)[:size])
+        return view
+
+    def __len__(self):
+        return self._size
+
+    # Column views over the filled rows
+    @property
+    def test_codes(self) -> np.ndarray:
+        return self._test[:self._size]
+
+    @property
+    def variant_codes(self) -> np.ndarray:
+        return self._variant[:self._size]
+
+    @property
+    def user_codes(self) -> np.ndarray:
+        return self._user[:self._size]
+
+    @property
+    def timestamps(self) -> np.ndarray:
+        return self._timestamp[:self._size]
+
+    @property
+    def metrics(self) -> np.ndarray:
+        return self._metrics[:self._size]
+
+    @property
+    def profile_refs(self) -> np.ndarray:
+        """PayloadStore reference of each row's user_profile (NO_PAYLOAD if not loaded)"""
+        return self._profile[:self._size]
+
+    def _reserve(self, extra: int):
+        needed = self._size + extra
+        capacity = len(self._test)
+        if needed <= capacity:
+            return
+        capacity = max(needed, capacity * 2)
+        for name in self._ARRAYS:
+            column = getattr(self, name)
+            grown = np.full((capacity,) + column.shape[1:], np.nan) if name == '_metrics' else \
+                np.empty(capacity, dtype=column.dtype)
+            grown[:self._size] = column[:self._size]
+            setattr(self, name, grown)
+
+    def _metric_column(self, name: str) -> int:
+        column = self.metric_names.code(name)
+        if column >= self._metrics.shape[1]:
+            extra = np.full((len(self._metrics), column + 1 - self._metrics.shape[1]), np.nan)
+            self._metrics = np.hstack([self._metrics, extra])
+        return column
+
+    def append(self, record: Dict[str, Any]):
+        self.extend([record])
+
+    def extend(self, records: Sequence[Dict[str, Any]]):
+        """Append JSON-shaped result records (timestamps as ISO strings or datetimes)
+
+        ``user_profile`` and ``recommendation_data`` may be left out, e.g. by
+        stores loading only what an analysis needs.
+        """
+        if not records:
+            return
+        self._reserve(len(records))
+        start, end = self._size, self._size + len(records)
+
+        self._result_ids[start:end] = [_result_id_bytes(record['result_id'], self.foreign_ids) for record in records]
+        self._test[start:end] = [self.tests.code(record['test_id']) for record in records]
+        self._variant[start:end] = [self.variants.code(record['variant']) for record in records]
+        self._user[start:end] = [self.users.code(record['user_id']) for record in records]
+        self._timestamp[start:end] = np.array([record['timestamp'] for record in records], dtype='datetime64[us]')
+
+        for offset, record in enumerate(records):
+            for name, value in record['metrics'].items():
+                column = self._metric_column(name)  # may widen self._metrics
+                self._metrics[start + offset, column] = value
+
+        for name, field in (('_profile', 'user_profile'), ('_recommendation', 'recommendation_data')):
+            getattr(self, name)[start:end] = [
+                self.payloads.add(record[field]) if field in record else NO_PAYLOAD for record in records
+            ]
+        self._size = end  # last, so rows below _size are always complete
+
+    def mask(self,
+             test_id: Optional[str] = None,
+             variant: Optional[str] = None,
+             start: Optional[datetime] = None,
+             end: Optional[datetime] = None) -> np.ndarray:
+        """Boolean row mask for a test, a variant and a [start, end) time window"""
+        selected = np.ones(self._size, dtype=bool)
+        if test_id is not None:
+            selected &= self.test_codes == self.tests.lookup(test_id)
+        if variant is not None:
+            selected &= self.variant_codes == self.variants.lookup(variant)
+        if start is not None:
+            selected &= self.timestamps >= np.datetime64(start, 'us')
+        if end is not None:
+            selected &= self.timestamps < np.datetime64(end, 'us')
+        return selected
+
+    def metric_values(self, metric: str, mask: Optional[np.ndarray] = None, missing: float = np.nan) -> np.ndarray:
+        """Values of one metric for the masked rows, ``missing`` where a result lacks it"""
+        column = self.metric_names.lookup(metric)
+        rows = self._size if mask is None else int(mask.sum())
+        if not 0 <= column < self._metrics.shape[1]:  # unknown, or added after this snapshot
+            return np.full(rows, missing)
+        values = self.metrics[:, column] if mask is None else self.metrics[mask, column]
+        return np.where(np.isnan(values), missing, values)
+
+    def summarize(self, test_id: str, variants: Sequence[str], metrics: Sequence[str]) -> Dict[str, Dict[str, Any]]:
+        """Per-variant result count and mean/std/count/min/max of each metric
+
+        A result without a metric counts as 0 for it, as the record-based
+        analysis did.
+        """
+        in_test = self.mask(test_id=test_id)
+        variant_codes = self.variant_codes[in_test]
+        summary = {}
+        for variant in variants:
+            in_variant = variant_codes == self.variants.lookup(variant)
+            count = int(in_variant.sum())
+            metrics_summary = {}
+            if count:
+                for metric in metrics:
+                    values = self.metric_values(metric, in_test, missing=0.0)[in_variant]
+                    metrics_summary[metric] = {
+                        'mean': float(values.mean()),
+                        'std': float(values.std()),
+                        'count': count,
+                        'min': float(values.min()),
+                        'max': float(values.max())
+                    }
+            summary[variant] = {'user_count': count, 'metrics': metrics_summary}
+        return summary
+
+    def take(self, mask: np.ndarray) -> 'ResultColumns':
+        """A new store with the masked rows; unreferenced payloads are dropped"""
+        rows = np.flatnonzero(mask)
+        taken = ResultColumns(capacity=max(len(rows), 16))
+        taken.tests, taken.variants, taken.users = self.tests, self.variants, self.users
+        taken.foreign_ids = self.foreign_ids
+        taken.metric_names = Interner(self.metric_names.values)
+        taken._metrics = np.full((len(taken._test), self._metrics.shape[1]), np.nan)
+
+        for name in ('_result_ids', '_test', '_variant', '_user', '_timestamp'):
+            getattr(taken, name)[:len(rows)] = getattr(self, name)[rows]
+        taken._metrics[:len(rows)] = self._metrics[rows]
+
+        refs = np.concatenate([self._profile[rows], self._recommendation[rows]])
+        kept = np.unique(refs[refs != NO_PAYLOAD])
+        remap = {int(ref): taken.payloads.add(self.payloads.get(int(ref))) for ref in kept}
+        remap[NO_PAYLOAD] = NO_PAYLOAD
+        taken._profile[:len(rows)] = [remap[int(ref)] for ref in self._profile[rows]]
+        taken._recommendation[:len(rows)] = [remap[int(ref)] for ref in self._recommendation[rows]]
+        taken._size = len(rows)
+        return taken
+
+    def _materialize(self, rows: np.ndarray, share_payloads: bool = False) -> List[Dict[str, Any]]:
+        """Records for the given row indices, converting one column at a time
+
+        With ``share_payloads`` each distinct payload is decoded once and the
+        same object is referenced by every record using it (for encoding only).
+        """
+        raw_ids = self._result_ids[rows].tobytes()  # keeps the NUL padding .tolist() would strip
+        foreign_ids = self.foreign_ids
+        result_ids = [foreign_ids.get(raw_ids[i:i + 16]) or str(uuid.UUID(bytes=raw_ids[i:i + 16]))
+                      for i in range(0, len(raw_ids), 16)]
+        tests = [self.tests.values[code] for code in self._test[rows].tolist()]
+        users = [self.users.values[code] for code in self._user[rows].tolist()]
+        variants = [self.variants.values[code] for code in self._variant[rows].tolist()]
+        timestamps = [value.isoformat() for value in self._timestamp[rows].tolist()]
+        names = self.metric_names.values
+        metrics = [{name: value for name, value in zip(names, row) if value == value}  # NaN: metric absent
+                   for row in self._metrics[rows].tolist()]
+
+        decoded: Dict[int, Any] = {}
+
+        def payload(ref: int) -> Any:
+            if not share_payloads:
+                return self.payloads.get(ref)
+            if ref not in decoded:
+                decoded[ref] = self.payloads.get(ref)
+            return decoded[ref]
+
+        profiles = [payload(ref) for ref in self._profile[rows].tolist()]
+        recommendations = [payload(ref) for ref in self._recommendation[rows].tolist()]
+        return [
+            {
+                'result_id': result_ids[i],
+                'test_id': tests[i],
+                'user_id': users[i],
+                'variant': variants[i],
+                'timestamp': timestamps[i],
+                'metrics': metrics[i],
+                'user_profile': profiles[i],
+                'recommendation_data': recommendations[i]
+            }
+            for i in range(len(result_ids))
+        ]
+
+    def _rows(self, mask: Optional[np.ndarray]) -> np.ndarray:
+        return np.arange(self._size) if mask is None else np.flatnonzero(mask)
+
+    def to_records(self, mask: Optional[np.ndarray] = None) -> List[Dict[str, Any]]:
+        """Materialize JSON-shaped records (all rows, or the masked ones)"""
+        return self._materialize(self._rows(mask))
+
+    def encode_records(self, mask: Optional[np.ndarray] = None) -> bytes:
+        """The records as a JSON array, decoding each distinct payload only once"""
+        return dumps(self._materialize(self._rows(mask), share_payloads=True))
+
+    def memory_bytes(self) -> int:
+        """Approximate footprint: column arrays, payload bytes and interned strings"""
+        arrays = sum(column[:self._size].nbytes for column in (
+            self._result_ids, self._test, self._variant, self._user, self._timestamp,
+            self._profile, self._recommendation, self._metrics
+        ))
+        interned = sum(len(value) + 49 for interner in (self.tests, self.variants, self.users, self.metric_names)
+                       for value in interner.values)
+        return arrays + self.payloads.size_bytes() + interned
+
+if __name__ == "__main__":
+    import random
+    import time
+    import tracemalloc
+    from dataclasses import dataclass
+
+    @dataclass
+    class TestResult:
+        # Mirrors ab_testing.TestResult, the per-result objects held before
+        result_id: str
+        test_id: str
+        user_id: str
+        variant: str
+        timestamp: datetime
+        metrics: Dict[str, float]
+        user_profile: Dict[str, Any]
+        recommendation_data: Dict[str, Any]
+
+    rng = random.Random(7)
+    test_ids = [str(uuid.uuid4()) for _ in range(3)]
+    variants = ['baseline', 'ml_enhanced', 'hybrid']
+    profiles = [
+        {'user_id': f'user_{i}', 'age': rng.randint(15, 19), 'class_level': str(rng.randint(10, 12)),
+         'interests': rng.sample(['Mathematics', 'Physics', 'Biology', 'History', 'Economics', 'Art'], 3),
+         'location': {'state': rng.choice(['Delhi', 'Maharashtra', 'Karnataka'])},
+         'quiz_scores': {'mathematics': rng.uniform(3, 10), 'science': rng.uniform(3, 10)}}
+        for i in range(2000)
+    ]
+    streams = ['science', 'commerce', 'arts', 'engineering', 'medical']
+    recommendation_sets = [
+        {'recommendations': [{'stream': stream, 'confidence': round(rng.random(), 2), 'reasons': ['Interest match']}
+                             for stream in rng.sample(streams, 3)]}
+        for _ in range(500)
+    ]
+    records = [
+        {
+            'result_id': str(uuid.UUID(int=rng.getrandbits(128))),
+            'test_id': test_ids[i % 3],
+            'user_id': f'user_{i % 20000}',
+            'variant': variants[rng.randrange(3)],
+            'timestamp': datetime(2025, 1, 1, rng.randrange(24), rng.randrange(60), rng.randrange(60)).isoformat(),
+            'metrics': {'click_through_rate': rng.random(), 'user_satisfaction': rng.uniform(1, 5),
+                        'recommendation_accuracy': rng.random()},
+            'user_profile': profiles[i % len(profiles)],
+            'recommendation_data': recommendation_sets[rng.randrange(len(recommendation_sets))]
+        }
+        for i in range(100000)
+    ]
+    encoded = [dumps(record) for record in records]
+
+    def measure(build):
+        tracemalloc.start()
+        built = build()
+        current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return built, current
+
+    # Each result decoded separately, as when loaded from ab_results.json
+    def build_objects():
+        objects = []
+        for data in encoded:
+            record = loads(data)
+            record['timestamp'] = datetime.fromisoformat(record['timestamp'])
+            objects.append(TestResult(**record))
+        return objects
+
+    objects, object_bytes = measure(build_objects)
+    columns, column_bytes = measure(lambda: ResultColumns.from_records([loads(data) for data in encoded]))
+    print(f"{len(records)} results")
+    print(f"  TestResult objects: {object_bytes / 1e6:8.1f} MB ({object_bytes / len(records):6.0f} B/result)")
+    print(f"  ResultColumns:      {column_bytes / 1e6:8.1f} MB ({column_bytes / len(records):6.0f} B/result), "
+          f"{len(columns.payloads)} distinct payloads")
+    print(f"  reduction:          {object_bytes / column_bytes:8.1f}x")
+
+    def bench(label, func, repeat=20):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            func()
+        print(f"  {label:44s} {(time.perf_counter() - start) / repeat * 1000:8.2f} ms")
+
+    window = (datetime(2025, 1, 1, 6), datetime(2025, 1, 1, 12))
+    print("Filter by test, variant and time window")
+    bench("objects (list comprehension)", lambda: [
+        r for r in objects
+        if r.test_id == test_ids[0] and r.variant == 'hybrid' and window[0] <= r.timestamp < window[1]
+    ])
+    bench("columns (mask)", lambda: columns.mask(test_ids[0], 'hybrid', *window))
+    print("Per-variant metric summary")
+    bench("objects", lambda: {
+        variant: [np.mean([r.metrics.get('click_through_rate', 0) for r in objects
+                           if r.test_id == test_ids[0] and r.variant == variant])]
+        for variant in variants
+    }, repeat=5)
+    bench("columns", lambda: columns.summarize(test_ids[0], variants, ['click_through_rate']), repeat=5)
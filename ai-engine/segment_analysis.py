@@ -0,0 +1,333 @@
+"""
+Segmented A/B Analysis for EduNiti AI Engine
+Per-segment variant metrics and significance over user_profile attributes
+"""
+
+import threading
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Any, Optional, Sequence, Tuple
+
+import numpy as np
+
+from result_columns import ResultColumns, Interner
+from instrumentation import timed_stage
+
+UNKNOWN_SEGMENT = 'unknown'
+
+@dataclass(frozen=True)
+class SegmentDimension:
+    """A user_profile attribute to segment by
+
+    ``path`` is a dotted path into the profile (``location.state``).
+    Numeric attributes with ``bins`` are bucketed at those edges (lower
+    bound inclusive); anything else is treated as categorical.
+    """
+    name: str
+    path: str
+    bins: Optional[Tuple[float, ...]] = None
+
+    def value(self, profile: Any) -> Any:
+        for part in self.path.split('.'):
+            if not isinstance(profile, dict):
+                return None
+            profile = profile.get(part)
+        return profile
+
+    def label(self, value: Any) -> str:
+        if value is None or value == '':
+            return UNKNOWN_SEGMENT
+        if self.bins is not None:
+            try:
+                value = float(value)
+            except (TypeError, ValueError):
+                return UNKNOWN_SEGMENT
+            position = int(np.searchsorted(self.bins, value, side='right'))
+            if position == 0:
+                return f"<{self.bins[0]:g}"
+            if position == len(self.bins):
+                return f"{self.bins[-1]:g}+"
+            return f"{self.bins[position - 1]:g}-{self.bins[position]:g}"
+        if isinstance(value, list):
+            return ','.join(sorted(str(item) for item in value)) or UNKNOWN_SEGMENT
+        return str(value)
+
+# Dimensions product asks about most; these are kept as incrementally updated cubes
+SEGMENT_DIMENSIONS = {
+    dimension.name: dimension for dimension in (
+        SegmentDimension('state', 'location.state'),
+        SegmentDimension('age_band', 'age', bins=(16, 18, 21, 24)),
+        SegmentDimension('class_level', 'class_level'),
+        SegmentDimension('stream', 'stream'),
+        SegmentDimension('income_band', 'family_income', bins=(300000, 1000000, 2500000)),
+        SegmentDimension('parent_education', 'parent_education'),
+    )
+}
+
+def parse_bins(bins: str) -> Tuple[float, ...]:
+    """Bucket edges from a comma-separated string, e.g. "16,18,21" """
+    try:
+        edges = tuple(float(edge) for edge in bins.split(',') if edge.strip())
+    except ValueError:
+        raise ValueError(f"Invalid bins: {bins}")
+    if not edges or any(low >= high for low, high in zip(edges, edges[1:])):
+        raise ValueError("bins must be increasing numbers")
+    return edges
+
+class SegmentCube:
+    """Count, sum and sum of squares of each metric per (segment, variant)
+
+    Built from one test's rows of a ResultColumns and extended with the rows
+    appended since the last update, so common dimensions are not rescanned
+    on every request. Segment codes are computed once per distinct profile
+    payload and mapped onto rows with a single take.
+    """
+
+    def __init__(self, dimension: SegmentDimension, test_id: str, metrics: Sequence[str]):
+        self.dimension = dimension
+        self.test_id = test_id
+        self.metrics = list(metrics)
+        self.segments = Interner()
+        self.source: Optional[ResultColumns] = None
+        self.rows = 0
+        self._payload_codes = np.empty(0, dtype=np.int32)
+        self.counts = np.zeros((0, 0))
+        self.sums = np.zeros((0, 0, len(self.metrics)))
+        self.sumsq = np.zeros((0, 0, len(self.metrics)))
+
+    def _segment_codes(self, columns: ResultColumns, refs: np.ndarray) -> np.ndarray:
+        # Segment code per payload ref, decoding each profile the first time it is
+        # seen (-2 = not yet decoded); the last slot serves rows without a profile
+        if len(self._payload_codes) < len(columns.payloads) + 1:
+            known = max(len(self._payload_codes) - 1, 0)
+            codes = np.full(len(columns.payloads) + 1, -2, dtype=np.int32)
+            codes[:known] = self._payload_codes[:known]
+            codes[-1] = self.segments.code(UNKNOWN_SEGMENT)
+            self._payload_codes = codes
+        for ref in np.unique(refs[self._payload_codes[refs] == -2]).tolist():
+            profile = columns.payloads.get(ref)
+            self._payload_codes[ref] = self.segments.code(self.dimension.label(self.dimension.value(profile)))
+        return self._payload_codes[refs]
+
+    def update(self, columns: ResultColumns) -> 'SegmentCube':
+        """Fold in rows appended since the last update (rebuilds for a different store)"""
+        if columns.source is not self.source or len(columns) < self.rows:
+            self.__init__(self.dimension, self.test_id, self.metrics)
+            self.source = columns.source
+        if len(columns) == self.rows:
+            return self
+
+        new_rows = np.arange(len(columns)) >= self.rows
+        mask = columns.mask(test_id=self.test_id) & new_rows
+        self.rows = len(columns)
+        if not mask.any():
+            return self
+        segments = self._segment_codes(columns, columns.profile_refs[mask])
+        counts, sums, sumsq = aggregate(segments, columns.variant_codes[mask],
+                                        _metric_matrix(columns, self.metrics, mask),
+                                        len(self.segments), len(columns.variants))
+        self.counts = _add(self.counts, counts)
+        self.sums = _add(self.sums, sums)
+        self.sumsq = _add(self.sumsq, sumsq)
+        return self
+
+def _add(current: np.ndarray, extra: np.ndarray) -> np.ndarray:
+    # Aggregates grow as new segments and variants appear
+    shape = tuple(max(a, b) for a, b in zip(current.shape, extra.shape))
+    total = np.zeros(shape)
+    total[tuple(slice(0, n) for n in current.shape)] += current
+    total[tuple(slice(0, n) for n in extra.shape)] += extra
+    return total
+
+def _metric_matrix(columns: ResultColumns, metrics: Sequence[str], mask: np.ndarray) -> np.ndarray:
+    # A result without a metric counts as 0, as in get_test_results
+    return np.column_stack([columns.metric_values(metric, mask, missing=0.0) for metric in metrics]) \
+        if metrics else np.zeros((int(mask.sum()), 0))
+
+def aggregate(segments: np.ndarray, variants: np.ndarray, values: np.ndarray,
+              n_segments: int, n_variants: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Vectorized group-by: counts (S, V), sums and sums of squares (S, V, M)"""
+    keys = segments.astype(np.int64) * n_variants + variants
+    cells = n_segments * n_variants
+    counts = np.bincount(keys, minlength=cells).reshape(n_segments, n_variants).astype(float)
+    sums = np.stack([np.bincount(keys, weights=values[:, j], minlength=cells) for j in range(values.shape[1])],
+                    axis=-1) if values.shape[1] else np.zeros((cells, 0))
+    sumsq = np.stack([np.bincount(keys, weights=values[:, j] ** 2, minlength=cells) for j in range(values.shape[1])],
+                     axis=-1) if values.shape[1] else np.zeros((cells, 0))
+    return counts, sums.reshape(n_segments, n_variants, -1), sumsq.reshape(n_segments, n_variants, -1)
+
+def welch_test(n_a: np.ndarray, mean_a: np.ndarray, var_a: np.ndarray,
+               n_b: np.ndarray, mean_b: np.ndarray, var_b: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Welch's t statistic and two-sided p-value of b vs a, elementwise (NaN where undefined)"""
+    from scipy.special import stdtr  # t CDF; far lighter to import than scipy.stats
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        se_a, se_b = var_a / n_a, var_b / n_b
+        t_stat = (mean_b - mean_a) / np.sqrt(se_a + se_b)
+        df = (se_a + se_b) ** 2 / (se_a ** 2 / (n_a - 1) + se_b ** 2 / (n_b - 1))
+        p_value = 2 * stdtr(df, -np.abs(t_stat))
+    undefined = (n_a < 2) | (n_b < 2) | ~np.isfinite(t_stat) | ~np.isfinite(df)
+    return np.where(undefined, np.nan, t_stat), np.where(undefined, np.nan, p_value)
+
+def _number(value: float) -> Optional[float]:
+    return float(value) if np.isfinite(value) else None
+
+class SegmentAnalyzer:
+    """Slices A/B test results by user_profile attributes
+
+    Common dimensions (SEGMENT_DIMENSIONS) are served from cached
+    SegmentCubes; any other profile path, custom bins or a time window is
+    computed with a vectorized scan over the test's result columns.
+    """
+
+    def __init__(self, framework):
+        self.framework = framework
+        self._cubes: Dict[Tuple[str, str], SegmentCube] = {}
+        self._lock = threading.Lock()
+
+    @timed_stage('ab_segment_analysis')
+    def analyze(self,
+                test_id: str,
+                dimension: str,
+                bins: Optional[Sequence[float]] = None,
+                start: Optional[datetime] = None,
+                end: Optional[datetime] = None,
+                min_count: int = 1) -> Dict[str, Any]:
+        """Per-segment variant metrics and significance vs the control (first) variant"""
+        test = self.framework._get_test(test_id, include_archived=True)
+        archived = test_id not in self.framework.tests
+        columns = self.framework.store.load_result_columns(test_id, archived=archived, profiles=True)
+        variant_names = [variant['name'] for variant in test.variants]
+
+        if dimension in SEGMENT_DIMENSIONS and bins is None and start is None and end is None:
+            with self._lock:
+                cube = self._cubes.get((test_id, dimension))
+                if cube is None or cube.metrics != list(test.metrics):
+                    cube = self._cubes[(test_id, dimension)] = SegmentCube(
+                        SEGMENT_DIMENSIONS[dimension], test_id, test.metrics)
+                cube.update(columns)
+                labels = list(cube.segments.values)
+                counts, sums, sumsq = cube.counts.copy(), cube.sums.copy(), cube.sumsq.copy()
+            source = 'cube'
+        else:
+            segment_dimension = SegmentDimension(dimension, dimension, tuple(bins) if bins is not None else None)
+            mask = columns.mask(test_id=test_id, start=start, end=end)
+            refs = columns.profile_refs[mask]
+            distinct, inverse = np.unique(refs, return_inverse=True)
+            segments = Interner()
+            codes = np.array([segments.code(segment_dimension.label(segment_dimension.value(columns.payloads.get(ref))))
+                              for ref in distinct.tolist()], dtype=np.int32)
+            counts, sums, sumsq = aggregate(codes[inverse], columns.variant_codes[mask],
+                                            _metric_matrix(columns, test.metrics, mask),
+                                            len(segments), len(columns.variants))
+            labels = segments.values
+            source = 'scan'
+
+        # Reorder the variant axis from the store's codes to the test's variants
+        variant_codes = [columns.variants.lookup(name) for name in variant_names]
+        present = np.array([0 <= code < counts.shape[1] for code in variant_codes])
+        index = np.array([code if ok else 0 for code, ok in zip(variant_codes, present)], dtype=int)
+        counts = np.where(present, counts[:, index], 0) if counts.size else np.zeros((len(labels), len(index)))
+        sums = np.where(present[:, None], sums[:, index], 0) if sums.size else np.zeros(counts.shape + (len(test.metrics),))
+        sumsq = np.where(present[:, None], sumsq[:, index], 0) if sumsq.size else np.zeros(sums.shape)
+
+        return self._report(test_id, dimension, source, labels, variant_names, list(test.metrics),
+                            counts, sums, sumsq, min_count)
+
+    def _report(self, test_id: str, dimension: str, source: str, labels: List[str], variants: List[str],
+                metrics: List[str], counts: np.ndarray, sums: np.ndarray, sumsq: np.ndarray,
+                min_count: int) -> Dict[str, Any]:
+        n = counts[:, :, None]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            means = sums / n
+            population_var = np.maximum(sumsq / n - means ** 2, 0)
+            sample_var = population_var * n / (n - 1)
+
+        # Every variant against the control, all segments and metrics at once
+        t_stat, p_value = welch_test(n[:, :1], means[:, :1], sample_var[:, :1], n, means, sample_var)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            lift = (means - means[:, :1]) / np.abs(means[:, :1])
+
+        segments = []
+        for s in np.argsort(-counts.sum(axis=1), kind='stable'):
+            total = int(counts[s].sum())
+            if total < min_count or total == 0:
+                continue
+            segment_variants, comparisons = {}, {}
+            for v, variant in enumerate(variants):
+                count = int(counts[s, v])
+                segment_variants[variant] = {
+                    'count': count,
+                    'metrics': {
+                        metric: {'mean': _number(means[s, v, m]), 'std': _number(np.sqrt(population_var[s, v, m]))}
+                        for m, metric in enumerate(metrics)
+                    } if count else {}
+                }
+                if v:
+                    comparisons[variant] = {
+                        metric: {
+                            'lift': _number(lift[s, v, m]),
+                            't_stat': _number(t_stat[s, v, m]),
+                            'p_value': _number(p_value[s, v, m])
+                        }
+                        for m, metric in enumerate(metrics)
+                    }
+            segments.append({
+                'segment': labels[s],
+                'count': total,
+                'variants': segment_variants,
+                'vs_control': comparisons
+            })
+
+        return {
+            'test_id': test_id,
+            'dimension': dimension,
+            'source': source,
+            'control': variants[0] if variants else None,
+            'metrics': metrics,
+            'total_results': int(counts.sum()),
+            'segments': segments
+        }
+
+if __name__ == "__main__":
+    import time
+    import uuid
+    import random
+    import tempfile
+    from ab_testing import ABTestingFramework
+
+    framework = ABTestingFramework(data_dir=tempfile.mkdtemp())
+    test_id = framework.create_recommendation_test()
+    framework.start_test(test_id)
+    variants = [variant['name'] for variant in framework.tests[test_id].variants]
+
+    rng = random.Random(3)
+    states = ['Delhi', 'Maharashtra', 'Karnataka', 'Tamil Nadu', 'West Bengal']
+    profiles = [{'age': rng.randint(16, 25), 'class_level': rng.choice(['10', '12', 'undergraduate']),
+                 'location': {'state': rng.choice(states)}, 'family_income': rng.randint(100000, 5000000)}
+                for _ in range(5000)]
+    results = []
+    for i in range(200000):
+        variant = variants[i % len(variants)]
+        profile = profiles[i % len(profiles)]
+        # ml_enhanced helps in Karnataka only
+        boost = 0.1 if variant == 'ml_enhanced' and profile['location']['state'] == 'Karnataka' else 0
+        results.append({
+            'result_id': str(uuid.UUID(int=rng.getrandbits(128))), 'test_id': test_id,
+            'user_id': f'user_{i}', 'variant': variant, 'timestamp': datetime(2025, 1, 1).isoformat(),
+            'metrics': {'click_through_rate': rng.random() * 0.5 + boost, 'user_satisfaction': rng.uniform(1, 5)},
+            'user_profile': profile, 'recommendation_data': {}
+        })
+    framework.store.add_results(results)
+
+    analyzer = SegmentAnalyzer(framework)
+    for label, call in (('state (cold cube)', lambda: analyzer.analyze(test_id, 'state')),
+                        ('state (warm cube)', lambda: analyzer.analyze(test_id, 'state')),
+                        ('age with custom bins (scan)', lambda: analyzer.analyze(test_id, 'age', bins=(18, 21)))):
+        start = time.perf_counter()
+        report = call()
+        print(f"{label:30s} {(time.perf_counter() - start) * 1000:8.1f} ms, {len(report['segments'])} segments")
+
+    for segment in analyzer.analyze(test_id, 'state')['segments']:
+        comparison = segment['vs_control']['ml_enhanced']['click_through_rate']
+        print(f"  {segment['segment']:12s} n={segment['count']:6d} lift={comparison['lift']:+.3f} p={comparison['p_value']:.3g}")
@@ -0,0 +1,139 @@
+"""
+Serialization for EduNiti AI Engine
+Shared JSON encoding for API responses and persisted files (orjson with a json fallback)
+"""
+
+import dataclasses
+import json
+from datetime import date, datetime
+from typing import Any, Union
+
+import numpy as np
+from fastapi.responses import JSONResponse
+
+from instrumentation import stage_timer
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+def default(obj: Any) -> Any:
+    """Encode types the JSON encoders do not handle natively"""
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+        return dataclasses.asdict(obj)
+    if isinstance(obj, (set, frozenset, tuple)):
+        return list(obj)
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+if ORJSON_AVAILABLE:
+    _OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+    def dumps(obj: Any, pretty: bool = False) -> bytes:
+        """Encode to JSON bytes (compact unless ``pretty``)"""
+        option = _OPTIONS | orjson.OPT_INDENT_2 if pretty else _OPTIONS
+        return orjson.dumps(obj, default=default, option=option)
+
+    def loads(data: Union[bytes, str]) -> Any:
+        """Decode JSON bytes or text"""
+        return orjson.loads(data)
+else:
+    def dumps(obj: Any, pretty: bool = False) -> bytes:
+        """Encode to JSON bytes (compact unless ``pretty``)"""
+        if pretty:
+            return json.dumps(obj, default=default, indent=2, ensure_ascii=False).encode('utf-8')
+        return json.dumps(obj, default=default, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+    def loads(data: Union[bytes, str]) -> Any:
+        """Decode JSON bytes or text"""
+        return json.loads(data)
+
+def dump_file(obj: Any, path: str, pretty: bool = False):
+    """Write ``obj`` as JSON to ``path``"""
+    with open(path, 'wb') as f:
+        f.write(dumps(obj, pretty=pretty))
+
+def load_file(path: str) -> Any:
+    """Read a JSON file"""
+    with open(path, 'rb') as f:
+        return loads(f.read())
+
+class ORJSONResponse(JSONResponse):
+    """JSON response encoded with the shared encoder (numpy, datetime and dataclass aware)"""
+
+    def render(self, content: Any) -> bytes:
+        with stage_timer('serialize'):
+            return dumps(content)
+
+if __name__ == "__main__":
+    import time
+    from fastapi.encoders import jsonable_encoder
+
+    rng = np.random.default_rng(42)
+    records = [
+        {
+            'test_id': f'test_{i % 5}',
+            'user_id': f'user_{i}',
+            'variant': ['control', 'hybrid'][i % 2],
+            'timestamp': datetime(2025, 1, 1, 12, 0, i % 60).isoformat(),
+            'metrics': {'recommendation_accuracy': float(rng.random()), 'user_satisfaction': float(rng.uniform(1, 5))},
+            'user_profile': {'interests': ['Mathematics', 'Science'], 'quiz_scores': {'mathematics': float(rng.uniform(3, 10))}},
+            'recommendation_data': {'recommendations': [{'stream': 'science', 'confidence': float(rng.random())}] * 3}
+        }
+        for i in range(20000)
+    ]
+    numpy_payload = {
+        'scores': rng.random(1000),
+        'counts': [np.int64(i) for i in range(1000)],
+        'generated_at': datetime.now()
+    }
+
+    def bench(label: str, func, repeat: int = 5):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            func()
+        elapsed = (time.perf_counter() - start) / repeat
+        print(f"  {label:44s} {elapsed * 1000:9.2f} ms")
+
+    print(f"Encoder: {'orjson' if ORJSON_AVAILABLE else 'json (orjson not installed)'}")
+    print(f"Persistence payload: {len(records)} A/B results")
+    bench("json.dumps(indent=2) (before)", lambda: json.dumps(records, indent=2))
+    bench("dumps (after, compact)", lambda: dumps(records))
+    text = json.dumps(records, indent=2)
+    data = dumps(records)
+    print(f"  size: {len(text) / 1e6:.1f} MB indented vs {len(data) / 1e6:.1f} MB compact")
+    bench("json.loads (before)", lambda: json.loads(text))
+    bench("loads (after)", lambda: loads(data))
+
+    print("Numpy payload")
+
+    def convert(obj):
+        # The recursive pre-pass persistence used before encoding numpy values
+        if isinstance(obj, dict):
+            return {key: convert(value) for key, value in obj.items()}
+        if isinstance(obj, list):
+            return [convert(item) for item in obj]
+        if isinstance(obj, np.integer):
+            return int(obj)
+        if isinstance(obj, np.floating):
+            return float(obj)
+        if isinstance(obj, np.ndarray):
+            return obj.tolist()
+        if isinstance(obj, datetime):
+            return obj.isoformat()
+        return obj
+
+    bench("convert + json.dumps (before)", lambda: json.dumps(convert(numpy_payload)), repeat=200)
+    bench("dumps (after)", lambda: dumps(numpy_payload), repeat=200)
+
+    print("Response rendering (1000 A/B results)")
+    body = {'results': records[:1000], 'generated_at': datetime.now()}
+    bench("jsonable_encoder + JSONResponse (before)", lambda: JSONResponse(jsonable_encoder(body)), repeat=20)
+    bench("ORJSONResponse (after)", lambda: ORJSONResponse(body), repeat=20)
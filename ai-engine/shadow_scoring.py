@@ -0,0 +1,200 @@
+"""
+Shadow Scoring for EduNiti AI Engine
+Scores sampled live requests with a candidate configuration after the response and compares it to the primary ranking
+"""
+
+import json
+import logging
+import random
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Any, Callable, Optional, Sequence, Tuple
+
+import numpy as np
+
+from execution import ExecutionLayer, ExecutorSaturated
+from instrumentation import REGISTRY, Counter, Histogram
+from variant_scoring import scoring_config
+
+logger = logging.getLogger(__name__)
+
+SHADOW_OUTCOMES = ('compared', 'same_config', 'shed_saturated', 'shed_stale', 'failed')
+
+SHADOW_REQUESTS = REGISTRY.register(Counter(
+    'eduniti_shadow_requests_total', 'Shadow scoring runs by recommendation kind and outcome', ('kind', 'outcome')
+))
+SHADOW_DURATION = REGISTRY.register(Histogram(
+    'eduniti_shadow_scoring_seconds', 'Shadow scorer latency inside the shadow pool', ('kind',)
+))
+SHADOW_OVERLAP = REGISTRY.register(Histogram(
+    'eduniti_shadow_topk_overlap', 'Share of the primary top-k also in the shadow top-k', ('kind',),
+    buckets=(0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0)
+))
+
+def shadow_candidate(setting: str) -> Dict[str, Any]:
+    """Variant definition from a SHADOW_SCORING setting: JSON, or an algorithm name such as ml_based"""
+    if setting.lstrip().startswith('{'):
+        candidate = json.loads(setting)
+        candidate.setdefault('name', 'shadow')
+        return candidate
+    return {'name': setting, 'algorithm': setting}
+
+def kendall_tau(primary_ranks: np.ndarray, shadow_ranks: np.ndarray) -> Optional[float]:
+    """Kendall rank correlation of the items both rankings share (None below two items)"""
+    if len(primary_ranks) < 2:
+        return None
+    upper = np.triu_indices(len(primary_ranks), 1)
+    concordance = (np.sign(primary_ranks[:, None] - primary_ranks[None, :]) *
+                   np.sign(shadow_ranks[:, None] - shadow_ranks[None, :]))[upper]
+    return float(concordance.mean())
+
+def top_k_diff(primary: Sequence[int], shadow: Sequence[int], k: int) -> Dict[str, Any]:
+    """Overlap and rank correlation of two rankings' top ``k`` items"""
+    primary, shadow = list(primary[:k]), list(shadow[:k])
+    shadow_rank = {item: rank for rank, item in enumerate(shadow)}
+    common = [(rank, shadow_rank[item]) for rank, item in enumerate(primary) if item in shadow_rank]
+    ranks = np.array(common, dtype=np.int64).reshape(-1, 2)
+    return {
+        'primary_count': len(primary),
+        'shadow_count': len(shadow),
+        'common': len(common),
+        'overlap': len(common) / len(primary) if primary else (1.0 if not shadow else 0.0),
+        'rank_correlation': kendall_tau(ranks[:, 0], ranks[:, 1]),
+        'top_match': bool(primary and shadow and primary[0] == shadow[0])
+    }
+
+def shadow_score(scorer: Callable, submitted_at: float, max_lag: float, *args) -> Optional[Tuple[List, float]]:
+    """Run ``scorer(*args)`` on a shadow worker; None when the request waited longer than ``max_lag``"""
+    if time.time() - submitted_at > max_lag:
+        return None
+    start = time.perf_counter()
+    matches = scorer(*args)
+    return matches, time.perf_counter() - start
+
+class ShadowScorer:
+    """Scores a sample of live requests with a candidate configuration, off the request path
+
+    Endpoints hand sampled requests to ``run`` as a background task, which
+    only starts once the response has been sent. The candidate is scored on
+    its own bounded execution layer, separate from the primary scoring pool.
+    Work is shed when that pool is full (``max_pending``) and when a queued
+    request has waited longer than ``max_lag`` seconds, so a backlog never
+    grows. Each comparison records top-k overlap, the Kendall correlation of
+    the shared items and the shadow latency.
+    """
+
+    def __init__(self,
+                 candidate: Dict[str, Any],
+                 execution: ExecutionLayer,
+                 sample_rate: float = 0.05,
+                 top_k: int = 10,
+                 max_lag: float = 2.0,
+                 recent: int = 100):
+        if not 0 <= sample_rate <= 1:
+            raise ValueError("Shadow sample_rate must be between 0 and 1")
+        if execution.mode == 'inline':
+            raise ValueError("Shadow scoring needs a 'thread' or 'process' execution layer")
+        self.name = candidate.get('name', 'shadow')
+        self.config = scoring_config(candidate)
+        self.execution = execution
+        self.sample_rate = sample_rate
+        self.top_k = top_k
+        self.max_lag = max_lag
+        self.recent: deque = deque(maxlen=recent)
+        self._random = random.Random()
+        self._lock = threading.Lock()
+        self._counts: Dict[str, Dict[str, int]] = {}
+        self._sums: Dict[str, Dict[str, float]] = {}
+
+    def sample(self) -> bool:
+        """Whether to shadow the current request"""
+        return self.sample_rate > 0 and self._random.random() < self.sample_rate
+
+    def _record(self, kind: str, outcome: str, diff: Optional[Dict[str, Any]] = None):
+        SHADOW_REQUESTS.inc((kind, outcome))
+        with self._lock:
+            counts = self._counts.setdefault(kind, dict.fromkeys(SHADOW_OUTCOMES, 0))
+            counts[outcome] += 1
+            if diff is None:
+                return
+            sums = self._sums.setdefault(kind, {'overlap': 0.0, 'rank_correlation': 0.0, 'correlated': 0,
+                                                'top_match': 0, 'latency_ms': 0.0})
+            sums['overlap'] += diff['overlap']
+            sums['top_match'] += diff['top_match']
+            sums['latency_ms'] += diff['shadow_latency_ms']
+            if diff['rank_correlation'] is not None:
+                sums['rank_correlation'] += diff['rank_correlation']
+                sums['correlated'] += 1
+            self.recent.append(diff)
+
+    async def run(self,
+                  kind: str,
+                  scorer: Callable,
+                  primary: List[Dict[str, Any]],
+                  args: Tuple,
+                  primary_scoring: Optional[Dict[str, Any]] = None):
+        """Score ``args`` with the candidate config and record the diff against ``primary``; never raises"""
+        if primary_scoring is not None and primary_scoring['key'] == self.config['key']:
+            self._record(kind, 'same_config')
+            return
+        submitted = time.time()
+        try:
+            outcome = await self.execution.run_scoring(shadow_score, scorer, submitted, self.max_lag,
+                                                       *args, self.config)
+        except ExecutorSaturated:
+            self._record(kind, 'shed_saturated')
+            return
+        except Exception as e:
+            logger.warning(f"Shadow scoring failed for {kind}: {e}")
+            self._record(kind, 'failed')
+            return
+        if outcome is None:
+            self._record(kind, 'shed_stale')
+            return
+
+        matches, seconds = outcome
+        diff = top_k_diff([match['position'] for match in primary], [match['position'] for match in matches],
+                          self.top_k)
+        diff.update({
+            'kind': kind,
+            'primary_scoring': primary_scoring['key'] if primary_scoring else None,
+            'shadow_latency_ms': seconds * 1000,
+            'queue_ms': max(time.time() - submitted - seconds, 0) * 1000,
+            'timestamp': submitted
+        })
+        SHADOW_DURATION.observe(seconds, (kind,))
+        SHADOW_OVERLAP.observe(diff['overlap'], (kind,))
+        self._record(kind, 'compared', diff)
+        correlation = diff['rank_correlation']
+        logger.info(f"Shadow {self.name} {kind}: overlap@{self.top_k}={diff['overlap']:.2f} "
+                    f"tau={'n/a' if correlation is None else f'{correlation:.2f}'} "
+                    f"latency={diff['shadow_latency_ms']:.2f}ms queue={diff['queue_ms']:.1f}ms")
+
+    def stats(self) -> Dict[str, Any]:
+        """Outcome counts and mean diff per recommendation kind, plus the latest comparisons"""
+        with self._lock:
+            kinds = {}
+            for kind, counts in self._counts.items():
+                sums = self._sums.get(kind)
+                compared = counts['compared']
+                kinds[kind] = {
+                    **counts,
+                    'mean_overlap': sums['overlap'] / compared if compared else None,
+                    'mean_rank_correlation': sums['rank_correlation'] / sums['correlated']
+                    if sums and sums['correlated'] else None,
+                    'top_match_rate': sums['top_match'] / compared if compared else None,
+                    'mean_latency_ms': sums['latency_ms'] / compared if compared else None
+                }
+            recent = list(self.recent)
+        return {
+            'candidate': self.name,
+            'algorithm': self.config['algorithm'],
+            'scoring_key': self.config['key'],
+            'sample_rate': self.sample_rate,
+            'top_k': self.top_k,
+            'max_lag': self.max_lag,
+            'execution': self.execution.stats(),
+            'kinds': kinds,
+            'recent': recent[-20:]
+        }
@@ -0,0 +1,84 @@
+"""
+Startup Timeline for EduNiti AI Engine
+Per-phase startup timings and readiness state for liveness/readiness probes
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Any, Optional
+
+STARTUP_MODES = ('eager', 'background')
+
+class StartupTimeline:
+    """Ordered startup phases, timed relative to when the timeline was created
+
+    Create it before importing heavy modules so the 'imports' phase covers
+    them. Phases may run on worker threads (background loading), so updates
+    take a lock.
+    """
+
+    def __init__(self):
+        self.origin = time.perf_counter()
+        self.started_at = time.time()
+        self.phases: List[Dict[str, Any]] = []
+        self.ready = False
+        self.ready_after: Optional[float] = None
+        self.error: Optional[str] = None
+        self._lock = threading.Lock()
+        self._last_mark = self.origin
+
+    def mark(self, name: str):
+        """Record a phase that ran from the previous mark (or creation) until now"""
+        now = time.perf_counter()
+        with self._lock:
+            self.phases.append(self._entry(name, self._last_mark, now, 'completed'))
+            self._last_mark = now
+
+    @contextmanager
+    def phase(self, name: str):
+        """Time a block as a startup phase"""
+        start = time.perf_counter()
+        entry = self._entry(name, start, None, 'running')
+        with self._lock:
+            self.phases.append(entry)
+        try:
+            yield entry
+        except BaseException:
+            entry['status'] = 'failed'
+            raise
+        else:
+            entry['status'] = 'completed'
+        finally:
+            end = time.perf_counter()
+            entry['duration_s'] = round(end - start, 4)
+            with self._lock:
+                self._last_mark = max(self._last_mark, end)
+
+    def mark_ready(self):
+        """Readiness reached: datasets loaded and derived state published"""
+        with self._lock:
+            self.ready = True
+            self.ready_after = round(time.perf_counter() - self.origin, 4)
+
+    def mark_failed(self, error: str):
+        with self._lock:
+            self.error = error
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'ready': self.ready,
+                'ready_after_s': self.ready_after,
+                'uptime_s': round(time.perf_counter() - self.origin, 4),
+                'error': self.error,
+                'phases': [dict(phase) for phase in self.phases]
+            }
+
+    def _entry(self, name: str, start: float, end: Optional[float], status: str) -> Dict[str, Any]:
+        return {
+            'phase': name,
+            'started_at_s': round(start - self.origin, 4),
+            'duration_s': round(end - start, 4) if end is not None else None,
+            'status': status
+        }
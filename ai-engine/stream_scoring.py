@@ -0,0 +1,137 @@
+"""
+Stream Scoring Tables for EduNiti AI Engine
+Compiles the stream catalogue into keyword weight matrices for vectorized scoring
+"""
+
+from typing import Dict, List, Any, Optional
+
+import numpy as np
+import pandas as pd
+
+# Keyword weights used by calculate_advanced_stream_recommendation
+INTEREST_SUBJECT_WEIGHT = 3
+INTEREST_CAREER_WEIGHT = 4
+QUIZ_SUBJECT_WEIGHT = 0.8
+
+# (stream, personality trait) pairs that add a bonus when the trait is above the threshold
+PERSONALITY_BONUSES = (('science', 'openness'), ('arts', 'agreeableness'), ('commerce', 'conscientiousness'))
+PERSONALITY_THRESHOLD = 3.5
+PERSONALITY_BONUS = 2
+YOUNG_STUDENT_STREAMS = ('science', 'commerce')
+YOUNG_STUDENT_BONUS = 1
+
+def _as_list(value: Any) -> list:
+    if isinstance(value, (list, tuple, np.ndarray)):
+        return list(value)
+    return []
+
+class StreamScoringTable:
+    """Stream x keyword weight matrices compiled from the stream catalogue
+
+    Scoring a profile touches only the columns of the keywords it mentions:
+    each interest adds its column of ``interest_weights`` and each quiz
+    subject adds its ``subject_matrix`` column scaled by the quiz score. The
+    result is identical to walking the catalogue row by row: when a stream
+    appears more than once, its last row supplies the keywords (later rows
+    used to overwrite earlier scores) while its first row supplies the
+    response details, and ties keep catalogue order.
+    """
+
+    def __init__(self, stream_data: pd.DataFrame):
+        streams: List[str] = []
+        keyword_rows: Dict[str, Any] = {}
+        self.details: Dict[str, Dict[str, Any]] = {}
+
+        if 'stream' in stream_data:
+            for _, row in stream_data.iterrows():
+                stream = row.get('stream', 'unknown')
+                if stream not in self.details:
+                    streams.append(stream)
+                    self.details[stream] = {
+                        'career_paths': row.get('careers', []),
+                        'required_subjects': row.get('subjects', []),
+                        'description': row.get('description', '')
+                    }
+                keyword_rows[stream] = row
+
+        self.streams = streams
+        self.keywords: Dict[str, int] = {}
+        subject_cells = []
+        career_cells = []
+        for i, stream in enumerate(streams):
+            row = keyword_rows[stream]
+            for subject in {str(s).lower() for s in _as_list(row.get('subjects', []))}:
+                subject_cells.append((i, self.keywords.setdefault(subject, len(self.keywords))))
+            for career in {str(c).lower() for c in _as_list(row.get('careers', []))}:
+                career_cells.append((i, self.keywords.setdefault(career, len(self.keywords))))
+
+        shape = (len(streams), len(self.keywords))
+        self.subject_matrix = np.zeros(shape)
+        career_matrix = np.zeros(shape)
+        for i, j in subject_cells:
+            self.subject_matrix[i, j] = 1
+        for i, j in career_cells:
+            career_matrix[i, j] = 1
+        self.interest_weights = INTEREST_SUBJECT_WEIGHT * self.subject_matrix + INTEREST_CAREER_WEIGHT * career_matrix
+
+        stream_array = np.array(streams, dtype=object)
+        self.personality_masks = [
+            (trait, stream_array == stream) for stream, trait in PERSONALITY_BONUSES
+        ]
+        self.young_student_mask = np.isin(stream_array, YOUNG_STUDENT_STREAMS)
+
+    def score(self,
+              interests: List[str],
+              quiz_scores: Optional[Dict[str, float]] = None,
+              personality_traits: Optional[Dict[str, float]] = None,
+              age: Optional[int] = None) -> np.ndarray:
+        """Score every stream for a profile"""
+        scores = np.zeros(len(self.streams))
+
+        for interest in interests:
+            column = self.keywords.get(interest.lower())
+            if column is not None:
+                scores += self.interest_weights[:, column]
+
+        if quiz_scores:
+            for subject, score_val in quiz_scores.items():
+                column = self.keywords.get(subject.lower())
+                if column is not None:
+                    scores += self.subject_matrix[:, column] * (score_val * QUIZ_SUBJECT_WEIGHT)
+
+        if personality_traits:
+            for trait, mask in self.personality_masks:
+                if personality_traits.get(trait, 3) > PERSONALITY_THRESHOLD:
+                    scores[mask] += PERSONALITY_BONUS
+
+        if age and age < 18:
+            scores[self.young_student_mask] += YOUNG_STUDENT_BONUS
+
+        return scores
+
+    def top(self, scores: np.ndarray, k: int = 3) -> List[int]:
+        """Indices of the ``k`` best streams, ties in catalogue order"""
+        order = np.argsort(-scores, kind='stable')
+        return order[:k].tolist()
+
+    def recommend(self, user_profile: Any, k: int = 3) -> List[Dict[str, Any]]:
+        """The ``k`` best streams of a profile with confidence, reasoning and stream details"""
+        scores = self.score(
+            user_profile.interests,
+            user_profile.quiz_scores,
+            user_profile.personality_traits,
+            user_profile.age
+        )
+
+        recommendations = []
+        for index in self.top(scores, k):
+            stream = self.streams[index]
+            score = float(scores[index])
+            recommendations.append({
+                'stream': stream,
+                'confidence': min(score / 15, 1.0),  # Normalize to 0-1
+                'reasoning': "Based on your interests, academic strengths, and personality profile",
+                **self.details[stream],
+                'match_score': score
+            })
+        return recommendations
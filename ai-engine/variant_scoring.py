@@ -0,0 +1,498 @@
+"""
+Variant Scoring for EduNiti AI Engine
+Compiles A/B variant scoring configurations into ready-to-run college and career scorers
+"""
+
+import hashlib
+import json
+from typing import Dict, List, Any, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from ml_models import AdvancedMLModels
+
+SCORING_ALGORITHMS = ('heuristic', 'ml', 'hybrid')
+STREAM_MATCHES = ('exact', 'programs')
+
+# Variant 'algorithm' names used by the default recommendation test
+ALGORITHM_ALIASES = {'rule_based': 'heuristic', 'ml_based': 'ml'}
+
+DEFAULT_SCORING = {
+    'algorithm': 'heuristic',  # 'heuristic' (profile match), 'ml' (AdvancedMLModels quality score in the student's state) or 'hybrid'
+    'rule_weight': 0.5,        # hybrid score = rule_weight * heuristic + ml_weight * ML
+    'ml_weight': 0.5,
+    'stream_match': 'exact',   # 'exact' (college streams list, case-sensitive) or 'programs' (also program streams, any case)
+    'college_weights': {
+        'location': 0.4,   # college in the student's state
+        'distance': 0.0,   # scaled by closeness, within the distance radius (off unless a variant sets it)
+        'stream': 0.5,     # offers the student's stream
+        'interest': 0.1,   # per interest matched by program names/specializations
+        'academic': 0.3,   # quiz average within reach of the cut-off
+        'income': 0.1      # fees affordable on the family income
+    },
+    'college_filters': {
+        'types': None,             # allowed college types
+        'states': None,            # allowed college states
+        'max_fees': None,          # ceiling on a college's minimum fees
+        'max_distance_km': None,   # drop colleges farther than this from the student
+        'same_state_only': False,  # only colleges in the student's state
+        'min_score': 0.0           # matches must score above this
+    },
+    'career_weights': {
+        'interest_title': 0.3,  # per interest in the career title
+        'interest_skill': 0.2,  # per interest in the required skills
+        'personality': 0.2      # personality fit of the career
+    },
+    'career_filters': {
+        'match_stream': True,  # only careers in the student's stream
+        'categories': None     # allowed career categories
+    }
+}
+
+_SECTIONS = ('college_weights', 'college_filters', 'career_weights', 'career_filters')
+_LIST_FILTERS = ('types', 'states', 'categories')
+_FLAG_FILTERS = ('same_state_only', 'match_stream')
+
+# Interests whose college/career match masks are memoized
+MAX_CACHED_INTERESTS = 1024
+
+def _number(value: Any, name: str) -> float:
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ValueError(f"Scoring setting {name} must be a number")
+    return float(value)
+
+def scoring_config(variant: Dict[str, Any]) -> Dict[str, Any]:
+    """Validated scoring configuration of a test variant, with defaults and a content ``key``
+
+    Settings come from the variant's ``scoring`` mapping. Variants of the
+    default recommendation test carry ``algorithm`` and ``parameters``
+    (rule_weight, ml_weight) instead; those are honoured when they name a
+    known algorithm, so free-form algorithm labels keep working.
+    """
+    settings = variant.get('scoring') or {}
+    unknown = set(settings) - set(DEFAULT_SCORING)
+    if unknown:
+        raise ValueError(f"Unknown scoring settings: {sorted(unknown)}")
+
+    config = {name: DEFAULT_SCORING[name] for name in ('algorithm', 'rule_weight', 'ml_weight', 'stream_match')}
+    algorithm = ALGORITHM_ALIASES.get(variant.get('algorithm'), variant.get('algorithm'))
+    if algorithm in SCORING_ALGORITHMS:
+        config['algorithm'] = algorithm
+    parameters = variant.get('parameters') or {}
+    config.update({name: parameters[name] for name in ('rule_weight', 'ml_weight') if name in parameters})
+    config.update({name: value for name, value in settings.items() if name not in _SECTIONS})
+
+    if config['algorithm'] not in SCORING_ALGORITHMS:
+        raise ValueError(f"Scoring algorithm must be one of {SCORING_ALGORITHMS}")
+    if config['stream_match'] not in STREAM_MATCHES:
+        raise ValueError(f"Scoring setting stream_match must be one of {STREAM_MATCHES}")
+    for name in ('rule_weight', 'ml_weight'):
+        config[name] = _number(config[name], name)
+
+    for section in _SECTIONS:
+        overrides = settings.get(section) or {}
+        unknown = set(overrides) - set(DEFAULT_SCORING[section])
+        if unknown:
+            raise ValueError(f"Unknown {section} settings: {sorted(unknown)}")
+        values = {**DEFAULT_SCORING[section], **overrides}
+        for name, value in values.items():
+            if name in _FLAG_FILTERS:
+                values[name] = bool(value)
+            elif name in _LIST_FILTERS:
+                if value is not None and not isinstance(value, (list, tuple)):
+                    raise ValueError(f"Scoring setting {section}.{name} must be a list")
+                values[name] = None if value is None else sorted(str(item) for item in value)
+            elif value is not None:
+                values[name] = _number(value, f"{section}.{name}")
+        config[section] = values
+
+    config['key'] = hashlib.blake2b(json.dumps(config, sort_keys=True).encode('utf-8'), digest_size=8).hexdigest()
+    return config
+
+# Scoring of requests outside any test (and of variants without settings)
+BASELINE_SCORING = scoring_config({})
+
+def _column(frame: pd.DataFrame, column: str) -> List[Any]:
+    """Values of a column, None throughout when it is missing"""
+    return frame[column].tolist() if column in frame else [None] * len(frame)
+
+def _fees_min(fees_range: Any) -> float:
+    """Minimum fees as college scoring reads them (NaN when the college has no fees)"""
+    try:
+        present = bool(fees_range)
+    except ValueError:
+        present = True
+    if fees_range is None or not present:
+        return np.nan
+    return fees_range.get('min', 50000) if isinstance(fees_range, dict) else 50000
+
+def _coordinates(location: Dict[str, Any]) -> Optional[Tuple[float, float]]:
+    """Student latitude/longitude, or None when missing or not finite numbers"""
+    try:
+        latitude, longitude = float(location['latitude']), float(location['longitude'])
+    except (KeyError, TypeError, ValueError):
+        return None
+    return (latitude, longitude) if np.isfinite(latitude) and np.isfinite(longitude) else None
+
+def _radius_km(location: Dict[str, Any], default: float) -> float:
+    """The profile's max_distance_km when it is a positive number, else ``default``"""
+    try:
+        radius_km = float(location.get('max_distance_km') or default)
+    except (TypeError, ValueError):
+        return default
+    return radius_km if radius_km > 0 else default
+
+def _joined(value: Any) -> str:
+    return ' '.join(value) if isinstance(value, (list, tuple, np.ndarray)) else ''
+
+class ScoringCatalogue:
+    """Per-college and per-career arrays shared by every compiled scorer of a catalogue"""
+
+    def __init__(self,
+                 college_data: pd.DataFrame,
+                 career_data: pd.DataFrame,
+                 program_index: Any,
+                 geo_index: Any,
+                 radius_km: float):
+        self.college_data = college_data
+        self.career_data = career_data
+        self.program_index = program_index
+        self.geo_index = geo_index
+        self.radius_km = radius_km
+        self.num_colleges = len(college_data)
+        self.num_careers = len(career_data)
+
+        # Colleges match a state through either their 'state' column or location
+        self.state_codes: Dict[Any, int] = {}
+        self.college_states = np.array([self._state_code(state) for state in _column(college_data, 'state')],
+                                       dtype=np.int64)
+        self.location_states = np.array([
+            self._state_code(location.get('state')) if isinstance(location, dict) else -1
+            for location in (_column(college_data, 'location') if 'location' in college_data
+                             else [{}] * self.num_colleges)
+        ], dtype=np.int64)
+        self.cut_offs = (pd.to_numeric(college_data['cut_off'], errors='coerce').to_numpy(dtype=np.float64)
+                         if 'cut_off' in college_data else np.full(self.num_colleges, 70.0))
+        self.fees_min = pd.to_numeric(pd.Series([_fees_min(fees) for fees in _column(college_data, 'fees_range')],
+                                                dtype=object), errors='coerce').to_numpy(dtype=np.float64)
+        self.college_types = np.array(_column(college_data, 'type'), dtype=object)
+        self.college_quality = AdvancedMLModels.college_quality_scores(college_data)
+        self._college_interests: Dict[str, np.ndarray] = {}
+
+        titles = [title if isinstance(title, str) else '' for title in _column(career_data, 'career')]
+        self.career_titles = np.array(titles, dtype=object)
+        self.career_titles_lower = np.array([title.lower() for title in titles], dtype=str)
+        self.career_skills_lower = np.array([_joined(skills).lower() for skills in _column(career_data, 'skills')],
+                                            dtype=str)
+        self.career_streams = np.array(_column(career_data, 'stream'), dtype=object)
+        self.career_categories = np.array(_column(career_data, 'category'), dtype=object)
+        self.career_quality = AdvancedMLModels.career_quality_scores(career_data)
+
+    def _state_code(self, state: Any) -> int:
+        try:
+            return self.state_codes.setdefault(state, len(self.state_codes))
+        except TypeError:
+            return -1
+
+    def college_interest(self, interest: str) -> np.ndarray:
+        """Colleges whose programs mention an interest (memoized ProgramIndex.matches_interest)"""
+        key = interest.lower()
+        mask = self._college_interests.get(key)
+        if mask is None:
+            mask = self.program_index.matches_interest(interest)
+            if len(self._college_interests) < MAX_CACHED_INTERESTS:
+                self._college_interests[key] = mask
+        return mask
+
+    def in_state(self, state: Any) -> np.ndarray:
+        """Boolean array over colleges located in ``state``"""
+        try:
+            code = self.state_codes.get(state, -2)
+        except TypeError:
+            code = -2
+        return (self.college_states == code) | (self.location_states == code)
+
+class CollegeScorer:
+    """College scoring of one configuration, compiled against a scoring catalogue
+
+    Static filters are folded into a candidate mask and the ML quality score
+    into a blended array when the scorer is built, so scoring a profile is a
+    few vectorized terms over all colleges; reasons are built only for the
+    returned matches. With the default configuration the matches equal the
+    row-by-row heuristic (ties keep catalogue order).
+    """
+
+    def __init__(self, catalogue: ScoringCatalogue, config: Dict[str, Any]):
+        self.catalogue = catalogue
+        self.config = config
+        self.weights = config['college_weights']
+        self.filters = config['college_filters']
+        self.algorithm = config['algorithm']
+
+        candidates = np.ones(catalogue.num_colleges, dtype=bool)
+        if self.filters['types'] is not None:
+            candidates &= np.isin(catalogue.college_types, self.filters['types'])
+        if self.filters['states'] is not None:
+            allowed = [catalogue.state_codes[state] for state in self.filters['states'] if state in catalogue.state_codes]
+            candidates &= np.isin(catalogue.college_states, allowed) | np.isin(catalogue.location_states, allowed)
+        if self.filters['max_fees'] is not None:
+            # Colleges without fees information stay candidates
+            candidates &= ~(catalogue.fees_min > self.filters['max_fees'])
+        self.candidates = candidates
+
+        if self.algorithm == 'ml':
+            self.ml_scores = catalogue.college_quality
+        elif self.algorithm == 'hybrid':
+            self.ml_scores = config['ml_weight'] * catalogue.college_quality
+        else:
+            self.ml_scores = None
+
+    def score(self, user_profile: Any, limit: int = 10) -> List[Dict[str, Any]]:
+        """Best matches of a profile: catalogue position, match score and reasons"""
+        catalogue, weights = self.catalogue, self.weights
+        index = catalogue.program_index
+        candidates = self.candidates
+
+        location = user_profile.location
+        ml_only = self.algorithm == 'ml'
+        in_state = None
+        if location:
+            in_state = catalogue.in_state(location.get('state'))
+            # The ML arm ranks colleges in the student's state, as AdvancedMLModels.recommend_colleges does
+            if self.filters['same_state_only'] or (ml_only and location.get('state')):
+                candidates = candidates & in_state
+
+        # Distances are only needed by a distance weight or filter; unparseable coordinates skip both
+        distances = None
+        coordinates = _coordinates(location) if location else None
+        needs_distance = self.filters['max_distance_km'] is not None or (weights['distance'] and not ml_only)
+        if coordinates and needs_distance:
+            distances = catalogue.geo_index.distances_km(*coordinates)
+            radius_km = _radius_km(location, catalogue.radius_km)
+            near = distances <= radius_km
+            if self.filters['max_distance_km'] is not None:
+                candidates = candidates & (distances <= self.filters['max_distance_km'])
+
+        offers_stream = academic = affordable = None
+        interest_matches = []
+        if ml_only:
+            # The quality score is the whole ranking; the profile terms are not computed
+            final = self.ml_scores
+        else:
+            scores = np.zeros(catalogue.num_colleges)
+            if in_state is not None:
+                scores += weights['location'] * in_state
+            if distances is not None:
+                scores += np.where(near, weights['distance'] * (1 - distances / radius_km), 0.0)
+
+            offers_stream = (index.offers_stream(user_profile.stream, exact=self.config['stream_match'] == 'exact')
+                             if user_profile.stream else None)
+            if offers_stream is not None:
+                scores += weights['stream'] * offers_stream
+
+            interest_matches = [(interest, catalogue.college_interest(interest)) for interest in user_profile.interests]
+            for _, matches in interest_matches:
+                scores += weights['interest'] * matches
+
+            if user_profile.quiz_scores:
+                avg_score = sum(user_profile.quiz_scores.values()) / len(user_profile.quiz_scores)
+                academic = avg_score >= catalogue.cut_offs * 0.8
+                scores += weights['academic'] * academic
+
+            if user_profile.family_income:
+                affordable = user_profile.family_income >= catalogue.fees_min * 2
+                scores += weights['income'] * affordable
+
+            final = self.config['rule_weight'] * scores + self.ml_scores if self.algorithm == 'hybrid' else scores
+
+        positions = np.flatnonzero(candidates & (final > self.filters['min_score']))
+        positions = positions[np.argsort(-final[positions], kind='stable')][:limit]
+
+        recommendations = []
+        for position in positions.tolist():
+            reasons = []
+            if in_state is not None and in_state[position]:
+                reasons.append("Located in your preferred state")
+            if distances is not None and near[position]:
+                reasons.append(f"{distances[position]:.0f} km from you")
+            if offers_stream is not None and offers_stream[position]:
+                reasons.append(f"Offers {user_profile.stream} programs")
+            for interest, matches in interest_matches:
+                if matches[position]:
+                    reasons.append(f"Programs align with your interest in {interest}")
+            if academic is not None and academic[position]:
+                reasons.append("Your academic profile matches the college requirements")
+            if affordable is not None and affordable[position]:
+                reasons.append("Affordable based on your family income")
+            recommendations.append({
+                'position': position,
+                'match_score': float(final[position]),
+                'reasons': reasons
+            })
+        return recommendations
+
+class CareerScorer:
+    """Career scoring of one configuration, compiled against a scoring catalogue"""
+
+    def __init__(self, catalogue: ScoringCatalogue, config: Dict[str, Any]):
+        self.catalogue = catalogue
+        self.config = config
+        self.weights = config['career_weights']
+        self.filters = config['career_filters']
+        self.algorithm = config['algorithm']
+
+        candidates = np.ones(catalogue.num_careers, dtype=bool)
+        if self.filters['categories'] is not None:
+            candidates &= np.isin(catalogue.career_categories, self.filters['categories'])
+        self.candidates = candidates
+
+        self.software_engineer = catalogue.career_titles == 'Software Engineer'
+        self.doctor = catalogue.career_titles == 'Doctor'
+        self._interest_masks: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+
+        if self.algorithm == 'ml':
+            self.ml_scores = catalogue.career_quality
+        elif self.algorithm == 'hybrid':
+            self.ml_scores = config['ml_weight'] * catalogue.career_quality
+        else:
+            self.ml_scores = None
+
+    def _interest(self, interest: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Careers whose title / required skills mention an interest"""
+        key = interest.lower()
+        masks = self._interest_masks.get(key)
+        if masks is None:
+            masks = (np.char.find(self.catalogue.career_titles_lower, key) >= 0,
+                     np.char.find(self.catalogue.career_skills_lower, key) >= 0)
+            if len(self._interest_masks) < MAX_CACHED_INTERESTS:
+                self._interest_masks[key] = masks
+        return masks
+
+    def _profile_scores(self, user_profile: Any) -> np.ndarray:
+        """Heuristic interest and personality score of every career"""
+        weights = self.weights
+        scores = np.zeros(self.catalogue.num_careers)
+        for interest in user_profile.interests:
+            in_title, in_skills = self._interest(interest)
+            scores += weights['interest_title'] * in_title
+            scores += weights['interest_skill'] * in_skills
+
+        traits = user_profile.personality_traits
+        if traits:
+            if traits.get('openness', 3) > 3.5:
+                scores += weights['personality'] * self.software_engineer
+            if traits.get('agreeableness', 3) > 3.5:
+                scores += weights['personality'] * self.doctor
+        return scores
+
+    def score(self, user_profile: Any) -> List[Dict[str, Any]]:
+        """Candidate careers of a profile, best first: catalogue position and match score"""
+        catalogue = self.catalogue
+        candidates = self.candidates
+        if self.filters['match_stream'] and user_profile.stream:
+            candidates = candidates & (catalogue.career_streams == user_profile.stream)
+
+        if self.algorithm == 'ml':
+            # The quality score is the whole ranking; the profile terms are not computed
+            final = self.ml_scores
+        else:
+            final = self._profile_scores(user_profile)
+            if self.algorithm == 'hybrid':
+                final = self.config['rule_weight'] * final + self.ml_scores
+
+        positions = np.flatnonzero(candidates)
+        positions = positions[np.argsort(-final[positions], kind='stable')]
+        return [{'position': position, 'match_score': float(final[position])} for position in positions.tolist()]
+
+class VariantScorers:
+    """Compiled college and career scorers per scoring configuration
+
+    Every process keeps its own registry. The API process compiles the arms
+    of a test when the test starts and recompiles them when the catalogue is
+    reloaded; scoring worker processes receive the (small) configuration with
+    each request and compile an arm on its first request. Afterwards serving
+    an arm is a dictionary lookup.
+    """
+
+    def __init__(self):
+        self.catalogue: Optional[ScoringCatalogue] = None
+        self._arms: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self._scorers: Dict[str, Tuple[CollegeScorer, CareerScorer]] = {}
+
+    def install(self, catalogue: ScoringCatalogue):
+        """Switch to a (re)loaded catalogue and recompile the registered arms"""
+        self.catalogue = catalogue
+        self._scorers = {}
+        for config in {config['key']: config for config in self._arms.values()}.values():
+            self.scorers(config)
+
+    def register_test(self, test: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+        """Compile every variant of a stored test; returns variant name -> scoring config"""
+        configs = {variant['name']: scoring_config(variant) for variant in test['variants']}
+        for name, config in configs.items():
+            self._arms[(test['test_id'], name)] = config
+            if self.catalogue is not None:
+                self.scorers(config)
+        return configs
+
+    def config(self, test_id: str, variant: str) -> Optional[Dict[str, Any]]:
+        """Scoring config of a registered test arm"""
+        return self._arms.get((test_id, variant))
+
+    def scorers(self, config: Optional[Dict[str, Any]] = None) -> Tuple[CollegeScorer, CareerScorer]:
+        """Compiled (college, career) scorers of a config, compiling them on first use"""
+        config = config or BASELINE_SCORING
+        compiled = self._scorers
+        scorers = compiled.get(config['key'])
+        if scorers is None:
+            if self.catalogue is None:
+                raise RuntimeError("No catalogue installed for variant scoring")
+            scorers = (CollegeScorer(self.catalogue, config), CareerScorer(self.catalogue, config))
+            compiled[config['key']] = scorers
+        return scorers
+
+    def stats(self) -> Dict[str, Any]:
+        """Registered arms and compiled configurations"""
+        return {
+            'arms': len(self._arms),
+            'compiled': len(self._scorers),
+            'algorithms': sorted({config['algorithm'] for config in self._arms.values()})
+        }
+
+if __name__ == "__main__":
+    import time
+    from types import SimpleNamespace
+
+    from data_generator import DatasetGenerator
+    from geo_index import GeoIndex
+    from program_index import ProgramIndex
+
+    generator = DatasetGenerator(seed=7)
+    colleges = generator.generate_colleges_dataset(1000)
+    careers = generator.generate_careers_dataset(500)
+    registry = VariantScorers()
+    registry.install(ScoringCatalogue(colleges, careers, ProgramIndex(colleges), GeoIndex.from_colleges(colleges), 100))
+
+    test = {'test_id': 'demo', 'variants': [
+        {'name': 'baseline', 'algorithm': 'rule_based'},
+        {'name': 'ml_enhanced', 'algorithm': 'ml_based'},
+        {'name': 'hybrid', 'algorithm': 'hybrid', 'parameters': {'ml_weight': 0.6, 'rule_weight': 0.4}},
+        {'name': 'nearby', 'scoring': {'college_weights': {'distance': 1.0, 'location': 0.2},
+                                       'college_filters': {'max_distance_km': 300}}}
+    ]}
+    start = time.perf_counter()
+    configs = registry.register_test(test)
+    print(f"Compiled {len(configs)} arms in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    profile = SimpleNamespace(location={'state': 'Delhi', 'latitude': 28.6, 'longitude': 77.2}, stream='science',
+                              interests=['physics', 'economics'], quiz_scores={'math': 82, 'physics': 75},
+                              family_income=600000, personality_traits={'openness': 4.2})
+    for name, config in configs.items():
+        college_scorer, career_scorer = registry.scorers(registry.config('demo', name))
+        start = time.perf_counter()
+        for _ in range(200):
+            matches = college_scorer.score(profile, 10)
+        elapsed = (time.perf_counter() - start) / 200 * 1000
+        top = [colleges.iloc[match['position']]['name'] for match in matches[:2]]
+        print(f"  {name:12s} {config['algorithm']:9s} {elapsed:.3f} ms/request  top: {top}")